@@ -0,0 +1,66 @@
+"""Command-line entry point for the benchmark suite.
+
+    python -m benchmarks run [-o results.json] [--size MB] [--seed N]
+    python -m benchmarks compare baseline.json results.json [--threshold 0.1]
+"""
+
+import argparse
+import json
+import sys
+
+from .compare import compare
+from .corpus import SHAPES
+from .runner import report, run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="md-semlinebreak benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("-o", "--output", help="Write results to this JSON file")
+    run_parser.add_argument("--size", type=float, default=1.0,
+                            help="Corpus size per shape in MB (default: 1)")
+    run_parser.add_argument("--seed", type=int, default=0, help="Corpus seed (default: 0)")
+    run_parser.add_argument("--repeat", type=int, default=5,
+                            help="Timing repeats, best is kept (default: 5)")
+    run_parser.add_argument("--shape", action="append", choices=SHAPES,
+                            help="Only run these corpus shapes (repeatable)")
+
+    compare_parser = commands.add_parser("compare", help="Check results against a baseline")
+    compare_parser.add_argument("baseline", help="Saved baseline JSON file")
+    compare_parser.add_argument("current", help="New results JSON file")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="Allowed throughput drop as a fraction (default: 0.10)")
+    compare_parser.add_argument("--memory-threshold", type=float, default=0.20,
+                                help="Allowed peak memory growth as a fraction (default: 0.20)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run(size=int(args.size * 1_000_000), seed=args.seed,
+                      repeat=args.repeat, shapes=args.shape or SHAPES)
+        print(report(results))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+        return
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    if baseline['meta'].get('size') != current['meta'].get('size'):
+        print("Warning: runs used different corpus sizes", file=sys.stderr)
+
+    regressions = compare(baseline, current, args.threshold, args.memory_threshold)
+    for regression in regressions:
+        print(regression)
+    if regressions:
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
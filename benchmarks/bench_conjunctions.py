@@ -0,0 +1,59 @@
+"""Measure what conjunction breaks cost on top of clause breaks.
+
+Run from the repository root:
+
+    python benchmarks/bench_conjunctions.py [--size MB] [--repeat N] [--shape NAME ...]
+
+Each pair of configs differs only in break_at_conjunctions. With
+break_at_dashes, conjunctions are only looked up after dashes; with
+commas alone, every semicolon and colon in the corpus is a candidate,
+so the word lookup runs far more often.
+"""
+
+import argparse
+import dataclasses
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from md_semlinebreak.config import Config
+from md_semlinebreak.formatter import Formatter
+
+from benchmarks.corpus import SHAPES, generate
+
+PAIRS = {
+    'dashes': Config(break_at_dashes=True),
+    'commas only': Config(clause_break_punctuation=[',']),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=float, default=4, help="Corpus size per shape in MB (default: 4)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats (default: 5)")
+    parser.add_argument("--shape", action="append", choices=SHAPES,
+                        help="Only run these corpus shapes (repeatable)")
+    args = parser.parse_args()
+
+    size = int(args.size * 1_000_000)
+    print(f"{'shape':<10} {'punctuation':<20} {'clauses MB/s':>13} {'+conj MB/s':>11} {'cost':>7}")
+    for shape in args.shape or SHAPES:
+        text = generate(shape, size, seed=0)
+        for label, config in PAIRS.items():
+            formatters = [Formatter(dataclasses.replace(config, break_at_conjunctions=conjunctions))
+                          for conjunctions in (False, True)]
+            # Alternate between the two so drift in machine load hits both
+            timings = [float('inf')] * 2
+            for _ in range(args.repeat):
+                for k, formatter in enumerate(formatters):
+                    timings[k] = min(timings[k], timeit.timeit(
+                        lambda: formatter.format_markdown(text), number=1))
+            clauses, both = timings
+            print(f"{shape:<10} {label:<20} {len(text) / clauses / 1e6:>13.1f} "
+                  f"{len(text) / both / 1e6:>11.1f} {both / clauses - 1:>+7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Measure edit latency for incremental formatting as documents grow.
+
+Run from the repository root:
+
+    python benchmarks/bench_incremental.py [--size MB ...] [--keys N]
+
+Types at the start of a line in the middle of a formatted prose
+document, one character at a time, and every tenth key presses Enter
+mid-sentence, so the formatter joins the line back together. Each key is handed to
+format_ranges as an editor would, and its edits are applied before the
+next. The time per key should stay flat as the document grows, far
+below formatting the whole document again.
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from md_semlinebreak.formatter import format_markdown
+from md_semlinebreak.incremental import LineChange, format_ranges, index_blocks
+
+from benchmarks.corpus import generate
+
+
+def apply_edits(lines, edits):
+    """Apply whole-line edits from format_ranges, last first."""
+    for edit in reversed(edits):
+        end = edit.end.line + (edit.end.character > 0)
+        lines[edit.start.line:end] = io.StringIO(edit.new_text)
+
+
+def type_keys(lines, index, line, keys):
+    """Return the time format_ranges took for each key typed into line."""
+    times = []
+    for key in range(keys):
+        text = lines[line]
+        if key % 10 == 9:
+            middle = text.rfind(' ', 0, len(text) // 2) + 1
+            new_lines = [text[:middle].rstrip(' ') + '\n', text[middle:]]
+        else:
+            new_lines = ['x' + text]
+        lines[line:line + 1] = new_lines
+        start = time.perf_counter()
+        edits = format_ranges(lines, index, [LineChange(line, line + 1, len(new_lines))])
+        times.append(time.perf_counter() - start)
+        apply_edits(lines, edits)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=float, action="append",
+                        help="Document size in MB (repeatable, default: 0.05 0.25 1 4)")
+    parser.add_argument("--keys", type=int, default=200, help="Keys typed per document (default: 200)")
+    args = parser.parse_args()
+
+    print(f"{'MB':>5} {'lines':>8} {'blocks':>7} {'index ms':>9} {'key us':>7} {'p90 us':>7} {'full ms':>8}")
+    for mb in args.size or [0.05, 0.25, 1, 4]:
+        text = format_markdown(generate('prose', int(mb * 1_000_000), seed=0))
+        lines = list(io.StringIO(text))
+        index_time = min(timeit.repeat(lambda: index_blocks(lines), number=1, repeat=3))
+        full_time = min(timeit.repeat(lambda: format_markdown(text), number=1, repeat=3))
+        index = index_blocks(lines)
+        # A sentence line of a paragraph, halfway through
+        line = len(lines) // 2
+        while lines[line] == '\n' or lines[line].startswith(('#', '-', '`', '>')):
+            line += 1
+        times = sorted(type_keys(lines, index, line, args.keys))
+        print(f"{mb:>5} {len(lines):>8} {len(index):>7} {index_time * 1e3:>9.1f} "
+              f"{statistics.median(times) * 1e6:>7.0f} {times[len(times) * 9 // 10] * 1e6:>7.0f} "
+              f"{full_time * 1e3:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
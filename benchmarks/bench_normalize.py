@@ -0,0 +1,77 @@
+"""Compare Unicode normalization strategies on large inputs.
+
+Run from the repository root:
+
+    python benchmarks/bench_normalize.py [--size MB] [--repeat N]
+"""
+
+import argparse
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from md_semlinebreak.config import Config
+from md_semlinebreak.formatter import UNICODE_REPLACEMENTS, normalize_unicode
+
+_TRANSLATE_TABLE = str.maketrans(UNICODE_REPLACEMENTS)
+_CHAR_CLASS = re.compile('[' + ''.join(map(re.escape, UNICODE_REPLACEMENTS)) + ']')
+
+
+def legacy_loop(text: str) -> str:
+    """The original implementation: one str.replace per table entry."""
+    for unicode_char, replacement in UNICODE_REPLACEMENTS.items():
+        text = text.replace(unicode_char, replacement)
+    return text
+
+
+def translate(text: str) -> str:
+    """A str.translate table holding every mapping."""
+    return text.translate(_TRANSLATE_TABLE)
+
+
+def regex_single_pass(text: str) -> str:
+    """One regex pass over a character class of every key."""
+    return _CHAR_CLASS.sub(lambda m: UNICODE_REPLACEMENTS[m.group()], text)
+
+
+CUSTOM = Config(unicode_replacements={'→': '->'})
+
+STRATEGIES = {
+    'legacy loop': legacy_loop,
+    'str.translate': translate,
+    'regex single pass': regex_single_pass,
+    'normalize_unicode': normalize_unicode,
+    'normalize_unicode (custom)': lambda text: normalize_unicode(text, CUSTOM),
+}
+
+SAMPLES = {
+    'ascii': "Plain prose with commas, periods and nothing else to replace. ",
+    'sparse': ("Mostly plain prose that goes on for a while without anything special. " * 8
+               + "“Quoted” — aside… "),
+    'dense': "Text with “quotes” — dashes… and spaces everywhere. ",
+    'cjk': "日本語のテキスト、“引用”。",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=float, default=8, help="Input size in MB (default: 8)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats (default: 5)")
+    args = parser.parse_args()
+
+    size = int(args.size * 1_000_000)
+    print(f"{'input':<8} {'strategy':<28} {'best (ms)':>10} {'MB/s':>8}")
+    for label, sample in SAMPLES.items():
+        text = (sample * (size // len(sample) + 1))[:size]
+        expected = legacy_loop(text)
+        for name, func in STRATEGIES.items():
+            assert func(text) == expected, name
+            best = min(timeit.repeat(lambda: func(text), number=1, repeat=args.repeat))
+            print(f"{label:<8} {name:<28} {best * 1000:>10.2f} {len(text) / best / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Compare line breaking strategies for wrapping long clauses.
+
+Run from the repository root:
+
+    python benchmarks/bench_wrap.py [--words N ...] [--repeat N]
+
+Each clause is one long run of words without punctuation, as generated
+docs are full of. The time per word should stay flat for the formatter's
+line breaking as clauses grow, and grow linearly for the quadratic one.
+"""
+
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from md_semlinebreak.config import Config
+from md_semlinebreak.formatter import _break_lines, _line_cost, format_paragraph
+
+from benchmarks.corpus import WORDS
+
+TARGET = 70
+LIMIT = 80
+PENALTY = 40
+
+
+def quadratic(lengths, target, limit, penalties):
+    """Textbook minimum raggedness: every earlier break for every word."""
+    n = len(lengths)
+    ends = []
+    pos = -1
+    for length in lengths:
+        pos += length + 1
+        ends.append(pos)
+    best = [0] * n
+    previous = [0] * n
+    for j in range(1, n):
+        best[j] = float('inf')
+        for i in range(j):
+            width = ends[j - 1] - (ends[i - 1] + 1 if i else 0)
+            cost = best[i] + _line_cost(width, target, limit)
+            if cost < best[j]:
+                best[j], previous[j] = cost, i
+        best[j] += penalties[j]
+
+    def last_cost(i):
+        width = ends[-1] - (ends[i - 1] + 1 if i else 0)
+        return 0 if width <= target else _line_cost(width, target, limit)
+
+    last = min(range(n), key=lambda i: best[i] + last_cost(i))
+    breaks = []
+    while last:
+        breaks.append(last)
+        last = previous[last]
+    return breaks[::-1]
+
+
+def greedy(lengths, target, limit, penalties):
+    """First fit: break before the word that would pass the soft limit."""
+    breaks = []
+    width = -1
+    for j, length in enumerate(lengths):
+        if width >= 0 and width + 1 + length > target:
+            breaks.append(j)
+            width = length
+        else:
+            width += length + 1
+    return breaks
+
+
+STRATEGIES = {
+    'greedy': greedy,
+    'quadratic': quadratic,
+    'formatter': _break_lines,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, nargs='+', default=[100, 1000, 5000],
+                        help="Clause lengths in words (default: 100 1000 5000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repeats (default: 3)")
+    parser.add_argument("--max-quadratic", type=int, default=5000,
+                        help="Skip the quadratic strategy above this many words (default: 5000)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'words':>7} {'strategy':<12} {'best (ms)':>10} {'us/word':>8}")
+    for count in args.words:
+        lengths = [len(rng.choice(WORDS)) for _ in range(count)]
+        penalties = [PENALTY] * count
+        for name, func in STRATEGIES.items():
+            if name == 'quadratic' and count > args.max_quadratic:
+                continue
+            best = min(timeit.repeat(lambda: func(lengths, TARGET, LIMIT, penalties),
+                                     number=1, repeat=args.repeat))
+            print(f"{count:>7} {name:<12} {best * 1000:>10.2f} {best / count * 1e6:>8.2f}")
+
+    # The whole paragraph path, wrapping on and off
+    text = ' '.join(rng.choice(WORDS) for _ in range(max(args.words))) + '.'
+    for wrap in (False, True):
+        config = Config(wrap_long_lines=wrap)
+        best = min(timeit.repeat(lambda: format_paragraph(text, config),
+                                 number=1, repeat=args.repeat))
+        label = 'format_paragraph' + (' --wrap' if wrap else '')
+        print(f"{max(args.words):>7} {label:<24} {best * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Compare benchmark results against a saved baseline."""
+
+from dataclasses import dataclass
+from typing import Dict, List
+
+
+@dataclass
+class Regression:
+    """A benchmark that got slower or hungrier than the threshold allows."""
+
+    name: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        """Relative change from the baseline (positive means worse)."""
+        if self.metric == 'mb_per_s':
+            return self.baseline / self.current - 1 if self.current else float('inf')
+        return self.current / self.baseline - 1 if self.baseline else float('inf')
+
+    def __str__(self) -> str:
+        return (f"{self.name}: {self.metric} {self.baseline:.2f} -> "
+                f"{self.current:.2f} ({self.change:+.1%})")
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.10,
+            memory_threshold: float = 0.20, min_seconds: float = 0.001) -> List[Regression]:
+    """Return every benchmark in both runs that regressed past a threshold.
+
+    Throughput regresses when it drops by more than ``threshold``; peak
+    memory regresses when it grows by more than ``memory_threshold``.
+    Benchmarks missing from either run are ignored, as are timings where
+    both runs finished in under ``min_seconds`` and so are mostly noise.
+    """
+    regressions = []
+    for name, base in baseline['results'].items():
+        now = current['results'].get(name)
+        if now is None:
+            continue
+        too_fast = max(base['seconds'], now['seconds']) < min_seconds
+        if not too_fast and now['mb_per_s'] < base['mb_per_s'] * (1 - threshold):
+            regressions.append(Regression(name, 'mb_per_s', base['mb_per_s'], now['mb_per_s']))
+        if now['peak_mb'] > base['peak_mb'] * (1 + memory_threshold):
+            regressions.append(Regression(name, 'peak_mb', base['peak_mb'], now['peak_mb']))
+    return regressions
@@ -0,0 +1,161 @@
+"""Seeded synthetic Markdown corpus generator.
+
+Each shape stresses a different part of the formatter. The same shape,
+size and seed always produce the same document, so results from
+different runs and machines are comparable.
+"""
+
+import random
+from typing import Callable, Dict
+
+WORDS = (
+    "the a an of to in for on with as by at from that this which who when "
+    "formatter markdown paragraph sentence clause line break reader writer "
+    "document file output input value config option tree build source text "
+    "quickly carefully often never always usually simply exactly however "
+    "returns parses splits joins keeps reads writes checks formats renders "
+    "and but or yet so nor"
+).split()
+
+CLAUSE_PUNCTUATION = [',', ',', ',', ';', ':']
+SENTENCE_PUNCTUATION = ['.', '.', '.', '.', '?', '!']
+
+UNICODE_WORDS = [
+    "“quoted”", "‘single’", "dash—like", "range–2",
+    "wait…", "non breaking", "thin space", "zero​width",
+    "naïve", "café", "«yes»", "6′7″",
+]
+
+CODE_LINES = [
+    "def format(text, config=None):",
+    "    lines = text.split('\\n')",
+    "    for i, line in enumerate(lines):",
+    "        if line.startswith('#'):",
+    "            continue",
+    "    return '\\n'.join(result)",
+    "x = {'a': 1, 'b': 2}; print(x, sep=', ')",
+]
+
+
+def _sentence(rng: random.Random, words=WORDS, min_words=6, max_words=30) -> str:
+    count = rng.randint(min_words, max_words)
+    parts = []
+    for i in range(count):
+        word = rng.choice(words)
+        if i == 0:
+            word = word.capitalize()
+        parts.append(word)
+        if 0 < i < count - 1 and rng.random() < 0.12:
+            parts[-1] += rng.choice(CLAUSE_PUNCTUATION)
+    return ' '.join(parts) + rng.choice(SENTENCE_PUNCTUATION)
+
+
+def _paragraph(rng: random.Random, sentences: int = 0, **kwargs) -> str:
+    sentences = sentences or rng.randint(2, 8)
+    return _wrap(' '.join(_sentence(rng, **kwargs) for _ in range(sentences)))
+
+
+def _wrap(text: str, width: int = 72) -> str:
+    """Wrap at a fixed width, as hand-written Markdown usually is."""
+    lines, line = [], []
+    length = 0
+    for word in text.split(' '):
+        if line and length + 1 + len(word) > width:
+            lines.append(' '.join(line))
+            line, length = [], 0
+        length += len(word) + (1 if line else 0)
+        line.append(word)
+    lines.append(' '.join(line))
+    return '\n'.join(lines)
+
+
+def _prose(rng: random.Random) -> str:
+    if rng.random() < 0.15:
+        return '#' * rng.randint(1, 3) + ' ' + _sentence(rng, max_words=8).rstrip('.?!')
+    return _paragraph(rng)
+
+
+def _code(rng: random.Random) -> str:
+    if rng.random() < 0.6:
+        body = '\n'.join(rng.choice(CODE_LINES) for _ in range(rng.randint(5, 40)))
+        return f"```python\n{body}\n```"
+    return _paragraph(rng, sentences=rng.randint(1, 3))
+
+
+def _lists(rng: random.Random) -> str:
+    if rng.random() < 0.75:
+        items = []
+        for n in range(1, rng.randint(3, 12)):
+            marker = rng.choice(['-', '*', f'{n}.'])
+            items.append(f"{marker} {_sentence(rng, max_words=14)}")
+        return '\n'.join(items)
+    return _paragraph(rng, sentences=rng.randint(1, 3))
+
+
+def _unicode(rng: random.Random) -> str:
+    return _paragraph(rng, words=WORDS + UNICODE_WORDS * 3)
+
+
+def _links(rng: random.Random) -> str:
+    # Reference pages: paragraphs that are mostly links, code and tags
+    parts = []
+    for _ in range(rng.randint(10, 60)):
+        words = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        kind = rng.random()
+        if kind < 0.5:
+            parts.append(f"[{words}, {rng.choice(WORDS)}](https://example.com/{words.replace(' ', '/')})")
+        elif kind < 0.7:
+            parts.append(f"`{words}, {rng.choice(WORDS)}.`")
+        elif kind < 0.8:
+            parts.append(f"<code>{words}</code>")
+        else:
+            parts.append(words + rng.choice(CLAUSE_PUNCTUATION + SENTENCE_PUNCTUATION))
+    return _wrap(' '.join(parts))
+
+
+def _long_clauses(rng: random.Random) -> str:
+    # Generated docs: long sentences with hardly any clause punctuation
+    sentences = []
+    for _ in range(rng.randint(1, 4)):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(20, 120))]
+        sentences.append(' '.join(words).capitalize() + '.')
+    return _wrap(' '.join(sentences))
+
+
+BLOCK_GENERATORS: Dict[str, Callable[[random.Random], str]] = {
+    'prose': _prose,
+    'code': _code,
+    'lists': _lists,
+    'unicode': _unicode,
+    'long_clauses': _long_clauses,
+    'links': _links,
+}
+
+SHAPES = ['prose', 'code', 'lists', 'huge_paragraph', 'unicode', 'long_clauses', 'links']
+
+
+def generate(shape: str, size: int, seed: int = 0) -> str:
+    """Generate a document of about ``size`` characters in the given shape."""
+    rng = random.Random(f"{shape}:{seed}")
+
+    if shape == 'huge_paragraph':
+        # One paragraph with no blank lines, wrapped like hand-written text
+        sentences = []
+        total = 0
+        while total < size:
+            sentence = _sentence(rng, min_words=10, max_words=60)
+            sentences.append(sentence)
+            total += len(sentence) + 1
+        return _wrap(' '.join(sentences)) + '\n'
+
+    if shape not in BLOCK_GENERATORS:
+        raise ValueError(f"Unknown corpus shape: {shape!r} (expected one of {', '.join(SHAPES)})")
+    make_block = BLOCK_GENERATORS[shape]
+    blocks = []
+    total = 0
+    while total < size:
+        block = make_block(rng)
+        blocks.append(block)
+        total += len(block) + 2
+    return '\n\n'.join(blocks) + '\n'
+
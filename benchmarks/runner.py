@@ -0,0 +1,106 @@
+"""Measure formatter throughput, memory and per-function timings."""
+
+import dataclasses
+import gc
+import platform
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from md_semlinebreak import __version__
+from md_semlinebreak.config import Config
+from md_semlinebreak.formatter import get_formatter
+
+from .corpus import SHAPES, generate
+
+
+def _best_time(func: Callable[[], object], repeat: int) -> float:
+    """Return the fastest of several timed calls, with the GC paused."""
+    best = float('inf')
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best
+
+
+def _peak_memory(func: Callable[[], object]) -> int:
+    """Return the peak bytes allocated while running func once."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _measure(func: Callable[[], object], size: int, repeat: int) -> Dict[str, float]:
+    seconds = _best_time(func, repeat)
+    return {
+        'seconds': seconds,
+        'mb_per_s': size / seconds / 1e6 if seconds else float('inf'),
+        'peak_mb': _peak_memory(func) / 1e6,
+    }
+
+
+def _paragraphs(text: str) -> List[str]:
+    """Split a document into joined paragraphs, as format_markdown sees them."""
+    return [' '.join(block.split('\n')) for block in text.split('\n\n')
+            if block and not block.startswith(('#', '```', '-', '*'))
+            and not block[0].isdigit()]
+
+
+def run(size: int = 1_000_000, seed: int = 0, repeat: int = 5,
+        shapes: List[str] = SHAPES, config: Config = None) -> Dict:
+    """Run every benchmark and return the results as a JSON-ready dict."""
+    config = config or Config()
+    formatter = get_formatter(config)
+    wrapping = get_formatter(dataclasses.replace(config, wrap_long_lines=True))
+    results = {}
+
+    for shape in shapes:
+        text = generate(shape, size, seed)
+        nbytes = len(text.encode('utf-8'))
+
+        results[f'format_markdown/{shape}'] = _measure(
+            lambda: formatter.format_markdown(text), nbytes, repeat)
+        results[f'format_markdown_wrap/{shape}'] = _measure(
+            lambda: wrapping.format_markdown(text), nbytes, repeat)
+
+        paragraphs = _paragraphs(text)
+        if paragraphs:
+            pbytes = sum(len(p.encode('utf-8')) for p in paragraphs)
+            results[f'format_paragraph/{shape}'] = _measure(
+                lambda: [formatter.format_paragraph(p) for p in paragraphs], pbytes, repeat)
+
+        results[f'normalize_unicode/{shape}'] = _measure(
+            lambda: formatter.normalize_unicode(text), nbytes, repeat)
+
+    return {
+        'meta': {
+            'version': __version__,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'size': size,
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def report(results: Dict) -> str:
+    """Format run results as a human-readable table."""
+    lines = [f"{'benchmark':<36} {'best (ms)':>10} {'MB/s':>9} {'peak MB':>9}"]
+    for name, r in results['results'].items():
+        lines.append(
+            f"{name:<36} {r['seconds'] * 1000:>10.2f} {r['mb_per_s']:>9.2f} {r['peak_mb']:>9.2f}"
+        )
+    return '\n'.join(lines)
@@ -2,7 +2,40 @@
 
 __version__ = "0.1.0"
 
-from .formatter import format_markdown, format_paragraph, normalize_unicode
-from .config import Config
+# Public names and the submodules defining them. They are imported on
+# first access, so that the CLI and other entry points pay only for the
+# modules they actually use.
+_EXPORTS = {
+    "Formatter": "formatter",
+    "get_formatter": "formatter",
+    "format_markdown": "formatter",
+    "format_paragraph": "formatter",
+    "iter_format_markdown": "formatter",
+    "is_formatted": "formatter",
+    "normalize_unicode": "formatter",
+    "Config": "config",
+    "ConfigResolver": "configfile",
+    "AsyncFormatter": "aio",
+    "aformat_markdown": "aio",
+    "aformat_files": "aio",
+    "LineChange": "incremental",
+    "TextEdit": "incremental",
+    "index_blocks": "incremental",
+    "format_ranges": "incremental",
+}
 
-__all__ = ["format_markdown", "format_paragraph", "normalize_unicode", "Config"]
\ No newline at end of file
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
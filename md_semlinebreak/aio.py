@@ -0,0 +1,158 @@
+"""Asyncio API for formatting Markdown inside event-loop based services."""
+
+import asyncio
+import os
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterable, Optional, Tuple, Union
+
+from .batch import _format_bytes
+from .config import Config, DEFAULT_CONFIG
+from .fileio import encode_text, write_atomic
+from .formatter import get_formatter
+
+# Documents up to this many characters are formatted on the event loop:
+# that takes well under a millisecond, less than handing them to a worker.
+INLINE_LIMIT = 4096
+
+
+def _format_text(text: str, config: Config) -> str:
+    return get_formatter(config).format_markdown(text)
+
+
+def _format_path(path: str, config: Config, write: bool) -> str:
+    """Read, format and optionally rewrite one file, on a worker."""
+    original, formatted = _format_bytes(Path(path).read_bytes(), config)
+    if write and formatted != original:
+        write_atomic(path, encode_text(formatted), compare=False)
+    return formatted
+
+
+class AsyncFormatter:
+    """Runs formatting for asyncio code on a managed executor.
+
+    CPU work and file I/O happen on ``executor`` (by default a process
+    pool, created on first use and shut down by ``close`` or ``aclose``,
+    which ``async with`` calls), so the event
+    loop keeps serving other work. At most ``max_workers`` jobs are in
+    flight per event loop; further callers wait their turn instead of
+    queueing unbounded work.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None,
+                 max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _slots(self) -> asyncio.Semaphore:
+        # Semaphores bind to the loop they are first used on
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_workers)
+        return semaphore
+
+    async def _run(self, func: Callable, *args):
+        async with self._slots():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    async def format_markdown(self, text: str, config: Config = DEFAULT_CONFIG) -> str:
+        """Format Markdown text without blocking the event loop."""
+        if len(text) <= INLINE_LIMIT:
+            return _format_text(text, config)
+        return await self._run(_format_text, text, config)
+
+    async def format_files(
+        self, paths: Iterable[str], config: Config = DEFAULT_CONFIG, *,
+        write: bool = False, return_exceptions: bool = False,
+    ) -> AsyncIterator[Tuple[str, Union[str, BaseException]]]:
+        """Format files concurrently, yielding ``(path, formatted_text)`` as each finishes.
+
+        Files are formatted the way ``mdfix -i`` does, and with ``write``
+        the ones that change are written back. ``paths`` is consumed
+        lazily and at most ``max_workers`` files are in flight, so results
+        the consumer hasn't taken yet hold back new work. An error reading
+        a file is raised, cancelling the rest, unless ``return_exceptions``
+        is set, in which case it is yielded in place of the text.
+        """
+        async def one(path: str):
+            try:
+                return path, await self._run(_format_path, path, config, write)
+            except (OSError, UnicodeDecodeError) as e:
+                if not return_exceptions:
+                    raise
+                return path, e
+
+        pending = set()
+        # Finished tasks whose results haven't been yielded yet
+        done = set()
+        try:
+            for path in paths:
+                if len(pending) >= self.max_workers:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    while done:
+                        yield done.pop().result()
+                pending.add(asyncio.create_task(one(path)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                while done:
+                    yield done.pop().result()
+        finally:
+            for task in pending:
+                task.cancel()
+            # Errors the consumer will never see, retrieved so asyncio
+            # doesn't report them as unhandled
+            for task in done:
+                if not task.cancelled():
+                    task.exception()
+
+    def close(self):
+        """Shut down the executor if this instance created it."""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def aclose(self):
+        """Shut down the executor like ``close``, waiting off the event loop."""
+        if self._owns_executor and self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def __aenter__(self) -> 'AsyncFormatter':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+# Shared by the module functions; its process pool starts on first use
+_DEFAULT_FORMATTER: Optional[AsyncFormatter] = None
+
+
+def _default_formatter() -> AsyncFormatter:
+    global _DEFAULT_FORMATTER
+    if _DEFAULT_FORMATTER is None:
+        _DEFAULT_FORMATTER = AsyncFormatter()
+    return _DEFAULT_FORMATTER
+
+
+async def aformat_markdown(text: str, config: Config = DEFAULT_CONFIG) -> str:
+    """Format Markdown text without blocking the event loop."""
+    return await _default_formatter().format_markdown(text, config)
+
+
+def aformat_files(paths: Iterable[str], config: Config = DEFAULT_CONFIG, *,
+                  write: bool = False, return_exceptions: bool = False,
+                  ) -> AsyncIterator[Tuple[str, Union[str, BaseException]]]:
+    """Format files concurrently; see ``AsyncFormatter.format_files``."""
+    return _default_formatter().format_files(
+        paths, config, write=write, return_exceptions=return_exceptions)
@@ -0,0 +1,359 @@
+"""Multi-file and directory processing for md-semlinebreak."""
+
+import fnmatch
+import io
+import os
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from . import stats
+from .cache import Cache, content_hash
+from .config import Config
+from .fileio import encode_text, sync_files, write_atomic
+from .formatter import Change, get_formatter
+from .stats import Stats
+
+# File name patterns picked up when walking a directory
+DEFAULT_INCLUDE = ['*.md', '*.markdown']
+
+# Directory and file names never descended into or formatted
+DEFAULT_EXCLUDE = [
+    '.git', '.hg', '.svn', '.tox', '.nox', '.venv', 'venv',
+    'node_modules', '__pycache__',
+]
+
+
+@dataclass
+class FileResult:
+    """Outcome of formatting a single file."""
+
+    path: str
+    changed: bool = False
+    error: Optional[str] = None
+    # Whether the formatted content was written back
+    written: bool = False
+    # Unified diff of the changes, when one was asked for
+    diff: Optional[str] = None
+
+    # Stat and content hash of the file once formatted, for the cache
+    mtime_ns: Optional[int] = None
+    size: Optional[int] = None
+    digest: Optional[str] = None
+    ctime_ns: Optional[int] = None
+    ino: Optional[int] = None
+
+    # Instrumentation, when stats are being collected
+    stats: Optional[Stats] = None
+
+
+@dataclass
+class Summary:
+    """Per-run totals for a batch of files."""
+
+    changed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    failed: List[FileResult] = field(default_factory=list)
+    written: List[str] = field(default_factory=list)
+    cache_hits: int = 0
+
+    def add(self, result: FileResult):
+        """Record the outcome of one file."""
+        if result.error is not None:
+            self.failed.append(result)
+        elif result.changed:
+            self.changed.append(result.path)
+        else:
+            self.unchanged.append(result.path)
+        if result.written:
+            self.written.append(result.path)
+
+    def report(self, check: bool = False) -> str:
+        """Return a one-line human-readable summary.
+
+        With ``check``, changed files are reported as ones that would change.
+        """
+        parts = [
+            f"{len(self.changed)} {_files(len(self.changed))} "
+            + ("would change" if check else "changed"),
+            f"{len(self.unchanged)} unchanged",
+        ]
+        if not check:
+            parts.append(f"{len(self.written)} written")
+        if self.failed:
+            parts.append(f"{len(self.failed)} failed")
+        return ', '.join(parts) + '.'
+
+
+def _files(count: int) -> str:
+    return 'file' if count == 1 else 'files'
+
+
+def _matches(name: str, rel_path: str, patterns: Sequence[str]) -> bool:
+    """Check a file or directory against glob patterns by name or relative path."""
+    return any(
+        fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel_path, pattern)
+        for pattern in patterns
+    )
+
+
+def discover_files(paths: Iterable[str],
+                   include: Sequence[str] = DEFAULT_INCLUDE,
+                   exclude: Sequence[str] = DEFAULT_EXCLUDE) -> Iterator[str]:
+    """Expand files and directories into the Markdown files to format.
+
+    Files named explicitly are always yielded. Directories are walked
+    recursively, keeping files whose name matches an include pattern and
+    pruning anything that matches an exclude pattern.
+    """
+    seen = set()
+    for path in paths:
+        if not os.path.isdir(path):
+            if path not in seen:
+                seen.add(path)
+                yield path
+            continue
+
+        for root, dirs, files in os.walk(path):
+            rel_root = os.path.relpath(root, path)
+            rel_root = '' if rel_root == '.' else Path(rel_root).as_posix() + '/'
+            dirs[:] = sorted(
+                d for d in dirs if not _matches(d, rel_root + d, exclude)
+            )
+            for name in sorted(files):
+                rel_path = rel_root + name
+                if (_matches(name, rel_path, include)
+                        and not _matches(name, rel_path, exclude)):
+                    file_path = os.path.join(root, name)
+                    if file_path not in seen:
+                        seen.add(file_path)
+                        yield file_path
+
+
+def filter_files(paths: Iterable[str], roots: Sequence[str] = (),
+                 include: Sequence[str] = DEFAULT_INCLUDE,
+                 exclude: Sequence[str] = DEFAULT_EXCLUDE) -> Iterator[str]:
+    """Keep the files among ``paths`` that walking ``roots`` would pick up.
+
+    This applies the rules of ``discover_files`` to a list of files, such
+    as those git reports as changed. With ``roots``, only files named by a
+    root or inside a root directory are kept; files named outright are
+    always kept, the others must match an include pattern without
+    themselves or any directory below their root matching an exclude
+    pattern. Without ``roots``, paths are matched as given.
+    """
+    roots = [os.path.abspath(root) for root in roots]
+    for path in paths:
+        full_path = os.path.abspath(path)
+        if roots:
+            if full_path in roots:
+                yield path
+                continue
+            root = next((root for root in roots if os.path.isdir(root)
+                         and os.path.commonpath([root, full_path]) == root), None)
+            if root is None:
+                continue
+            parts = Path(os.path.relpath(full_path, root)).parts
+        else:
+            parts = Path(path).parts
+        rel_paths = ['/'.join(parts[:i + 1]) for i in range(len(parts))]
+        if (_matches(parts[-1], rel_paths[-1], include)
+                and not any(_matches(name, rel_path, exclude)
+                            for name, rel_path in zip(parts, rel_paths))):
+            yield path
+
+
+def _decode(data: bytes) -> str:
+    """Decode file content the way ``Path.read_text`` would."""
+    text = data.decode('utf-8')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _format_bytes(data: bytes, config: Config) -> Tuple[str, str]:
+    """Decode and format file content, returning the original and formatted text."""
+    original = data.decode('utf-8')
+    formatter = get_formatter(config)
+    text = _decode(data)
+    if config.normalize_unicode:
+        text = formatter.normalize_unicode(text)
+    return original, formatter.format_markdown(text)
+
+
+def _check_bytes(data: bytes, config: Config, diff_name: Optional[str] = None
+                 ) -> Tuple[bool, Optional[str]]:
+    """Check whether formatting would change file content.
+
+    Returns whether it would, and with ``diff_name`` a unified diff of the
+    changed blocks. Without a diff, the check stops at the first block
+    that would change.
+    """
+    original = data.decode('utf-8')
+    if '\r' in original:
+        # Line endings other than \n are rewritten wherever they are, so
+        # the diff replaces the whole file, its lines ending as they do
+        if diff_name is None:
+            return True, None
+        changes = iter([Change(0, list(io.StringIO(original, newline='')),
+                               _format_bytes(data, config)[1])])
+    else:
+        changes = get_formatter(config).iter_changes(io.StringIO(original))
+    if diff_name is None:
+        return next(changes, None) is not None, None
+
+    from .diff import unified_diff
+    diff_name = diff_name.lstrip('/')
+    diff = ''.join(unified_diff(changes, f"a/{diff_name}", f"b/{diff_name}"))
+    return bool(diff), diff or None
+
+
+def format_file(path: str, config: Config, write: bool = True,
+                known_hash: Optional[str] = None, fsync: bool = True,
+                diff: bool = False) -> FileResult:
+    """Format one file, writing it back only if its content changed.
+
+    If the file's content hash equals ``known_hash`` it is already
+    formatted and is not decoded or formatted again. The file is replaced
+    atomically, and flushed to disk first unless ``fsync`` is false.
+
+    Without ``write`` the file is only checked, which stops at the first
+    paragraph that would change; with ``diff`` as well, the result
+    carries a unified diff of every changed paragraph instead.
+    """
+    try:
+        st = os.stat(path)
+        data = Path(path).read_bytes()
+        digest = content_hash(data)
+        doc = stats.current()
+        if digest == known_hash:
+            if doc is not None:
+                doc.cache_hits += 1
+                doc.bytes_in = doc.bytes_out = len(data)
+            return FileResult(path, False, mtime_ns=st.st_mtime_ns,
+                              size=st.st_size, digest=digest,
+                              ctime_ns=st.st_ctime_ns, ino=st.st_ino)
+
+        if not write:
+            changed, diff_text = _check_bytes(data, config, Path(path).as_posix() if diff else None)
+            if doc is not None:
+                doc.bytes_in = len(data)
+            if changed:
+                return FileResult(path, True, diff=diff_text)
+            return FileResult(path, False, mtime_ns=st.st_mtime_ns,
+                              size=st.st_size, digest=digest,
+                              ctime_ns=st.st_ctime_ns, ino=st.st_ino)
+
+        original, formatted_text = _format_bytes(data, config)
+        changed = formatted_text != original
+        if doc is not None:
+            # File sizes rather than the decoded text the formatter counted
+            doc.bytes_in = len(data)
+            doc.bytes_out = stats.utf8_len(formatted_text) if changed else len(data)
+        if changed:
+            formatted = encode_text(formatted_text)
+            write_atomic(path, formatted, fsync=fsync, compare=False)
+            st = os.stat(path)
+            digest = content_hash(formatted)
+        return FileResult(path, changed, written=changed, mtime_ns=st.st_mtime_ns,
+                          size=st.st_size, digest=digest,
+                          ctime_ns=st.st_ctime_ns, ino=st.st_ino)
+    except (OSError, UnicodeDecodeError) as e:
+        return FileResult(path, error=str(e))
+
+
+def run_batch(paths: Sequence[str], config: Config, jobs: int = 1,
+              write: bool = True, cache: Optional[Cache] = None,
+              fsync: bool = True, diff: bool = False,
+              on_result: Optional[Callable[[FileResult], None]] = None,
+              resolve: Optional[Callable[[str], Config]] = None) -> Summary:
+    """Format many files, spreading the work over a process pool.
+
+    With a cache, files whose stat matches a formatted entry are skipped
+    without being read, and every file left formatted is recorded. Files
+    are written without waiting for the disk, and with ``fsync`` they are
+    all flushed together once the batch is done. ``write`` and ``diff``
+    are as for ``format_file``; ``on_result`` is called with each file's
+    result as it arrives.
+
+    With ``resolve``, each file is formatted with the config it returns
+    for the file's path instead of ``config``, such as
+    ``ConfigResolver.resolve``, and looked up in the cache for that config.
+    """
+    summary = Summary()
+    # Workers measure each file and the stats are recorded here, so hooks
+    # and collectors see every file whichever process formatted it
+    collect_stats = stats.enabled
+    configs = [resolve(path) for path in paths] if resolve is not None else [config] * len(paths)
+
+    if cache is not None:
+        pending = []
+        pending_configs = []
+        for path, file_config in zip(paths, configs):
+            if cache.for_config(file_config).is_unchanged(path):
+                summary.cache_hits += 1
+                summary.unchanged.append(path)
+                if collect_stats:
+                    stats.record(path, Stats(documents=1, cache_hits=1))
+            else:
+                pending.append(path)
+                pending_configs.append(file_config)
+        paths = pending
+        configs = pending_configs
+        known_hashes = [cache.for_config(file_config).known_hash(path)
+                        for path, file_config in zip(paths, configs)]
+    else:
+        known_hashes = [None] * len(paths)
+
+    results = _map_files(paths, configs, known_hashes, jobs, write, collect_stats, diff)
+    for file_config, result in zip(configs, results):
+        summary.add(result)
+        if on_result is not None:
+            on_result(result)
+        if result.stats is not None:
+            stats.record(result.path, result.stats)
+        if cache is not None and result.digest is not None:
+            cache.for_config(file_config).record(result.path, result.mtime_ns,
+                                                 result.size, result.digest,
+                                                 result.ctime_ns, result.ino)
+
+    if fsync and summary.written:
+        sync_files(summary.written)
+    if cache is not None:
+        cache.save()
+    return summary
+
+
+def _format_pending(write: bool, collect_stats: bool, diff: bool,
+                    path: str, config: Config, known_hash: Optional[str]) -> FileResult:
+    # run_batch syncs every written file at the end
+    if not collect_stats:
+        return format_file(path, config, write=write, known_hash=known_hash,
+                           fsync=False, diff=diff)
+    with stats.document(path, report=False) as doc:
+        result = format_file(path, config, write=write, known_hash=known_hash,
+                             fsync=False, diff=diff)
+    result.stats = doc
+    return result
+
+
+def _map_files(paths: Sequence[str], configs: Sequence[Config],
+               known_hashes: Sequence[Optional[str]], jobs: int, write: bool,
+               collect_stats: bool = False, diff: bool = False) -> Iterator[FileResult]:
+    """Run format_file over paths, each with its config, in-process or across worker processes."""
+    worker = partial(_format_pending, write, collect_stats, diff)
+
+    if jobs <= 1 or len(paths) <= 1:
+        yield from map(worker, paths, configs, known_hashes)
+        return
+
+    # Only parallel runs pay for importing multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    jobs = min(jobs, len(paths))
+    # Large chunks amortize pickling; a few per worker keeps the load balanced.
+    # Files sharing a config share the Config object, pickled once per chunk.
+    chunksize = max(1, min(64, len(paths) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(worker, paths, configs, known_hashes, chunksize=chunksize)
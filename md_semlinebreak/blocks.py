@@ -0,0 +1,511 @@
+"""Single-pass Markdown block scanner.
+
+The scanner classifies each line once with a combined pattern and groups
+lines into blocks. Only paragraphs are prose; every other block is
+passed through by the formatter exactly as written.
+"""
+
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Pattern, Sequence
+
+# Block kinds
+PARAGRAPH = 'paragraph'
+BLANK = 'blank'
+HEADING = 'heading'
+SETEXT_HEADING = 'setext_heading'
+THEMATIC_BREAK = 'thematic_break'
+FENCED_CODE = 'fenced_code'
+INDENTED_CODE = 'indented_code'
+TABLE = 'table'
+HTML = 'html'
+FRONT_MATTER = 'front_matter'
+LIST = 'list'
+BLOCKQUOTE = 'blockquote'
+
+# Line classes in priority order, with the characters each can start with.
+# A line is classified by one match against the combined pattern for its
+# first character; the name of the matching group is the line's class.
+_WHITESPACE = ' \t\r\n\f\v'
+_LINE_CLASSES = [
+    ('blank', r'\s*$', _WHITESPACE),
+    ('fence', r'[ ]{0,3}(?:`{3,}(?=[^`]*$)|~{3,})', ' `~'),
+    ('heading', r'[ ]{0,3}\#{1,6}(?:[ \t]|\s*$)', ' #'),
+    ('thematic', r'[ ]{0,3}(?:(?:\*[ \t]*){3,}|(?:-[ \t]*){3,}|(?:_[ \t]*){3,})\s*$', ' *-_'),
+    ('list', r'[ ]{0,3}(?:[-*+]|\d{1,9}[.)])(?:[ \t]|\s*$)', ' -*+0123456789'),
+    ('quote', r'[ ]{0,3}>', ' >'),
+    ('html', r'[ ]{0,3}<[A-Za-z/!?]', ' <'),
+    ('table_delim', r'[ ]{0,3}\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)*\|?\s*$', ' \t|:-'),
+    ('setext', r'[ ]{0,3}=+\s*$', ' ='),
+    ('indented', r'[ ]{0,3}\t|[ ]{4}', ' \t'),
+]
+
+
+def _combine(classes) -> Pattern:
+    return re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern, _ in classes))
+
+
+class _Classifiers(dict):
+    """Combined line patterns by first character, compiled on first use.
+
+    Whitespace-led and empty lines need every class; characters no
+    class starts with map to None.
+    """
+
+    def __missing__(self, char: str) -> Optional[Pattern]:
+        if not char or char in _WHITESPACE:
+            classes = _LINE_CLASSES
+        else:
+            classes = [c for c in _LINE_CLASSES if char in c[2]]
+        pattern = _combine(classes) if classes else None
+        self[char] = pattern
+        return pattern
+
+
+_CLASSIFIERS = _Classifiers()
+
+# First characters of every line class except plain text; any other line
+# is paragraph text without consulting a pattern
+_SPECIAL_START = frozenset(''.join(chars for _, _, chars in _LINE_CLASSES)) | {''}
+
+class _LazyPattern:
+    """A regular expression compiled the first time it is used.
+
+    Most documents never need most block patterns, and compiling them
+    all at import time would be a noticeable part of CLI startup.
+    """
+
+    def __init__(self, pattern: str, flags: int = 0):
+        self._source = (pattern, flags)
+
+    def __getattr__(self, name: str):
+        # Only reached until the first use; after that the compiled
+        # pattern's methods are found on the instance directly
+        compiled = re.compile(*self._source)
+        for method in ('match', 'search', 'fullmatch', 'finditer'):
+            setattr(self, method, getattr(compiled, method))
+        return getattr(compiled, name)
+
+
+_FENCE_OPEN = _LazyPattern(r'[ \t]*(`{3,}|~{3,})')
+_FENCE_CLOSE = _LazyPattern(r'[ ]{0,3}(`{3,}|~{3,})\s*$')
+# Fences nested in list items may be indented to the item's content
+_FENCE_CLOSE_NESTED = _LazyPattern(r'[ \t]*(`{3,}|~{3,})\s*$')
+_SETEXT_DASH = _LazyPattern(r'[ ]{0,3}-+\s*$')
+_FRONT_MATTER_END = _LazyPattern(r'(?:---|\.\.\.)\s*$')
+
+# Tags that start an HTML block which ends at the first blank line
+_HTML_BLOCK_TAGS = frozenset('''
+    address article aside base basefont blockquote body caption center col
+    colgroup dd details dialog dir div dl dt fieldset figcaption figure
+    footer form frame frameset h1 h2 h3 h4 h5 h6 head header hr html iframe
+    legend li link main menu menuitem nav noframes ol optgroup option p
+    param search section summary table tbody td tfoot th thead title tr
+    track ul
+'''.split())
+
+_HTML_TAG_NAME = _LazyPattern(r'[ ]{0,3}</?([A-Za-z][A-Za-z0-9-]*)(?=[\s/>]|$)')
+_HTML_RAW_OPEN = _LazyPattern(r'[ ]{0,3}<(script|pre|style|textarea)(?=[\s>]|$)', re.IGNORECASE)
+_HTML_RAW_CLOSE = _LazyPattern(r'</(?:script|pre|style|textarea)>', re.IGNORECASE)
+_HTML_COMMENT_CLOSE = _LazyPattern(r'-->')
+_HTML_PROCESSING_CLOSE = _LazyPattern(r'\?>')
+_HTML_DECLARATION_CLOSE = _LazyPattern(r'>')
+_HTML_CDATA_CLOSE = _LazyPattern(r'\]\]>')
+_HTML_LONE_TAG = _LazyPattern(
+    r'[ ]{0,3}(?:<[A-Za-z][A-Za-z0-9-]*(?:\s+[^<>]*)?/?>|</[A-Za-z][A-Za-z0-9-]*\s*>)\s*$'
+)
+
+# Bullet list item markers, recognizable without the combined pattern
+# when followed by a plain character
+_BULLETS = frozenset(['- ', '* ', '+ '])
+_ORDERED_ITEM = _LazyPattern(r'\d{1,9}[.)][ \t]+[^\s]')
+
+# Open blocks (or none) that a blank line simply closes
+_ENDED_BY_BLANK = frozenset([None, PARAGRAPH, LIST, TABLE, BLOCKQUOTE, INDENTED_CODE])
+
+# Classes that continue a paragraph, table, quote or list without starting a block
+_CONTINUATION = frozenset([None, 'indented', 'table_delim', 'setext'])
+
+
+class Block(NamedTuple):
+    """A run of lines of one kind, as found by the scanner.
+
+    ``lines`` keep their ``\\n`` terminators, and ``start`` is the index of
+    the first line in the document.
+    """
+
+    kind: str
+    start: int
+    lines: List[str]
+
+    @property
+    def end(self) -> int:
+        """Index just past the last line of the block."""
+        return self.start + len(self.lines)
+
+
+def _html_start(line: str, end: int, interrupting: bool):
+    """Decide whether a line opens an HTML block.
+
+    Returns ``(True, pattern)`` where the block ends at the first line
+    matching ``pattern``, or at a blank line when ``pattern`` is None.
+    Returns ``(False, None)`` when the line is not an HTML block start.
+    ``interrupting`` is true when a paragraph is open, which only the
+    well-known block tags may interrupt.
+    """
+    text = line[:end].lstrip(' ')
+    if text.startswith('<!--'):
+        return True, _HTML_COMMENT_CLOSE
+    if _HTML_RAW_OPEN.match(line, 0, end):
+        return True, _HTML_RAW_CLOSE
+    if text.startswith('<?'):
+        return True, _HTML_PROCESSING_CLOSE
+    if text.startswith('<![CDATA['):
+        return True, _HTML_CDATA_CLOSE
+    if text.startswith('<!') and text[2:3].isalpha():
+        return True, _HTML_DECLARATION_CLOSE
+    m = _HTML_TAG_NAME.match(line, 0, end)
+    if m and m.group(1).lower() in _HTML_BLOCK_TAGS:
+        return True, None
+    if not interrupting and _HTML_LONE_TAG.match(line, 0, end):
+        return True, None
+    return False, None
+
+
+def interrupts_paragraph(line: str) -> bool:
+    """Check whether a line would end an open paragraph or turn it into another block.
+
+    ``line`` is the line's text without its terminator. Delimiter-like
+    lines that only start a table after a line containing ``|`` count as
+    interrupting, to be safe.
+    """
+    classifier = _CLASSIFIERS[line[:1]]
+    if classifier is None:
+        return False
+    m = classifier.match(line)
+    cls = m.lastgroup if m else None
+    if cls in (None, 'indented'):
+        return False
+    if cls == 'html':
+        return _html_start(line, len(line), True)[0]
+    return True
+
+
+def starts_block(line: str) -> bool:
+    """Check whether a line, with no block open, would start anything but a paragraph.
+
+    ``line`` is the line's text without its terminator. Some lines only
+    start a block whole, like a thematic break or a lone HTML tag, so a
+    paragraph's first line can turn into one when it is cut short.
+    """
+    classifier = _CLASSIFIERS[line[:1]]
+    if classifier is None:
+        return False
+    m = classifier.match(line)
+    cls = m.lastgroup if m else None
+    if cls in (None, 'table_delim', 'setext'):
+        return False
+    if cls == 'html':
+        return _html_start(line, len(line), False)[0]
+    return True
+
+
+def block_start_extent(pieces: Sequence[str]) -> int:
+    """Return how many lines must be joined into the first so it doesn't start a block.
+
+    The lines are joined with single spaces, and ``len(pieces)`` is
+    returned when no number of them will do. This is the first count
+    for which ``starts_block`` of the joined line is false, found in one
+    pass: a heading, list item, quote, tilde fence or HTML block opener
+    goes on starting its block whatever follows, and a backtick fence
+    until a backtick follows, so only lines that can undo the start are
+    joined and checked.
+    """
+    count = 1
+    line = pieces[0] if pieces else ''
+    while count < len(pieces) and starts_block(line):
+        m = _CLASSIFIERS[line[:1]].match(line)
+        cls = m.lastgroup
+        if cls == 'fence' and '`' in m.group():
+            # Skip to the first line with a backtick to end the info string
+            count = next((k for k in range(count, len(pieces)) if '`' in pieces[k]),
+                         len(pieces) - 1)
+        elif cls in ('fence', 'heading', 'list', 'quote') or (
+                cls == 'html' and not _HTML_LONE_TAG.match(line)):
+            return len(pieces)
+        # Blank lines, thematic breaks and lone tags are only blocks whole
+        count += 1
+        line = ' '.join(pieces[:count])
+    return count
+
+
+class BlockScanner:
+    """Incremental line-by-line block scanner.
+
+    Feed lines in order with ``feed`` and collect the blocks it returns
+    as they close; call ``finish`` after the last line. ``start`` is the
+    document index of the first line fed, for scanning from the middle
+    of a document. YAML front matter is only recognized at line 0.
+    """
+
+    def __init__(self, start: int = 0):
+        self.line_number = start
+        self._kind: Optional[str] = None
+        self._start = start
+        self._lines: List[str] = []
+        self._fence = ''
+        self._fence_close = _FENCE_CLOSE
+        self._html_end: Optional[Pattern] = None
+        # A list stays open across blank lines until an unindented line
+        self._in_list = False
+
+    @property
+    def is_neutral(self) -> bool:
+        """True when no block or list is open, so scanning could restart here."""
+        return self._kind is None and not self._in_list
+
+    def _open(self, kind: str, line: str):
+        self._kind = kind
+        self._start = self.line_number
+        self._lines = [line]
+
+    def _close(self, done: List[Block]):
+        done.append(Block(self._kind, self._start, self._lines))
+        self._kind = None
+        self._lines = []
+
+    def _is_continuation(self, line: str) -> bool:
+        """Cheaply check for a line that can't end or interrupt the open block."""
+        kind = self._kind
+        if kind == PARAGRAPH:
+            return line[:1] not in _SPECIAL_START
+        if kind == FENCED_CODE:
+            return self._fence[0] not in line
+        if kind == LIST:
+            return (line[:1] not in _SPECIAL_START
+                    or (line[:2] in _BULLETS and line[2:3] not in _SPECIAL_START)
+                    or _ORDERED_ITEM.match(line) is not None)
+        return False
+
+    def feed(self, line: str) -> List[Block]:
+        """Scan one line and return any blocks it completes."""
+        done: List[Block] = []
+        if self._is_continuation(line):
+            self._lines.append(line)
+        else:
+            self._feed(line, done)
+        self.line_number += 1
+        return done
+
+    def scan(self, lines: Iterable[str]) -> Iterator[Block]:
+        """Scan lines, yielding blocks as they close, then finish."""
+        # Same as calling feed per line, with the common cases inlined and
+        # the scanner state cached in locals between slow-path lines
+        done: List[Block] = []
+        special = _SPECIAL_START
+        bullets = _BULLETS
+        ordered_item = _ORDERED_ITEM.match
+        number = self.line_number
+        kind = self._kind
+        append = self._lines.append
+        fence = self._fence[:1]
+        for line in lines:
+            if kind == PARAGRAPH:
+                if line[:1] not in special:
+                    append(line)
+                    number += 1
+                    continue
+            elif kind == FENCED_CODE:
+                if fence not in line:
+                    append(line)
+                    number += 1
+                    continue
+            elif kind == LIST:
+                if (line[:1] not in special
+                        or (line[:2] in bullets and line[2:3] not in special)
+                        or ordered_item(line)):
+                    append(line)
+                    number += 1
+                    continue
+            elif line == '\n' and kind in _ENDED_BY_BLANK:
+                if kind is not None:
+                    yield Block(kind, self._start, self._lines)
+                    self._kind = kind = None
+                    self._lines = []
+                    append = self._lines.append
+                yield Block(BLANK, number, [line])
+                number += 1
+                continue
+            self.line_number = number
+            self._feed(line, done)
+            number += 1
+            self.line_number = number
+            kind = self._kind
+            append = self._lines.append
+            fence = self._fence[:1]
+            if done:
+                yield from done
+                done = []
+        self.line_number = number
+        yield from self.finish()
+
+    def finish(self) -> List[Block]:
+        """Close the open block at the end of the input."""
+        done: List[Block] = []
+        if self._kind == FRONT_MATTER:
+            # Never closed, so it was a thematic break followed by content
+            lines = self._lines
+            self._kind = None
+            self._lines = []
+            done.append(Block(THEMATIC_BREAK, self._start, lines[:1]))
+            self.line_number = self._start + 1
+            for line in lines[1:]:
+                done.extend(self.feed(line))
+        if self._kind is not None:
+            self._close(done)
+        return done
+
+    def _feed(self, line: str, done: List[Block]):
+        end = len(line) - 1 if line.endswith('\n') else len(line)
+        kind = self._kind
+
+        # Inside verbatim blocks only the closing condition is checked
+        if kind == FENCED_CODE:
+            self._lines.append(line)
+            m = self._fence_close.match(line, 0, end)
+            if m and m.group(1).startswith(self._fence):
+                self._close(done)
+            return
+
+        if kind == FRONT_MATTER:
+            self._lines.append(line)
+            if _FRONT_MATTER_END.match(line, 0, end):
+                self._close(done)
+            return
+
+        if kind == HTML:
+            if self._html_end is not None:
+                self._lines.append(line)
+                if self._html_end.search(line, 0, end):
+                    self._close(done)
+                return
+            if line[:end].strip():
+                self._lines.append(line)
+                return
+            self._close(done)
+            kind = None
+
+        classifier = _CLASSIFIERS[line[:1]]
+        if classifier is not None:
+            m = classifier.match(line, 0, end)
+            cls = m.lastgroup if m else None
+        else:
+            cls = None
+
+        if kind == PARAGRAPH:
+            if cls in (None, 'indented'):
+                self._lines.append(line)
+                return
+            if cls == 'setext' or (cls in ('thematic', 'list', 'table_delim')
+                                   and _SETEXT_DASH.match(line, 0, end)):
+                self._lines.append(line)
+                self._kind = SETEXT_HEADING
+                self._close(done)
+                return
+            if cls == 'table_delim':
+                if '|' in line and '|' in self._lines[-1]:
+                    header = self._lines.pop()
+                    if self._lines:
+                        self._close(done)
+                    self._kind = TABLE
+                    self._start = self.line_number - 1
+                    self._lines = [header, line]
+                else:
+                    self._lines.append(line)
+                return
+            if cls == 'html' and not _html_start(line, end, True)[0]:
+                self._lines.append(line)
+                return
+            self._close(done)
+
+        elif kind == LIST:
+            if cls != 'blank':
+                if line[:1] in (' ', '\t'):
+                    fence = _FENCE_OPEN.match(line, 0, end)
+                    if fence is None:
+                        self._lines.append(line)
+                        return
+                    self._close(done)
+                    self._open_fence(line, fence.group(1), _FENCE_CLOSE_NESTED)
+                    return
+                if cls in _CONTINUATION or cls == 'list':
+                    self._lines.append(line)
+                    return
+            self._close(done)
+
+        elif kind in (TABLE, BLOCKQUOTE):
+            if cls in _CONTINUATION or (kind == BLOCKQUOTE and cls == 'quote'):
+                self._lines.append(line)
+                return
+            self._close(done)
+
+        elif kind == INDENTED_CODE:
+            if cls == 'indented':
+                self._lines.append(line)
+                return
+            self._close(done)
+
+        self._start_block(line, end, cls, done)
+
+    def _open_fence(self, line: str, marker: str, close: Pattern = None):
+        self._open(FENCED_CODE, line)
+        self._fence = marker
+        self._fence_close = close or _FENCE_CLOSE
+
+    def _start_block(self, line: str, end: int, cls: Optional[str], done: List[Block]):
+        """Classify a line that starts a new block."""
+        if cls == 'blank':
+            done.append(Block(BLANK, self.line_number, [line]))
+            return
+
+        if self._in_list:
+            if cls != 'list' and line[:1] in (' ', '\t'):
+                fence = _FENCE_OPEN.match(line, 0, end)
+                if fence is not None:
+                    self._open_fence(line, fence.group(1), _FENCE_CLOSE_NESTED)
+                else:
+                    self._open(LIST, line)
+                return
+            if cls != 'list':
+                self._in_list = False
+
+        if cls == 'fence':
+            self._open_fence(line, _FENCE_OPEN.match(line, 0, end).group(1))
+        elif cls == 'heading':
+            done.append(Block(HEADING, self.line_number, [line]))
+        elif cls == 'thematic':
+            if self.line_number == 0 and line[:end].rstrip() == '---':
+                self._open(FRONT_MATTER, line)
+            else:
+                done.append(Block(THEMATIC_BREAK, self.line_number, [line]))
+        elif cls == 'list':
+            self._open(LIST, line)
+            self._in_list = True
+        elif cls == 'quote':
+            self._open(BLOCKQUOTE, line)
+        elif cls == 'indented':
+            self._open(INDENTED_CODE, line)
+        elif cls == 'html':
+            starts, self._html_end = _html_start(line, end, False)
+            if not starts:
+                self._open(PARAGRAPH, line)
+            else:
+                self._open(HTML, line)
+                if self._html_end is not None and self._html_end.search(line, 0, end):
+                    self._close(done)
+        else:
+            self._open(PARAGRAPH, line)
+
+
+def scan_blocks(lines: Iterable[str], start: int = 0) -> Iterator[Block]:
+    """Scan lines (with ``\\n`` terminators) into blocks in a single pass."""
+    return BlockScanner(start).scan(lines)
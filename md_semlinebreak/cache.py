@@ -0,0 +1,163 @@
+"""On-disk cache of files already known to be formatted."""
+
+import json
+import os
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import __version__
+from .config import Config
+
+# Entries kept per cache file; the least recently used are evicted first
+DEFAULT_MAX_ENTRIES = 100_000
+
+# Cache files (one per config and version) kept in the cache directory
+MAX_CACHE_FILES = 16
+
+# A file changed this recently when it was recorded may change again within
+# the same timestamp tick (up to two seconds on some filesystems) and keep
+# its stat. Like git's racily clean index entries, its stat isn't trusted
+# and its content is hashed again on the next run.
+RACY_WINDOW_NS = 2 * 10**9
+
+
+def default_cache_dir() -> Path:
+    """Return the user cache directory, honouring MDFIX_CACHE_DIR and XDG."""
+    override = os.environ.get('MDFIX_CACHE_DIR')
+    if override:
+        return Path(override)
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(Path.home(), '.cache')
+    return Path(base) / 'mdfix'
+
+
+def content_hash(data: bytes) -> str:
+    """Hash file content for cache lookups."""
+    import hashlib
+    return hashlib.sha256(data).hexdigest()
+
+
+def config_key(config: Config) -> str:
+    """Derive a stable key from the package version and config values."""
+    import hashlib
+    payload = json.dumps([__version__, asdict(config)], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class Cache:
+    """Files known to be formatted under one config and package version.
+
+    Each entry maps a resolved path to
+    ``[mtime_ns, size, content_hash, ctime_ns, inode]`` of the file as it
+    was last seen formatted. A matching stat lets the file be skipped
+    without reading it; a matching content hash lets it be skipped without
+    formatting it. The ctime and inode catch rewrites that restore the
+    mtime, as ``cp -p``, ``rsync -t`` and tar do.
+
+    Files formatted under other configs, as config files can make them,
+    are looked up in the caches ``for_config`` opens beside this one.
+    """
+
+    def __init__(self, cache_dir: Path, config: Config,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.path = self.cache_dir / f"cache.{config_key(config)}.json"
+        self.max_entries = max_entries
+        self.entries: Dict[str, List] = {}
+        self._dirty = False
+        # Caches for other configs, by Config.key(), saved along with this one
+        self._siblings: Dict[tuple, 'Cache'] = {config.key(): self}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def for_config(self, config: Config) -> 'Cache':
+        """Return the cache in the same directory for files formatted under config."""
+        key = config.key()
+        cache = self._siblings.get(key)
+        if cache is None:
+            cache = self._siblings[key] = Cache(self.cache_dir, config, self.max_entries)
+        return cache
+
+    def _key(self, path: str) -> str:
+        return os.path.abspath(path)
+
+    def is_unchanged(self, path: str) -> bool:
+        """Check whether a file's stat still matches its formatted entry."""
+        entry = self.entries.get(self._key(path))
+        if entry is None:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if (entry[:2] != [st.st_mtime_ns, st.st_size]
+                or entry[3:] != [st.st_ctime_ns, st.st_ino]):
+            return False
+        self._touch(self._key(path), entry)
+        return True
+
+    def known_hash(self, path: str) -> Optional[str]:
+        """Return the content hash last recorded for a file, if any."""
+        entry = self.entries.get(self._key(path))
+        return entry[2] if entry is not None else None
+
+    def record(self, path: str, mtime_ns: int, size: int, digest: str,
+               ctime_ns: int, ino: int):
+        """Remember that a file with this stat and content is formatted.
+
+        A file changed within RACY_WINDOW_NS of now is recorded with a size
+        no stat matches, so only its content hash is trusted.
+        """
+        if time.time_ns() - max(mtime_ns, ctime_ns) < RACY_WINDOW_NS:
+            size = -1
+        self._touch(self._key(path), [mtime_ns, size, digest, ctime_ns, ino])
+
+    def _touch(self, key: str, entry: List):
+        # Re-inserting moves the entry to the most recently used end
+        self.entries.pop(key, None)
+        self.entries[key] = entry
+        self._dirty = True
+
+    def save(self):
+        """Write the cache back, evicting the least recently used entries.
+
+        Caches opened with ``for_config`` are written back too.
+        """
+        for cache in self._siblings.values():
+            if cache is not self:
+                cache._save()
+        self._save()
+
+    def _save(self):
+        if not self._dirty:
+            return
+        excess = len(self.entries) - self.max_entries
+        if excess > 0:
+            for key in list(self.entries)[:excess]:
+                del self.entries[key]
+        import tempfile
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, separators=(',', ':'))
+            os.replace(tmp, self.path)
+            self._prune()
+        except OSError:
+            # A cache that can't be written only costs speed
+            pass
+        self._dirty = False
+
+    def _prune(self):
+        """Drop the oldest cache files left behind by other configs and versions."""
+        files = sorted(
+            self.cache_dir.glob('cache.*.json'),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True,
+        )
+        for stale in files[MAX_CACHE_FILES:]:
+            stale.unlink(missing_ok=True)
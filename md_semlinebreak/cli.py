@@ -1,21 +1,156 @@
 """Command-line interface for md-semlinebreak."""
 
-import argparse
+import os
 import sys
-from pathlib import Path
-from .formatter import format_markdown, normalize_unicode
 from .config import Config
 
+# Everything else is imported where it is used: most runs format a single
+# file from an editor or commit hook, and interpreter startup dominates.
 
-def main():
+# Input files at least this large are streamed into an output file
+# rather than read whole
+STREAM_THRESHOLD = 32 * 1024 * 1024
+
+# Only inputs smaller than this are sent to a running daemon, which needs
+# them whole. Stdin's size isn't known, so up to this many characters of
+# it are read first; a longer input is streamed here.
+DAEMON_THRESHOLD = 4 * 1024 * 1024
+
+
+def main(argv=None):
     """Main CLI entry point."""
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # Plain `mdfix FILE` and `mdfix < FILE` runs skip the argument parser
+    if len(argv) <= 1 and not any(arg.startswith('-') for arg in argv):
+        if os.path.isfile(argv[0]) if argv else not sys.stdin.isatty():
+            from .configfile import ConfigResolver
+            path = argv[0] if argv else None
+            _format_one(path, None, _resolve(ConfigResolver(), path))
+            return
+
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+
+    if args.stdio and not args.serve:
+        parser.error("--stdio requires --serve")
+
+    if args.serve and (args.stats or args.stats_format or args.profile):
+        parser.error("--stats and --profile can't be used with --serve")
+
+    socket_path = None
+    if args.socket:
+        from pathlib import Path
+        socket_path = Path(args.socket)
+
+    if args.serve:
+        from .server import serve_socket, serve_stream
+        if args.stdio:
+            serve_stream(sys.stdin, sys.stdout)
+        else:
+            try:
+                serve_socket(socket_path)
+            except OSError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+        return
+
+    # Show help if no arguments provided and not reading from stdin
+    if not argv and sys.stdin.isatty():
+        parser.print_help()
+        sys.exit(0)
+    
+    # Validate arguments
+    from_git = args.changed_since is not None or args.staged
+    # --check and --diff report on files without writing them
+    dry_run = args.check or args.diff
+    mode = '--in-place' if args.in_place else '--check' if args.check else '--diff'
+
+    if args.watch:
+        if not args.inputs:
+            parser.error("--watch requires a file or directory")
+        if args.output or dry_run or from_git:
+            parser.error("--watch can't be used with --output, --check, --diff, "
+                         "--staged or --changed-since")
+    batch = (args.in_place or dry_run or from_git
+             or len(args.inputs) > 1 or any(os.path.isdir(p) for p in args.inputs))
+
+    if args.changed_since is not None and args.staged:
+        parser.error("--changed-since and --staged are mutually exclusive")
+
+    if args.in_place and dry_run:
+        parser.error(f"--in-place and {'--check' if args.check else '--diff'} are mutually exclusive")
+
+    if (args.in_place or dry_run) and not (args.inputs or from_git):
+        parser.error(f"{mode} requires an input file")
+
+    if args.output and (args.in_place or dry_run):
+        parser.error(f"{mode} and --output are mutually exclusive")
+
+    if from_git and not (args.in_place or dry_run):
+        parser.error("--changed-since and --staged require --in-place, --check or --diff")
+
+    if batch and not (args.in_place or dry_run or args.watch):
+        parser.error("multiple files or directories require --in-place, --check or --diff")
+
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    if args.debounce < 0:
+        parser.error("--debounce can't be negative")
+
+    for path in args.inputs:
+        if not os.path.exists(path):
+            print(f"Error: File '{path}' not found", file=sys.stderr)
+            sys.exit(1)
+    
+    # Options given on the command line override config files
+    from .configfile import ConfigResolver
+    overrides = {}
+    if args.max_line_length is not None:
+        overrides['max_line_length'] = args.max_line_length
+    if args.wrap:
+        overrides['wrap_long_lines'] = True
+    if args.normalize:
+        overrides['normalize_unicode'] = True
+    if args.no_clause_breaks:
+        overrides['break_at_clauses'] = False
+    resolver = ConfigResolver(overrides, discover=not args.no_config)
+
+    # Measured runs format in this process, not on the daemon
+    measured = bool(args.stats or args.stats_format or args.profile)
+    recording = _start_stats() if args.stats or args.stats_format else None
+    profiler = _start_profile() if args.profile else None
+    try:
+        if args.watch:
+            _watch(args, resolver)
+        elif batch:
+            _format_batch(args, resolver)
+        else:
+            path = args.inputs[0] if args.inputs else None
+            _format_one(path, args.output, _resolve(resolver, path),
+                        socket_path=socket_path,
+                        use_daemon=not (args.no_daemon or measured),
+                        fsync=not args.no_fsync)
+    finally:
+        if profiler is not None:
+            _report_profile(profiler)
+        if recording is not None:
+            _report_stats(recording, args.stats_format or 'text')
+
+
+def _build_parser():
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Reformat Markdown files with semantic line breaks"
     )
     parser.add_argument(
-        "input",
-        nargs="?",
-        help="Input Markdown file (default: stdin)"
+        "inputs",
+        nargs="*",
+        metavar="PATH",
+        help="Input Markdown files or directories (default: stdin)"
     )
     parser.add_argument(
         "-o", "--output",
@@ -26,6 +161,41 @@ def main():
         action="store_true",
         help="Edit file in place"
     )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Report files that would be reformatted, without writing them; "
+             "exit with status 1 if there are any"
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="Print a unified diff of the paragraphs that would change, without "
+             "writing files; with --check the exit status is still set"
+    )
+    parser.add_argument(
+        "--changed-since",
+        metavar="REF",
+        help="Only format Markdown files changed since the merge base of REF "
+             "and HEAD, including uncommitted and untracked ones"
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="Only format Markdown files staged in the git index"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and reformat files in place as they change"
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.1,
+        metavar="SECONDS",
+        help="With --watch, wait this long after a change for more before formatting (default: 0.1)"
+    )
     parser.add_argument(
         "--normalize",
         action="store_true",
@@ -34,66 +204,327 @@ def main():
     parser.add_argument(
         "--max-line-length",
         type=int,
-        default=80,
         help="Maximum line length (default: 80)"
     )
+    parser.add_argument(
+        "--wrap",
+        action="store_true",
+        help="Also wrap clauses longer than --max-line-length minus 10 at word boundaries"
+    )
     parser.add_argument(
         "--no-clause-breaks",
         action="store_true",
         help="Disable breaking at clauses (commas, semicolons, colons)"
     )
+    parser.add_argument(
+        "--no-config",
+        action="store_true",
+        help="Ignore .mdfix.toml and [tool.mdfix] in pyproject.toml, which are "
+             "otherwise looked up from each file's directory upwards"
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes for multiple files (default: CPU count)"
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="PATTERN",
+        help="Glob for files to pick up in directories (default: *.md, *.markdown)"
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="PATTERN",
+        help="Glob for files or directories to skip (repeatable)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        help="Directory for the formatted-files cache (default: ~/.cache/mdfix)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither read nor update the formatted-files cache"
+    )
+    parser.add_argument(
+        "--no-fsync",
+        action="store_true",
+        help="Don't wait for written files to reach the disk"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a formatting daemon that answers JSON-RPC requests"
+    )
+    parser.add_argument(
+        "--stdio",
+        action="store_true",
+        help="With --serve, answer requests on stdin/stdout instead of a socket"
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Unix socket of the daemon (default: in the cache directory)"
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Format in this process even if a daemon is running"
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print per-stage timings and counters to stderr"
+    )
+    parser.add_argument(
+        "--stats-format",
+        choices=["text", "json"],
+        help="Format of the --stats report (default: text; implies --stats)"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile formatting in this process and print the hot spots to stderr"
+    )
     parser.add_argument(
         "--version",
         action="version",
         version="%(prog)s 0.1.0"
     )
-    
-    args = parser.parse_args()
-    
-    # Show help if no arguments provided and not reading from stdin
-    if len(sys.argv) == 1 and sys.stdin.isatty():
-        parser.print_help()
-        sys.exit(0)
-    
-    # Validate arguments
-    if args.in_place and not args.input:
-        parser.error("--in-place requires an input file")
-    
-    if args.in_place and args.output:
-        parser.error("--in-place and --output are mutually exclusive")
-    
-    # Read input
-    if args.input:
-        input_path = Path(args.input)
-        if not input_path.exists():
-            print(f"Error: File '{args.input}' not found", file=sys.stderr)
+    return parser
+
+
+def _resolve(resolver, path) -> Config:
+    """Return the config for a file (or stdin when path is None), exiting on a bad config file."""
+    from .configfile import ConfigFileError
+    try:
+        return resolver.resolve(path)
+    except ConfigFileError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def _format_batch(args, resolver):
+    """Format or check files and directories in place, reporting a summary."""
+    from .batch import (
+        DEFAULT_EXCLUDE, DEFAULT_INCLUDE, discover_files, filter_files, run_batch,
+    )
+    from .cache import Cache, default_cache_dir
+
+    include = args.include or DEFAULT_INCLUDE
+    exclude = DEFAULT_EXCLUDE + (args.exclude or [])
+    if args.changed_since is not None or args.staged:
+        from .git import GitError, changed_files
+        try:
+            changed = changed_files(since=args.changed_since, staged=args.staged)
+        except GitError as e:
+            print(f"Error: {e}", file=sys.stderr)
             sys.exit(1)
-        text = input_path.read_text(encoding='utf-8')
+        files = list(filter_files(changed, args.inputs, include=include, exclude=exclude))
     else:
-        text = sys.stdin.read()
-    
-    # Create configuration
-    config = Config(
-        max_line_length=args.max_line_length,
-        soft_wrap_length=max(args.max_line_length - 10, 20),  # Leave some buffer
-        normalize_unicode=args.normalize,
-        break_at_clauses=not args.no_clause_breaks
-    )
-    
-    # Normalize Unicode if requested
+        files = list(discover_files(args.inputs, include=include, exclude=exclude))
+    # Every config file is read before anything is written
+    for path in files:
+        _resolve(resolver, path)
+    cache = None
+    if not args.no_cache:
+        cache = Cache(args.cache_dir or default_cache_dir(), resolver.base)
+    dry_run = args.check or args.diff
+
+    def print_diff(result):
+        if result.diff is not None:
+            sys.stdout.write(result.diff)
+
+    summary = run_batch(files, resolver.base, jobs=args.jobs, write=not dry_run, cache=cache,
+                        fsync=not args.no_fsync, diff=args.diff,
+                        on_result=print_diff if args.diff else None,
+                        resolve=resolver.resolve)
+    for result in summary.failed:
+        print(f"Error: {result.path}: {result.error}", file=sys.stderr)
+    if args.check:
+        for path in summary.changed:
+            print(f"Would reformat {path}", file=sys.stderr)
+    print(summary.report(check=dry_run), file=sys.stderr)
+    if summary.failed or (args.check and summary.changed):
+        sys.exit(1)
+
+
+def _watch(args, resolver):
+    """Reformat files in place as they change, until interrupted."""
+    from .batch import DEFAULT_EXCLUDE, DEFAULT_INCLUDE
+    from .watch import Watcher
+
+    def report(result):
+        if result.error is not None:
+            print(f"Error: {result.path}: {result.error}", file=sys.stderr)
+        elif result.changed:
+            print(f"Reformatted {result.path}", file=sys.stderr)
+
+    try:
+        watcher = Watcher(args.inputs, resolver.base, include=args.include or DEFAULT_INCLUDE,
+                          exclude=DEFAULT_EXCLUDE + (args.exclude or []),
+                          debounce=args.debounce, resolve=resolver.resolve)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    with watcher:
+        print(f"Watching {', '.join(args.inputs)} for changes ({watcher.backend}); "
+              "press Ctrl+C to stop", file=sys.stderr)
+        try:
+            watcher.run(report)
+        except KeyboardInterrupt:
+            pass
+
+
+def _start_stats():
+    """Start collecting stats, returning the hook and the list it fills."""
+    from . import stats
+
+    documents = []
+
+    def hook(path, doc):
+        documents.append((path, doc))
+
+    stats.add_hook(hook)
+    return hook, documents
+
+
+def _report_stats(recording, stats_format: str):
+    """Stop collecting stats and print the totals and per-document figures."""
+    from . import stats
+
+    hook, documents = recording
+    stats.remove_hook(hook)
+    totals = stats.Stats()
+    for _, doc in documents:
+        totals.add(doc)
+
+    if stats_format == 'json':
+        import json
+        report = {
+            'total': totals.as_dict(),
+            'documents': [{'path': path, **doc.as_dict()} for path, doc in documents],
+        }
+        print(json.dumps(report), file=sys.stderr)
+        return
+
+    print(totals.report(), file=sys.stderr)
+    if len(documents) > 1:
+        slowest = sorted(documents, key=lambda item: item[1].total_time, reverse=True)[:5]
+        print('slowest: ' + ', '.join(
+            f"{path or '<stdin>'} {doc.total_time * 1000:.1f} ms" for path, doc in slowest
+        ), file=sys.stderr)
+
+
+def _start_profile():
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _report_profile(profiler, limit: int = 25):
+    """Stop profiling and print the functions with the most cumulative time."""
+    import pstats
+    profiler.disable()
+    pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(limit)
+
+
+def _format_one(path, output, config: Config, socket_path=None, use_daemon=True,
+                fsync=True):
+    """Format one file (or stdin when path is None) to a file or stdout.
+
+    An output file is replaced atomically, and left untouched if it
+    already holds the formatted text.
+    """
+    if path and output and os.path.getsize(path) >= STREAM_THRESHOLD:
+        import io
+        from . import stats
+        from .fileio import AtomicWriter
+        with stats.document(path), open(path, encoding='utf-8') as f, \
+                AtomicWriter(output, fsync=fsync) as out:
+            writer = io.TextIOWrapper(out, encoding='utf-8', newline='')
+            _stream(f, config, writer)
+            writer.detach()
+        return
+
+    from .client import format_with_server, server_available
+
+    use_daemon = (use_daemon and (path is None or _fits_daemon(path))
+                  and server_available(socket_path))
+    text = None
+    lines = sys.stdin
+    if use_daemon and not path:
+        text, lines = _read_short(sys.stdin)
+        use_daemon = text is not None
+    if output or use_daemon:
+        if path:
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+        elif text is None:
+            text = ''.join(lines)
+        formatted = format_with_server(text, config, socket_path) if use_daemon else None
+        if formatted is None:
+            from . import stats
+            from .formatter import get_formatter
+            with stats.document(path) as doc:
+                formatter = get_formatter(config)
+                size = stats.utf8_len(text) if doc is not None else 0
+                if config.normalize_unicode:
+                    text = formatter.normalize_unicode(text)
+                formatted = formatter.format_markdown(text)
+                if doc is not None:
+                    # The input as read, not as normalized
+                    doc.bytes_in = size
+        if output:
+            from .fileio import encode_text, write_atomic
+            write_atomic(output, encode_text(formatted), fsync=fsync)
+        else:
+            sys.stdout.write(formatted)
+        return
+
+    # Stream to stdout so memory is bounded by the largest paragraph
+    from . import stats
+    with stats.document(path):
+        if path:
+            with open(path, encoding='utf-8') as f:
+                _stream(f, config)
+        else:
+            _stream(lines, config)
+
+
+def _fits_daemon(path) -> bool:
+    """Check whether a file is small enough to send to the daemon."""
+    return os.path.isfile(path) and os.path.getsize(path) < DAEMON_THRESHOLD
+
+
+def _read_short(stream):
+    """Read a text stream whole if it ends within DAEMON_THRESHOLD characters.
+
+    Returns the text and None if it does. Otherwise returns None and an
+    iterator over the stream's lines, starting with those already read.
+    """
+    head = stream.read(DAEMON_THRESHOLD)
+    if len(head) < DAEMON_THRESHOLD:
+        return head, None
+    import io
+    import itertools
+    # Finish the line the read stopped in, so lines split where the stream's do
+    return None, itertools.chain(io.StringIO(head + stream.readline()), stream)
+
+
+def _stream(lines, config: Config, out=None):
+    """Format lines from an open text stream and write them to ``out`` or stdout."""
+    from .formatter import get_formatter
+    formatter = get_formatter(config)
     if config.normalize_unicode:
-        text = normalize_unicode(text)
-    
-    # Format text
-    formatted_text = format_markdown(text, config)
-    
-    # Write output
-    if args.in_place:
-        Path(args.input).write_text(formatted_text, encoding='utf-8')
-    elif args.output:
-        Path(args.output).write_text(formatted_text, encoding='utf-8')
-    else:
-        print(formatted_text, end='')
+        # Replacements never span a newline, so lines normalize independently
+        lines = map(formatter.normalize_unicode, lines)
+    (out or sys.stdout).writelines(formatter.iter_format_markdown(lines))
 
 
 if __name__ == "__main__":
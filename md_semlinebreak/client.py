@@ -0,0 +1,81 @@
+"""Client for a running ``mdfix --serve`` daemon."""
+
+import os
+import sys
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from . import __version__
+from .cache import default_cache_dir
+from .config import Config
+
+# Seconds to wait for the daemon to accept a connection, and for an answer
+CONNECT_TIMEOUT = 1.0
+RESPONSE_TIMEOUT = 60.0
+
+
+class ServerError(Exception):
+    """An error response from the daemon."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def default_socket_path() -> Path:
+    """Return the daemon's Unix socket path, honouring MDFIX_SOCKET.
+
+    The default path includes the package version, so a client never
+    talks to a daemon that would format differently.
+    """
+    override = os.environ.get('MDFIX_SOCKET')
+    if override:
+        return Path(override)
+    return default_cache_dir() / f"server-{__version__}.sock"
+
+
+def server_available(socket_path: Optional[Path] = None) -> bool:
+    """Cheaply check whether a daemon socket exists, without connecting."""
+    path = socket_path or default_socket_path()
+    return sys.platform != 'win32' and os.path.exists(path)
+
+
+def request(method: str, params: Optional[Dict[str, Any]] = None,
+            socket_path: Optional[Path] = None) -> Any:
+    """Send one request to the daemon and return its result.
+
+    Raises OSError if no daemon is listening and ServerError if the
+    daemon answers with an error.
+    """
+    # Imported here so that runs without a daemon never load them
+    import json
+    import socket
+
+    path = socket_path or default_socket_path()
+    message = {'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params or {}}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(str(path))
+        sock.settimeout(RESPONSE_TIMEOUT)
+        sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError(f"{path}: daemon closed the connection")
+    response = json.loads(line)
+    if 'error' in response:
+        raise ServerError(response['error']['code'], response['error']['message'])
+    return response['result']
+
+
+def format_with_server(text: str, config: Config,
+                       socket_path: Optional[Path] = None) -> Optional[str]:
+    """Format Markdown with a running daemon, or return None if there is none."""
+    if not server_available(socket_path):
+        return None
+    try:
+        return request('format', {'text': text, 'config': asdict(config)}, socket_path)
+    except (OSError, ValueError, KeyError, ServerError):
+        # A stale socket or a broken daemon just means formatting locally
+        return None
@@ -1,7 +1,18 @@
 """Configuration settings for md-semlinebreak."""
 
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, fields
+from typing import Dict, List
+
+# Built-in conjunction lists, by language code
+CONJUNCTIONS: Dict[str, List[str]] = {
+    'en': ['and', 'but', 'or', 'yet', 'so', 'for', 'nor'],
+    'de': ['und', 'aber', 'oder', 'doch', 'denn', 'sondern'],
+    'es': ['y', 'e', 'pero', 'o', 'u', 'ni', 'sino'],
+    'fr': ['et', 'mais', 'ou', 'donc', 'or', 'ni', 'car'],
+    'it': ['e', 'ma', 'o', 'oppure', 'né', 'però'],
+    'nl': ['en', 'maar', 'of', 'want', 'dus', 'noch'],
+    'pt': ['e', 'mas', 'ou', 'nem', 'porém'],
+}
 
 
 @dataclass
@@ -11,20 +22,35 @@ class Config:
     # Line length settings
     max_line_length: int = 80
     soft_wrap_length: int = 70
+
+    # Wrap clauses longer than soft_wrap_length at word boundaries, keeping
+    # lines within max_line_length where the words allow
+    wrap_long_lines: bool = False
     
     # Breaking behavior
     break_at_conjunctions: bool = True
     break_at_clauses: bool = True
     break_at_sentences: bool = True
+
+    # Also break after a dash (--, en or em dash) when a conjunction follows
+    break_at_dashes: bool = False
     
     # Punctuation that triggers clause breaks
     clause_break_punctuation: List[str] = None
     
     # Conjunctions that can trigger breaks (only after punctuation)
     conjunction_words: List[str] = None
+
+    # Language of the built-in conjunction list used when conjunction_words
+    # isn't given, and whether conjunctions must match its case exactly
+    conjunction_language: str = 'en'
+    conjunction_case_sensitive: bool = False
     
     # Unicode normalization
     normalize_unicode: bool = False
+
+    # Extra replacements applied by normalization, overriding the built-in table
+    unicode_replacements: Dict[str, str] = None
     
     def __post_init__(self):
         """Set default values for mutable fields."""
@@ -32,7 +58,35 @@ class Config:
             self.clause_break_punctuation = [',', ':', ';']
             
         if self.conjunction_words is None:
-            self.conjunction_words = ['and', 'but', 'or', 'yet', 'so', 'for', 'nor']
+            if self.conjunction_language not in CONJUNCTIONS:
+                raise ValueError(f"no conjunction list for language {self.conjunction_language!r}; "
+                                 f"choose from {', '.join(sorted(CONJUNCTIONS))} "
+                                 f"or give conjunction_words")
+            self.conjunction_words = list(CONJUNCTIONS[self.conjunction_language])
+
+        if self.unicode_replacements is None:
+            self.unicode_replacements = {}
+        # Normalization is applied line by line, so it must keep every newline
+        for pair in self.unicode_replacements.items():
+            if any('\n' in s or '\r' in s for s in pair):
+                raise ValueError(f"unicode_replacements can't replace or insert line breaks: "
+                                 f"{pair[0]!r} = {pair[1]!r}")
+
+    def key(self) -> tuple:
+        """Return a hashable snapshot of the field values.
+
+        Equal configs give equal keys, so the key can index caches of
+        compiled formatters.
+        """
+        values = []
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if isinstance(value, list):
+                value = tuple(value)
+            elif isinstance(value, dict):
+                value = tuple(sorted(value.items()))
+            values.append(value)
+        return tuple(values)
 
 
 # Default configuration instance
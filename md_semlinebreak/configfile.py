@@ -0,0 +1,192 @@
+"""Settings from config files next to the Markdown being formatted.
+
+A file takes its settings from the nearest directory at or above it
+that has an ``.mdfix.toml``, or a ``pyproject.toml`` with a
+``[tool.mdfix]`` table; ``.mdfix.toml`` wins when a directory has both.
+Only that one file applies, and options given on the command line
+override it. Keys are ``Config`` field names, with dashes or
+underscores::
+
+    [tool.mdfix]
+    max-line-length = 100
+    break-at-clauses = false
+"""
+
+import os
+from dataclasses import fields
+from typing import Any, Dict, Optional, get_origin
+
+from .config import Config
+
+# Config file names looked for in each directory, the first found winning
+CONFIG_FILES = ('.mdfix.toml', 'pyproject.toml')
+
+_FIELD_TYPES = {f.name: f.type for f in fields(Config)}
+
+_TYPE_NAMES = {
+    int: "an integer",
+    bool: "true or false",
+    str: "a string",
+    list: "a list of strings",
+    dict: "a table of strings",
+}
+
+
+class ConfigFileError(ValueError):
+    """A config file can't be read, or sets options Config doesn't take."""
+
+
+def _toml_module():
+    """Return the TOML reader available, or None on Python 3.10 without tomli."""
+    try:
+        import tomllib
+    except ImportError:
+        # Python 3.10
+        try:
+            import tomli as tomllib
+        except ImportError:
+            return None
+    return tomllib
+
+
+def _load_toml(path: str) -> Dict[str, Any]:
+    tomllib = _toml_module()
+    if tomllib is None:
+        raise ConfigFileError(f"{path}: reading config files on Python 3.10 "
+                              f"needs the tomli package")
+    try:
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigFileError(f"{path}: {e}") from None
+
+
+def _valid(value: Any, expected: type) -> bool:
+    """Check a TOML value against a Config field type."""
+    origin = get_origin(expected)
+    if origin is list:
+        return isinstance(value, list) and all(isinstance(item, str) for item in value)
+    if origin is dict:
+        return isinstance(value, dict) and all(isinstance(item, str)
+                                               for pair in value.items() for item in pair)
+    if expected is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, expected)
+
+
+def read_config_file(path: str) -> Optional[Dict[str, Any]]:
+    """Return the options a config file sets, keyed by Config field name.
+
+    Returns None for a ``pyproject.toml`` without a ``[tool.mdfix]``
+    table. Raises ConfigFileError if the file isn't valid TOML, or sets
+    an option Config doesn't have or a value of the wrong type.
+    """
+    data = _load_toml(path)
+    if os.path.basename(path) == 'pyproject.toml':
+        data = data.get('tool', {}).get('mdfix')
+        if data is None:
+            return None
+        if not isinstance(data, dict):
+            raise ConfigFileError(f"{path}: tool.mdfix must be a table")
+    options = {}
+    for key, value in data.items():
+        name = key.replace('-', '_')
+        expected = _FIELD_TYPES.get(name)
+        if expected is None:
+            raise ConfigFileError(f"{path}: unknown option {key!r}")
+        if not _valid(value, expected):
+            raise ConfigFileError(f"{path}: {key} must be "
+                                  f"{_TYPE_NAMES[get_origin(expected) or expected]}")
+        options[name] = value
+    return options
+
+
+def make_config(options: Dict[str, Any]) -> Config:
+    """Build a Config from options as the command line does.
+
+    Without a ``soft_wrap_length``, one is derived from
+    ``max_line_length`` so wrapped lines leave some room.
+    """
+    options = dict(options)
+    if 'max_line_length' in options and 'soft_wrap_length' not in options:
+        options['soft_wrap_length'] = max(options['max_line_length'] - 10, 20)
+    return Config(**options)
+
+
+class ConfigResolver:
+    """Finds the config for each file, reading each config file once.
+
+    ``overrides`` are options that win over config files, such as those
+    given on the command line; without ``discover``, every file gets
+    just those. The nearest config file is looked up once per directory,
+    and files whose settings come out equal share one Config object, so
+    a batch compiles one formatter per distinct config.
+    """
+
+    def __init__(self, overrides: Optional[Dict[str, Any]] = None, discover: bool = True):
+        self.overrides = dict(overrides or {})
+        self.discover = discover
+        # The config of files no config file applies to
+        self.base = make_config(self.overrides)
+        # Directory -> the config file that applies in it
+        self._nearest: Dict[str, Optional[str]] = {}
+        # Config file -> the options it sets, or None if it isn't for mdfix
+        self._options: Dict[str, Optional[Dict[str, Any]]] = {}
+        # Config file -> its resolved config
+        self._configs: Dict[Optional[str], Config] = {None: self.base}
+        # Config.key() -> the one Config with those settings
+        self._shared: Dict[tuple, Config] = {self.base.key(): self.base}
+
+    def _applies(self, path: str) -> bool:
+        """Check whether a config file exists and is for mdfix, reading it once.
+
+        Without a TOML reader, a ``pyproject.toml`` is skipped, as most
+        aren't for mdfix; an ``.mdfix.toml`` is an error.
+        """
+        if path not in self._options:
+            if not os.path.isfile(path) or (os.path.basename(path) == 'pyproject.toml'
+                                            and _toml_module() is None):
+                self._options[path] = None
+            else:
+                self._options[path] = read_config_file(path)
+        return self._options[path] is not None
+
+    def config_file(self, directory: str) -> Optional[str]:
+        """Return the config file that applies in a directory, if any."""
+        if not self.discover:
+            return None
+        directory = os.path.abspath(directory)
+        visited = []
+        found = None
+        while True:
+            if directory in self._nearest:
+                found = self._nearest[directory]
+                break
+            visited.append(directory)
+            found = next((path for path in (os.path.join(directory, name) for name in CONFIG_FILES)
+                          if self._applies(path)), None)
+            parent = os.path.dirname(directory)
+            if found is not None or parent == directory:
+                break
+            directory = parent
+        for directory in visited:
+            self._nearest[directory] = found
+        return found
+
+    def resolve(self, path: Optional[str] = None) -> Config:
+        """Return the config for a file, or for standard input with None.
+
+        Standard input is formatted with the config of the current
+        directory. Raises ConfigFileError if the config file that applies
+        is invalid.
+        """
+        directory = os.path.dirname(os.path.abspath(path)) if path is not None else os.getcwd()
+        config_file = self.config_file(directory)
+        config = self._configs.get(config_file)
+        if config is None:
+            try:
+                config = make_config({**self._options[config_file], **self.overrides})
+            except ValueError as e:
+                raise ConfigFileError(f"{config_file}: {e}") from None
+            config = self._configs[config_file] = self._shared.setdefault(config.key(), config)
+        return config
@@ -0,0 +1,45 @@
+"""Unified diffs of the blocks formatting would change."""
+
+import io
+from typing import Iterable, Iterator, List
+
+from .formatter import Change
+
+
+def _range(start: int, count: int) -> str:
+    # As difflib writes them: 1-based, and an empty range names the line before
+    if count == 1:
+        return str(start + 1)
+    if count == 0:
+        return f"{start},0"
+    return f"{start + 1},{count}"
+
+
+def _hunk_lines(prefix: str, lines: List[str]) -> Iterator[str]:
+    for line in lines:
+        if line.endswith('\n'):
+            yield prefix + line
+        else:
+            yield prefix + line + '\n'
+            yield '\\ No newline at end of file\n'
+
+
+def unified_diff(changes: Iterable[Change], fromfile: str = 'a',
+                 tofile: str = 'b') -> Iterator[str]:
+    """Yield the lines of a unified diff with one hunk per changed block.
+
+    Each hunk is a whole block, typically a paragraph, without context
+    lines around it. Nothing is yielded when there are no changes.
+    """
+    offset = 0
+    for i, change in enumerate(changes):
+        if i == 0:
+            yield f"--- {fromfile}\n"
+            yield f"+++ {tofile}\n"
+        # StringIO splits on '\n' only, unlike str.splitlines
+        formatted = list(io.StringIO(change.formatted))
+        yield (f"@@ -{_range(change.start, len(change.lines))} "
+               f"+{_range(change.start + offset, len(formatted))} @@\n")
+        yield from _hunk_lines('-', change.lines)
+        yield from _hunk_lines('+', formatted)
+        offset += len(formatted) - len(change.lines)
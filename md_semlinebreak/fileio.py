@@ -0,0 +1,139 @@
+"""Atomic, write-only-if-changed file output."""
+
+import os
+import stat
+import tempfile
+from typing import BinaryIO, Iterable, Optional
+
+
+def encode_text(text: str) -> bytes:
+    """Encode formatted text the way writing it in text mode would."""
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    return text.encode('utf-8')
+
+
+def _default_mode() -> int:
+    """Return the permissions a new file gets under the current umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+class AtomicWriter:
+    """Binary file that replaces ``path`` in one step when closed.
+
+    Content goes to a temporary file in the same directory, which is
+    renamed over ``path`` on a clean exit, so readers see either the old
+    file or the new one and never a partial write. The file keeps its
+    permissions, and a symlink is written through rather than replaced.
+    Unless ``compare`` is false, a file that already holds the new content
+    is left untouched (mtime included) and ``written`` stays false.
+    """
+
+    def __init__(self, path: str, fsync: bool = True, compare: bool = True):
+        # Replace the file a symlink points to, not the link
+        self.path = os.path.realpath(path)
+        self.fsync = fsync
+        self.compare = compare
+        self.written = False
+        self.file: Optional[BinaryIO] = None
+        self._tmp: Optional[str] = None
+
+    def __enter__(self) -> BinaryIO:
+        directory, name = os.path.split(self.path)
+        fd, self._tmp = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix='.tmp')
+        self.file = os.fdopen(fd, 'wb')
+        return self.file
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._commit()
+        finally:
+            self.file.close()
+            if self._tmp is not None:
+                try:
+                    os.unlink(self._tmp)
+                except FileNotFoundError:
+                    pass
+
+    def _commit(self):
+        self.file.flush()
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            mode = _default_mode()
+        else:
+            if (self.compare and st.st_size == os.fstat(self.file.fileno()).st_size
+                    and _same_content(self.path, self._tmp)):
+                return
+            mode = stat.S_IMODE(st.st_mode)
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.file.close()
+        os.chmod(self._tmp, mode)
+        os.replace(self._tmp, self.path)
+        self._tmp = None
+        self.written = True
+        if self.fsync:
+            sync_directory(os.path.dirname(self.path))
+
+
+def _same_content(path: str, other: str) -> bool:
+    import filecmp
+    return filecmp.cmp(path, other, shallow=False)
+
+
+def write_atomic(path: str, data: bytes, fsync: bool = True, compare: bool = True) -> bool:
+    """Replace a file's content atomically, unless it already holds ``data``.
+
+    Returns whether the file was written. Callers that already know the
+    content differs pass ``compare=False`` to skip reading the file.
+    """
+    if compare:
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == len(data) and f.read() == data:
+                    return False
+        except FileNotFoundError:
+            pass
+    writer = AtomicWriter(path, fsync=fsync, compare=False)
+    with writer as f:
+        f.write(data)
+    return writer.written
+
+
+def sync_directory(directory: str):
+    """Flush a directory entry, making renames within it durable."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        # Directories can't be opened for syncing on Windows
+        return
+    fd = os.open(directory or os.curdir, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def sync_files(paths: Iterable[str]):
+    """Flush files written without fsync to disk, and their directories.
+
+    Batch runs write every file first and sync them all here at the end:
+    the kernel can then write the data out together, instead of the run
+    waiting on the disk once per file.
+    """
+    directories = set()
+    for path in paths:
+        path = os.path.realpath(path)
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            continue
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        directories.add(os.path.dirname(path))
+    for directory in sorted(directories):
+        sync_directory(directory)
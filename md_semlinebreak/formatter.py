@@ -1,11 +1,42 @@
 """Semantic line break formatter for Markdown."""
 
+import copy
+import io
 import re
+from itertools import islice
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from . import stats
+from .blocks import (
+    PARAGRAPH, Block, BlockScanner, block_start_extent, interrupts_paragraph, starts_block,
+)
 from .config import Config, DEFAULT_CONFIG
+from .inline import SPAN_START, SpanCursor, protected_spans
 
 # Compile regex patterns at module level
 SENTENCE_ENDINGS = re.compile(r'([.!?])\s+')
-CODE_FENCE_PATTERN = re.compile(r'^```')
+_SENTENCE_PUNCTUATION = '.!?'
+_NON_SPACE = re.compile(r'\S')
+_WORD = re.compile(r'\S+')
+
+# Punctuation that only breaks a line before a conjunction: any clause
+# punctuation left out of clause_break_punctuation, and dashes with
+# break_at_dashes. Closing quotes and brackets end noun phrases as often
+# as clauses, so they don't count. A conjunction is a whole word, not
+# the start of a hyphenated or contracted one.
+_CONJUNCTION_PUNCTUATION = (',', ';', ':')
+_DASHES = ('--', '\u2013', '\u2014')
+_LEADING_WORD = re.compile(r"\w+(?![\w'\u2019-])")
+
+# Line wrapping costs. A line costs its squared distance from the soft
+# limit, times _OVERFLOW_WEIGHT past it and another _OVERLONG_WEIGHT past
+# the hard limit: a convex function of the line's width, which the
+# line breaking relies on. A break costs _WORD_BREAK_PENALTY unless it
+# falls before a conjunction, and _OVERLONG_WEIGHT if the next line would
+# start a new block.
+_OVERFLOW_WEIGHT = 4
+_OVERLONG_WEIGHT = 10**6
+_WORD_BREAK_PENALTY = 40
 
 # Character replacement mappings
 UNICODE_REPLACEMENTS = {
@@ -46,121 +77,699 @@ UNICODE_REPLACEMENTS = {
 }
 
 
-def normalize_unicode(text: str) -> str:
-    """Convert Unicode characters to plain ASCII equivalents for Markdown."""
-    for unicode_char, replacement in UNICODE_REPLACEMENTS.items():
-        text = text.replace(unicode_char, replacement)
-    return text
+def _lstrip_offset(text: str, start: int, end: int) -> int:
+    """Return the offset of the first non-whitespace character in text[start:end]."""
+    if start < end and not text[start].isspace():
+        return start
+    m = _NON_SPACE.search(text, start, end)
+    return m.start() if m else end
 
 
-def _format_clauses(text: str, config: Config = DEFAULT_CONFIG) -> str:
-    """Format clauses within a sentence."""
-    if not config.break_at_clauses:
-        return text
-        
-    # Create clause breaks pattern from config
-    punct_pattern = r'([' + ''.join(re.escape(p) for p in config.clause_break_punctuation) + r'])\s+'
-    clause_breaks = re.compile(punct_pattern)
-    
-    parts = clause_breaks.split(text)
-    formatted_parts = []
-    current_part = ""
-
-    for i, part in enumerate(parts):
-        if i % 2 == 0:  # Text part
-            current_part += part
-        else:  # Punctuation part
-            current_part += part
-            # Always break after clause punctuation
-            if current_part.strip():
-                formatted_parts.append(current_part.strip())
-            current_part = ""
-
-    # Handle remaining text
-    if current_part.strip():
-        formatted_parts.append(current_part.strip())
-
-    return '\n'.join(formatted_parts)
-
-
-def _format_sentence(sentence: str, config: Config = DEFAULT_CONFIG) -> str:
-    """Format a single sentence with semantic breaks."""
-    # Only break at major clause boundaries, not simple compound phrases
-    # Look for conjunctions that follow commas or are at the start of major clauses
-    
-    # First, handle clause breaks (commas, semicolons, colons)
-    return _format_clauses(sentence, config)
+def _rstrip_offset(text: str, start: int, end: int) -> int:
+    """Return the offset just past the last non-whitespace character in text[start:end]."""
+    if end > start and text[end - 1].isspace():
+        # Rare enough that copying the span once beats a per-character loop
+        return start + len(text[start:end].rstrip())
+    return end
 
 
-def format_paragraph(paragraph: str, config: Config = DEFAULT_CONFIG) -> str:
-    """Format a single paragraph with semantic line breaks."""
-    if not paragraph.strip():
-        return paragraph
+def _join_lines(pieces: List[str]) -> str:
+    """Join the lines of a formatted paragraph.
 
-    lines = []
-    current_line = ""
+    A line that would read back as a heading, list item, fence or other
+    block would split the paragraph when the output is formatted again,
+    so it stays on the previous line instead. The first line, once cut
+    short, can start a block by itself (a fence whose info string used
+    to hold a backtick, a lone HTML tag), so it takes the next line on.
+    """
+    if len(pieces) > 1 and starts_block(pieces[0]):
+        count = block_start_extent(pieces)
+        pieces = [' '.join(pieces[:count])] + pieces[count:]
+    parts = None
+    for i, piece in enumerate(islice(pieces, 1, None), 1):
+        if interrupts_paragraph(piece):
+            if parts is None:
+                parts = ['\n'.join(pieces[:i])]
+            parts.append(' ')
+        elif parts is not None:
+            parts.append('\n')
+        if parts is not None:
+            parts.append(piece)
+    return '\n'.join(pieces) if parts is None else ''.join(parts)
 
-    # Split on sentence endings first
-    sentences = SENTENCE_ENDINGS.split(paragraph)
 
-    for i, part in enumerate(sentences):
-        if i % 2 == 0:  # Text part
-            if part.strip():
-                current_line += part.strip()
-        else:  # Punctuation part
-            current_line += part
-            if current_line.strip():
-                lines.append(_format_sentence(current_line.strip(), config))
-            current_line = ""
+def _line_cost(width: int, target: int, limit: int) -> int:
+    """Return the cost of a line ``width`` columns wide."""
+    if width <= target:
+        return (target - width) ** 2
+    cost = _OVERFLOW_WEIGHT * (width - target) ** 2
+    if width > limit:
+        cost += _OVERLONG_WEIGHT * (width - limit) ** 2
+    return cost
 
-    # Handle remaining text
-    if current_line.strip():
-        lines.append(_format_sentence(current_line.strip(), config))
 
-    return '\n'.join(lines)
+def _break_lines(lengths: List[int], target: int, limit: int, penalties: List[int]) -> List[int]:
+    """Choose where to break a run of words into lines of minimum raggedness.
 
+    ``lengths`` are the word lengths, which are joined by single spaces,
+    and ``penalties[j]`` is the cost of breaking before word ``j``. The
+    total is the sum of every line's ``_line_cost`` and the penalties of
+    the breaks taken, except that a last line within ``target`` is free.
+    Returns the indices of the words that start a new line.
 
-def format_markdown(text: str, config: Config = DEFAULT_CONFIG) -> str:
-    """Format entire Markdown text with semantic line breaks."""
-    lines = text.split('\n')
-    result_lines = []
-    current_paragraph = []
-    in_code_block = False
-
-    for line in lines:
-        # Handle code blocks
-        if CODE_FENCE_PATTERN.match(line):
-            if current_paragraph:
-                result_lines.append(format_paragraph(' '.join(current_paragraph), config))
-                current_paragraph = []
-            in_code_block = not in_code_block
-            result_lines.append(line)
-            continue
+    Because a line's cost is a convex function of its width, a later
+    break that beats an earlier one as the start of some line keeps
+    beating it for every line ending further on. Candidates are kept in
+    a queue, each with the first word it is best for, and a new one
+    finds where it takes over by galloping and binary search: O(n log n)
+    in all, rather than trying every earlier break for every word.
+    """
+    n = len(lengths)
+    # Columns before each word, and at the end of each word
+    starts = [0] * n
+    ends = [0] * n
+    pos = 0
+    for j, length in enumerate(lengths):
+        starts[j] = pos
+        pos += length
+        ends[j] = pos
+        pos += 1
 
-        if in_code_block:
-            result_lines.append(line)
+    def cost(i: int, j: int) -> int:
+        # Breaking before word i and word j: a line of words i..j-1.
+        # This is _line_cost inlined, as the hot spot of the search.
+        width = ends[j - 1] - starts[i]
+        if width <= target:
+            return best[i] + (target - width) ** 2
+        return best[i] + _line_cost(width, target, limit)
+
+    best = [0] * n
+    previous = [0] * n
+    candidates = [0]
+    takes_over = [1]
+    head = 0
+    for j in range(1, n):
+        while head + 1 < len(candidates) and takes_over[head + 1] <= j:
+            head += 1
+        i = candidates[head]
+        best[j] = cost(i, j) + penalties[j]
+        previous[j] = i
+        if j + 1 == n:
+            break
+
+        # Drop the candidates that j beats from the start of their range
+        while len(candidates) > head:
+            x = takes_over[-1]
+            if x <= j:
+                x = j + 1
+            if cost(j, x) > cost(candidates[-1], x):
+                break
+            candidates.pop()
+            takes_over.pop()
+        if len(candidates) == head:
+            candidates.append(j)
+            takes_over.append(j + 1)
             continue
 
-        # Handle other special lines (headers, lists, etc.)
-        if (line.startswith('#') or
-            line.startswith('- ') or
-            line.startswith('* ') or
-            re.match(r'^\d+\. ', line) or
-            line.startswith('> ') or
-            not line.strip()):
+        # j loses at lo - 1. Takeovers are usually within a line or so of
+        # it, so gallop out from there, then bisect
+        rival = candidates[-1]
+        lo = max(takes_over[-1], j + 1) + 1
+        step = 1
+        hi = lo
+        while hi < n and cost(j, hi) > cost(rival, hi):
+            lo = hi + 1
+            hi += step
+            step *= 2
+        if hi > n:
+            hi = n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if cost(j, mid) <= cost(rival, mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        if lo < n:
+            candidates.append(j)
+            takes_over.append(lo)
+
+    # A short last line is free, which the convexity doesn't cover. The
+    # last line only gets costlier the earlier it starts, so the search
+    # stops once it alone costs more than the best total so far.
+    last = n
+    least = None
+    for i in range(n - 1, -1, -1):
+        width = ends[-1] - starts[i]
+        line = 0 if width <= target else _line_cost(width, target, limit)
+        if least is not None and line >= least:
+            break
+        if least is None or best[i] + line < least:
+            last, least = i, best[i] + line
+    breaks = []
+    while last:
+        breaks.append(last)
+        last = previous[last]
+    breaks.reverse()
+    return breaks
 
-            # Format accumulated paragraph
-            if current_paragraph:
-                result_lines.append(format_paragraph(' '.join(current_paragraph), config))
-                current_paragraph = []
 
-            result_lines.append(line)
+def _glue_spans(words: List[Tuple[int, int]], spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge the words of each protected span into one, so wrapping can't split it."""
+    inside = SpanCursor(spans)
+    glued = []
+    for start, end in words:
+        # The whitespace before a word is inside a span with the word
+        if glued and inside(start - 1):
+            glued[-1] = (glued[-1][0], end)
         else:
-            # Accumulate paragraph text
-            current_paragraph.append(line.strip())
+            glued.append((start, end))
+    return glued
+
+
+def _breaks_span(lines: List[str]) -> bool:
+    """Check whether a line of a paragraph ends inside a protected span."""
+    texts = [line.rstrip('\n') for line in lines]
+    inside = SpanCursor(protected_spans(' '.join(texts)))
+    pos = -1
+    for text in texts[:-1]:
+        pos += len(text) + 1
+        if inside(pos):
+            return True
+    return False
+
+
+class Change(NamedTuple):
+    """A block that formatting would change."""
+
+    # Index of the block's first line in the document
+    start: int
+    # The block's lines as given, with their newlines
+    lines: List[str]
+    # What formatting turns them into
+    formatted: str
+
+
+class _Normalizer:
+    """Unicode normalization compiled once from a replacement table.
+
+    When every key is a single non-ASCII character and every replacement
+    is ASCII, no replacement can create another key, so applying them in
+    turn with ``str.replace`` gives the same result as a single pass. That
+    is the fastest strategy in CPython: ``str.replace`` scans with a fast
+    search and returns the input itself when the character is absent.
+    Any other table (multi-character keys, non-ASCII replacements) is
+    applied in one pass with a compiled alternation, longest key first.
+    """
+
+    def __init__(self, replacements: Dict[str, str]):
+        self.replacements = dict(replacements)
+        # Text with no non-ASCII characters can't contain a non-ASCII key
+        self.skip_ascii = all(not key.isascii() for key in self.replacements)
+        if (self.skip_ascii
+                and all(len(key) == 1 for key in self.replacements)
+                and all(value.isascii() for value in self.replacements.values())):
+            self._items = tuple(self.replacements.items())
+            self._apply = self._replace_each
+        else:
+            keys = sorted(self.replacements, key=len, reverse=True)
+            self._pattern = re.compile('|'.join(re.escape(key) for key in keys))
+            self._apply = self._substitute
+
+    def __call__(self, text: str) -> str:
+        if self.skip_ascii and text.isascii():
+            return text
+        return self._apply(text)
+
+    def _replace_each(self, text: str) -> str:
+        for unicode_char, replacement in self._items:
+            text = text.replace(unicode_char, replacement)
+        return text
+
+    def _substitute(self, text: str) -> str:
+        if not self.replacements:
+            return text
+        lookup = self.replacements.__getitem__
+        return self._pattern.sub(lambda m: lookup(m.group()), text)
+
+
+_DEFAULT_NORMALIZER = _Normalizer(UNICODE_REPLACEMENTS)
+
+
+class Formatter:
+    """Semantic line break formatter compiled from one configuration.
+
+    Every pattern and lookup derived from the config is built once here,
+    so a Formatter can be reused across any number of documents. Use
+    ``get_formatter`` to share instances between equal configs.
+    """
+
+    def __init__(self, config: Config = DEFAULT_CONFIG):
+        # Snapshot the config so later edits to it can't desync the patterns
+        self.config = copy.deepcopy(config)
+
+        self._fold_case = not config.conjunction_case_sensitive
+        self._conjunctions = frozenset()
+        if config.break_at_conjunctions:
+            self._conjunctions = frozenset(word.lower() if self._fold_case else word
+                                           for word in config.conjunction_words)
+
+        # Clause punctuation and the last characters of conjunction
+        # punctuation share one character class, so both are found in the
+        # same pass, as fast as clause punctuation alone. Only the rare
+        # match that isn't clause punctuation looks at the next word.
+        self._clause_chars = frozenset()
+        self._conjunction_ends = ()
+        if config.break_at_clauses:
+            self._clause_chars = frozenset(''.join(config.clause_break_punctuation))
+            if self._conjunctions:
+                # A mark sharing a character with clause punctuation would
+                # hide the clause break it overlaps
+                marks = _CONJUNCTION_PUNCTUATION + (_DASHES if config.break_at_dashes else ())
+                self._conjunction_ends = tuple(p for p in marks
+                                               if not self._clause_chars & set(p))
+        self._clause_breaks = None
+        chars = self._clause_chars | {p[-1] for p in self._conjunction_ends}
+        if chars:
+            punct = ''.join(re.escape(p) for p in sorted(chars))
+            self._clause_breaks = re.compile(r'([' + punct + r'])\s+')
+
+        # Characters a line ends with when it ends at a clause or sentence break
+        self._break_chars = frozenset(_SENTENCE_PUNCTUATION)
+        if config.break_at_clauses:
+            self._break_chars |= frozenset(''.join(config.clause_break_punctuation))
+
+        self._wrap_width = None
+        if config.wrap_long_lines:
+            self._wrap_width = min(config.soft_wrap_length, config.max_line_length)
+            self._wrap_limit = max(config.soft_wrap_length, config.max_line_length)
+
+        if config.unicode_replacements:
+            self._normalizer = _Normalizer({**UNICODE_REPLACEMENTS, **config.unicode_replacements})
+        else:
+            self._normalizer = _DEFAULT_NORMALIZER
+
+        self._instrumented = None
+
+    def normalize_unicode(self, text: str) -> str:
+        """Convert Unicode characters to plain ASCII equivalents for Markdown."""
+        return self._normalizer(text)
+
+    def _is_conjunction(self, word: str) -> bool:
+        return (word.lower() if self._fold_case else word) in self._conjunctions
+
+    def _clause_break_in(self, text: str) -> bool:
+        """Check whether text has a clause or conjunction break inside it."""
+        for m in self._clause_breaks.finditer(text):
+            punct, word_start = m.span()
+            if text[punct] in self._clause_chars:
+                return True
+            word = _LEADING_WORD.match(text, word_start)
+            if (word is not None and self._is_conjunction(word.group())
+                    and text.endswith(self._conjunction_ends, 0, punct + 1)):
+                return True
+        return False
+
+    def _add_sentence(self, text: str, start: int, end: int, punct: int, pieces: List[str],
+                      protected: Optional[SpanCursor] = None):
+        """Append the clause lines of one sentence to ``pieces``.
+
+        The sentence is ``text[start:end]`` with surrounding whitespace
+        already trimmed, followed by the sentence punctuation at offset
+        ``punct`` (or ``-1`` for a trailing sentence without any). Clause
+        breaks and conjunction breaks are found in the same pass by
+        offset, and each line is sliced out once. ``protected`` tells
+        which offsets are inside protected spans, where punctuation
+        isn't a break.
+        """
+        pos = start
+        clause_breaks = self._clause_breaks
+        if clause_breaks is not None:
+            append = pieces.append
+            clause_chars = self._clause_chars
+            conjunctions = self._conjunctions
+            fold_case = self._fold_case
+            leading_word = _LEADING_WORD.match
+            for m in clause_breaks.finditer(text, start, end):
+                # Always break after clause punctuation, which starts the match
+                punct_start, pos_next = m.span()
+                if text[punct_start] not in clause_chars:
+                    # Other punctuation only breaks before a conjunction
+                    word = leading_word(text, pos_next, end)
+                    if word is None:
+                        continue
+                    word = word.group()
+                    if ((word.lower() if fold_case else word) not in conjunctions
+                            or not text.endswith(self._conjunction_ends, start, punct_start + 1)):
+                        continue
+                if protected is not None and protected(punct_start + 1):
+                    continue
+                append(text[pos:punct_start + 1])
+                pos = pos_next
+
+        if punct < 0:
+            pieces.append(text[pos:end])
+        elif punct == end:
+            pieces.append(text[pos:punct + 1])
+        else:
+            # Whitespace before the sentence punctuation is dropped
+            pieces.append(text[pos:end] + text[punct])
+
+    def _wrap(self, pieces: List[str]) -> List[str]:
+        """Split the pieces longer than the soft wrap length at word boundaries."""
+        wrap_width = self._wrap_width
+        wrapped = []
+        for piece in pieces:
+            if len(piece) <= wrap_width:
+                wrapped.append(piece)
+                continue
+            wrapped.extend(self._wrap_piece(piece))
+        return wrapped
+
+    def _wrap_piece(self, piece: str) -> List[str]:
+        words = [m.span() for m in _WORD.finditer(piece)]
+        if SPAN_START.search(piece) is not None:
+            words = _glue_spans(words, protected_spans(piece))
+        is_conjunction = self._is_conjunction
+        penalties = [0] * len(words)
+        for j, (start, end) in enumerate(words):
+            if not piece[start].isalpha() and interrupts_paragraph(piece[start:end]):
+                penalties[j] = _OVERLONG_WEIGHT
+            elif not is_conjunction(piece[start:end]):
+                penalties[j] = _WORD_BREAK_PENALTY
+        # Widths count one space between words, whatever the piece has, so
+        # the lines come out the same when the result is formatted again
+        breaks = _break_lines([end - start for start, end in words],
+                              self._wrap_width, self._wrap_limit, penalties)
+        lines = []
+        first = 0
+        for last in breaks + [len(words)]:
+            lines.append(piece[words[first][0]:words[last - 1][1]])
+            first = last
+        return lines
+
+    def format_paragraph(self, paragraph: str) -> str:
+        """Format a single paragraph with semantic line breaks."""
+        if _NON_SPACE.search(paragraph) is None:
+            return paragraph
+
+        pieces = []
+        pos = 0
+
+        # Punctuation in code spans, links and the like doesn't break
+        sentence_protected = clause_protected = None
+        if SPAN_START.search(paragraph) is not None:
+            spans = protected_spans(paragraph)
+            if spans:
+                sentence_protected = SpanCursor(spans)
+                clause_protected = SpanCursor(spans)
+
+        # Split on sentence endings first
+        for m in SENTENCE_ENDINGS.finditer(paragraph):
+            if sentence_protected is not None and sentence_protected(m.start(1)):
+                continue
+            start = _lstrip_offset(paragraph, pos, m.start())
+            end = _rstrip_offset(paragraph, start, m.start())
+            self._add_sentence(paragraph, start, end, m.start(1), pieces, clause_protected)
+            pos = m.end()
+
+        # Handle remaining text
+        start = _lstrip_offset(paragraph, pos, len(paragraph))
+        end = _rstrip_offset(paragraph, start, len(paragraph))
+        if start < end:
+            self._add_sentence(paragraph, start, end, -1, pieces, clause_protected)
+
+        if self._wrap_width is not None:
+            pieces = self._wrap(pieces)
+        return _join_lines(pieces)
+
+    def _is_formatted(self, lines: List[str]) -> bool:
+        """Check that a paragraph's lines are exactly what formatting them would produce.
+
+        Each line has to be one whole piece: trimmed, with no break point
+        inside it and, except for the last line, ending at one. This is
+        much cheaper than joining the lines and segmenting them again.
+        With wrapping on, a piece split across lines fails the check too,
+        and so does a line longer than the soft wrap length. Any
+        punctuation break inside a line fails it even when it is inside
+        a protected span, and a line ending inside one fails it as well.
+        A line may also end at other punctuation when the next one starts
+        with a conjunction.
+        """
+        sentence_break = SENTENCE_ENDINGS.search
+        clause_break = None
+        if self._clause_breaks is not None:
+            clause_break = self._clause_breaks.search if not self._conjunction_ends else self._clause_break_in
+        break_chars = self._break_chars
+        conjunction_ends = self._conjunction_ends
+        wrap_width = self._wrap_width
+        last = len(lines) - 1
+        for i, line in enumerate(lines):
+            if line[-1:] == '\n':
+                text = line[:-1]
+            elif i < last:
+                return False
+            else:
+                text = line
+            if (not text or text[0].isspace() or text[-1].isspace()
+                    or sentence_break(text) is not None
+                    or (clause_break is not None and clause_break(text))
+                    or (i and interrupts_paragraph(text))
+                    or (wrap_width is not None and len(text) > wrap_width)):
+                return False
+            if i < last:
+                end = text[-1]
+                if end not in break_chars:
+                    if not (conjunction_ends and text.endswith(conjunction_ends)):
+                        return False
+                    word = _LEADING_WORD.match(lines[i + 1])
+                    if word is None or not self._is_conjunction(word.group()):
+                        return False
+                # Whitespace before sentence punctuation would be dropped
+                if end in _SENTENCE_PUNCTUATION and (len(text) == 1 or text[-2].isspace()):
+                    return False
+        if last and any(SPAN_START.search(line) is not None for line in lines):
+            return not _breaks_span(lines)
+        return True
+
+    def iter_format_markdown(self, lines: Iterable[str]) -> Iterator[str]:
+        """Format Markdown lines incrementally, yielding output as soon as it is final.
+
+        ``lines`` is any iterable of lines that keep their ``\n`` terminators,
+        such as an open text file or ``sys.stdin``. Concatenating the yielded
+        chunks gives the same result as ``format_markdown`` on the joined text,
+        while only the paragraph being accumulated is held in memory.
+        """
+        return map(self.format_block, self._scan(lines))
+
+    def _scan(self, lines: Iterable[str]) -> Iterator[Block]:
+        return BlockScanner().scan(lines)
+
+    def is_unchanged(self, block: Block) -> bool:
+        """Check whether formatting a scanned block would leave its lines as they are."""
+        # Paragraphs already at their fixpoint (typically formatted by an
+        # earlier run) are copied through without being segmented again
+        return block.kind != PARAGRAPH or self._is_formatted(block.lines)
+
+    def format_block(self, block: Block) -> str:
+        """Format one scanned block; everything but paragraphs passes through."""
+        if self.is_unchanged(block):
+            return ''.join(block.lines)
+        return self._reflow(block.lines)
+
+    def _reflow(self, lines: List[str]) -> str:
+        """Format the lines of a paragraph block, keeping its final newline."""
+        newline = '\n' if lines[-1].endswith('\n') else ''
+        return self.format_paragraph(' '.join(line.strip() for line in lines)) + newline
+
+    def format_markdown(self, text: str) -> str:
+        """Format entire Markdown text with semantic line breaks."""
+        # StringIO splits on '\n' only, matching str.split('\n')
+        return ''.join(self.iter_format_markdown(io.StringIO(text)))
+
+    def iter_changes(self, lines: Iterable[str]) -> Iterator[Change]:
+        """Yield the blocks that formatting would change, as they are found.
+
+        ``lines`` are compared block by block with what ``mdfix`` would
+        write for them, normalizing first if the config says so. Nothing
+        beyond the current block is formatted or held, so a consumer that
+        stops at the first change stops the work there too.
+        """
+        if not self.config.normalize_unicode:
+            for block in self._scan(lines):
+                if not self.is_unchanged(block):
+                    formatted = self._reflow(block.lines)
+                    if formatted != ''.join(block.lines):
+                        yield Change(block.start, block.lines, formatted)
+            return
+
+        # Normalization never adds or removes a newline, so the lines of
+        # each normalized block are found in the original by position
+        original: List[str] = []
+        base = 0
+
+        def normalized():
+            for line in lines:
+                original.append(line)
+                yield self.normalize_unicode(line)
+
+        for block in self._scan(normalized()):
+            block_lines = original[block.start - base:block.end - base]
+            del original[:block.end - base]
+            base = block.end
+            formatted = self.format_block(block)
+            if formatted != ''.join(block_lines):
+                yield Change(block.start, block_lines, formatted)
+
+    def is_formatted(self, text: str) -> bool:
+        """Check whether ``mdfix`` would leave text as it is.
+
+        Stops at the first block that would change, without formatting
+        the rest of the document.
+        """
+        return next(self.iter_changes(io.StringIO(text)), None) is None
+
+    def instrumented(self) -> 'Formatter':
+        """Return a formatter sharing this one's patterns that records stats."""
+        if self._instrumented is None:
+            self._instrumented = _InstrumentedFormatter(self)
+        return self._instrumented
+
+
+class _InstrumentedFormatter(Formatter):
+    """Formatter that adds timings and counters to the current document's stats.
+
+    Only ``iter_format_markdown`` (and so ``format_markdown``) opens a
+    document; the other methods record into one if it is open and
+    otherwise run uninstrumented.
+    """
+
+    def __init__(self, formatter: Formatter):
+        self.__dict__.update(formatter.__dict__)
+        self._instrumented = self
+
+    def normalize_unicode(self, text: str) -> str:
+        doc = stats.current()
+        if doc is None:
+            return super().normalize_unicode(text)
+        start = perf_counter()
+        text = super().normalize_unicode(text)
+        doc.normalize_time += perf_counter() - start
+        return text
+
+    def _scan(self, lines: Iterable[str]) -> Iterator[Block]:
+        doc = stats.current()
+        blocks = super()._scan(lines)
+        if doc is None:
+            yield from blocks
+            return
+        while True:
+            # Lines may be normalized lazily as they are read
+            normalize_time = doc.normalize_time
+            start = perf_counter()
+            block = next(blocks, None)
+            doc.scan_time += perf_counter() - start - (doc.normalize_time - normalize_time)
+            if block is None:
+                return
+            doc.blocks += 1
+            doc.bytes_in += sum(map(stats.utf8_len, block.lines))
+            yield block
+
+    def is_unchanged(self, block: Block) -> bool:
+        doc = stats.current()
+        if doc is None or block.kind != PARAGRAPH:
+            return super().is_unchanged(block)
+        start = perf_counter()
+        unchanged = self._is_formatted(block.lines)
+        doc.fixpoint_time += perf_counter() - start
+        doc.paragraphs += 1
+        doc.paragraphs_unchanged += unchanged
+        return unchanged
+
+    def format_paragraph(self, paragraph: str) -> str:
+        doc = stats.current()
+        if doc is None:
+            return super().format_paragraph(paragraph)
+        # Sentence splitting is what's left once clause splitting and
+        # wrapping are taken out
+        other_time = doc.clause_time + doc.wrap_time
+        start = perf_counter()
+        formatted = super().format_paragraph(paragraph)
+        doc.sentence_time += (perf_counter() - start
+                              - (doc.clause_time + doc.wrap_time - other_time))
+        return formatted
+
+    def _wrap(self, pieces: List[str]) -> List[str]:
+        doc = stats.current()
+        start = perf_counter()
+        wrapped = super()._wrap(pieces)
+        if doc is not None:
+            doc.wrap_time += perf_counter() - start
+            doc.wrapped_lines += len(wrapped) - len(pieces)
+        return wrapped
+
+    def _add_sentence(self, text: str, start: int, end: int, punct: int, pieces: List[str],
+                      protected: Optional[SpanCursor] = None):
+        doc = stats.current()
+        count = len(pieces)
+        began = perf_counter()
+        super()._add_sentence(text, start, end, punct, pieces, protected)
+        if doc is not None:
+            doc.clause_time += perf_counter() - began
+            doc.sentences += 1
+            doc.clause_breaks += len(pieces) - count - 1
+
+    def iter_format_markdown(self, lines: Iterable[str]) -> Iterator[str]:
+        with stats.document() as doc:
+            if doc is None:
+                yield from super().iter_format_markdown(lines)
+                return
+            for chunk in super().iter_format_markdown(lines):
+                doc.bytes_out += stats.utf8_len(chunk)
+                yield chunk
+
+
+# Formatters shared between equal configs, keyed by Config.key()
+_FORMATTERS: Dict[tuple, Formatter] = {}
+_MAX_FORMATTERS = 64
+
+
+def get_formatter(config: Config = DEFAULT_CONFIG) -> Formatter:
+    """Return the shared Formatter for a config, building it on first use."""
+    key = config.key()
+    formatter = _FORMATTERS.get(key)
+    if formatter is None:
+        if len(_FORMATTERS) >= _MAX_FORMATTERS:
+            _FORMATTERS.clear()
+        formatter = _FORMATTERS[key] = Formatter(config)
+    if stats.enabled:
+        return formatter.instrumented()
+    return formatter
+
+
+def normalize_unicode(text: str, config: Config = DEFAULT_CONFIG) -> str:
+    """Convert Unicode characters to plain ASCII equivalents for Markdown.
+
+    Mappings in ``config.unicode_replacements`` are applied along with the
+    built-in table and take precedence over it.
+    """
+    return get_formatter(config).normalize_unicode(text)
+
+
+def format_paragraph(paragraph: str, config: Config = DEFAULT_CONFIG) -> str:
+    """Format a single paragraph with semantic line breaks."""
+    return get_formatter(config).format_paragraph(paragraph)
+
+
+def iter_format_markdown(lines: Iterable[str], config: Config = DEFAULT_CONFIG) -> Iterator[str]:
+    """Format Markdown lines incrementally; see ``Formatter.iter_format_markdown``."""
+    return get_formatter(config).iter_format_markdown(lines)
+
+
+def format_markdown(text: str, config: Config = DEFAULT_CONFIG) -> str:
+    """Format entire Markdown text with semantic line breaks."""
+    return get_formatter(config).format_markdown(text)
 
-    # Handle final paragraph
-    if current_paragraph:
-        result_lines.append(format_paragraph(' '.join(current_paragraph), config))
 
-    return '\n'.join(result_lines)
+def is_formatted(text: str, config: Config = DEFAULT_CONFIG) -> bool:
+    """Check whether formatting would leave text as it is; see ``Formatter.is_formatted``."""
+    return get_formatter(config).is_formatted(text)
@@ -0,0 +1,62 @@
+"""Asking git which files have changed, for formatting only those."""
+
+import os
+import subprocess
+from typing import List, Optional
+
+
+class GitError(Exception):
+    """A git command failed, or git isn't available."""
+
+
+def _git(args: List[str], cwd: Optional[str] = None) -> str:
+    """Run a git command and return its output."""
+    try:
+        result = subprocess.run(
+            ['git', *args], cwd=cwd, capture_output=True,
+            encoding='utf-8', errors='surrogateescape',
+        )
+    except FileNotFoundError:
+        raise GitError("git is not installed") from None
+    if result.returncode != 0:
+        message = result.stderr.strip().splitlines()
+        raise GitError(message[-1] if message else f"git {args[0]} failed")
+    return result.stdout
+
+
+def _names(output: str) -> List[str]:
+    return [name for name in output.split('\0') if name]
+
+
+def changed_files(since: Optional[str] = None, staged: bool = False,
+                  cwd: Optional[str] = None) -> List[str]:
+    """Return the files git reports as changed, as paths relative to ``cwd``.
+
+    With ``staged`` these are the files added or modified in the index,
+    as a pre-commit hook sees them. With ``since`` they are the files that
+    differ between the working tree and the merge base of ``since`` and
+    HEAD, plus untracked files that aren't ignored: everything a branch
+    changes relative to the branch it will merge into. Deleted files are
+    left out.
+    """
+    if staged == (since is not None):
+        raise ValueError("pass exactly one of since and staged")
+    cwd = os.path.abspath(cwd or os.getcwd())
+    top = _git(['rev-parse', '--show-toplevel'], cwd).strip()
+
+    diff = ['diff', '--name-only', '-z', '--diff-filter=d', '--no-ext-diff']
+    if staged:
+        names = _names(_git(diff + ['--cached'], cwd))
+    else:
+        base = _git(['merge-base', since, 'HEAD'], cwd).strip()
+        names = _names(_git(diff + [base, '--'], cwd))
+        names += _names(_git(['ls-files', '--others', '--exclude-standard',
+                              '-z', '--full-name', ':/'], cwd))
+
+    paths = []
+    for name in sorted(set(names)):
+        path = os.path.join(top, name)
+        # Staged files may since have been removed from the working tree
+        if os.path.isfile(path):
+            paths.append(os.path.relpath(path, cwd))
+    return paths
@@ -0,0 +1,283 @@
+"""Incremental formatting of edited line ranges, for editors.
+
+An editor formatting as the user types sends the whole buffer on every
+change, but only a few lines of it are new. ``index_blocks`` records
+where each block of a document starts and where the block scanner could
+start again from scratch. ``format_ranges`` takes that index with the
+changed lines, scans again only from the last restart point before each
+change to the first point after it where the scan lines up with the
+index again (so a fence opened or closed by the edit is followed as far
+as it reaches), reformats the paragraphs the changes touched, and
+returns LSP-style text edits, updating the index to match.
+"""
+
+import bisect
+import io
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, NamedTuple, Sequence, Tuple
+
+from .blocks import PARAGRAPH, Block, BlockScanner
+from .config import Config, DEFAULT_CONFIG
+from .formatter import get_formatter
+
+
+class LineChange(NamedTuple):
+    """Lines ``start`` to ``end`` of the previous document, replaced by ``count`` new lines."""
+
+    start: int
+    end: int
+    count: int
+
+
+class Position(NamedTuple):
+    """A position as LSP counts it: zero-based line, and UTF-16 code units into it."""
+
+    line: int
+    character: int
+
+
+class TextEdit(NamedTuple):
+    """Replace the text from ``start`` to ``end`` with ``new_text``."""
+
+    start: Position
+    end: Position
+    new_text: str
+
+    def to_lsp(self) -> Dict[str, Any]:
+        """Return the edit as an LSP ``TextEdit`` object."""
+        return {'range': {'start': self.start._asdict(), 'end': self.end._asdict()},
+                'newText': self.new_text}
+
+
+def _check_changes(changes: Sequence[LineChange], old_count: int, new_count: int):
+    pos = 0
+    count = old_count
+    for change in changes:
+        if not pos <= change.start <= change.end <= old_count or change.count < 0:
+            raise ValueError(f"changes must be sorted, disjoint ranges within "
+                             f"{old_count} lines: {change}")
+        pos = change.end
+        count += change.count - (change.end - change.start)
+    if count != new_count:
+        raise ValueError(f"changes give {count} lines, but the document has {new_count}")
+
+
+# A block: its kind, its first line, and whether scanning can restart there
+_Entry = Tuple[str, int, bool]
+_line_of = itemgetter(1)
+
+
+class BlockIndex:
+    """Where each block of a document starts, and where scanning can restart.
+
+    Scanning can restart before a block when the scanner has no block or
+    list open there, so a scanner started afresh at that line finds the
+    same blocks from there on as one that read the whole document.
+
+    The blocks are kept as a gap buffer at the last edit: those before
+    it by their first line, and those after it by their distance from
+    the end of the document, in reverse. An update only moves the blocks
+    between the previous edit and the next one across the gap, and lines
+    added or removed never renumber the blocks after them, so its cost
+    follows the size of the edit rather than of the document.
+    """
+
+    __slots__ = ('_before', '_after', 'line_count')
+
+    def __init__(self):
+        self._before: List[_Entry] = []
+        self._after: List[_Entry] = []
+        self.line_count = 0
+
+    def __iter__(self) -> Iterator[_Entry]:
+        """Yield ``(kind, start, restart)`` for each block in document order."""
+        yield from self._before
+        count = self.line_count
+        for kind, distance, restart in reversed(self._after):
+            yield kind, count - distance, restart
+
+    def __len__(self) -> int:
+        return len(self._before) + len(self._after)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, BlockIndex):
+            return NotImplemented
+        return self.line_count == other.line_count and list(self) == list(other)
+
+    def _gap_line(self) -> int:
+        """Return the first line of the first block after the gap."""
+        after = self._after
+        return self.line_count - after[-1][1] if after else self.line_count
+
+    def blocks(self, lines: Sequence[str]) -> Iterator[Block]:
+        """Yield the blocks of ``lines``, the document this index describes."""
+        entries = list(self)
+        ends = [start for _, start, _ in entries[1:]] + [self.line_count]
+        for (kind, start, _), end in zip(entries, ends):
+            yield Block(kind, start, list(lines[start:end]))
+
+    def update(self, lines: Sequence[str], changes: Sequence[LineChange]):
+        """Bring the index up to date with ``lines``, the document after ``changes``.
+
+        Changes are given in the previous document's line numbers, sorted
+        and not overlapping. Only the lines from the last restart point
+        before a change to the first one after it where the scanner is
+        back in step with the index are scanned again. Raises ValueError,
+        leaving the index as it was, if the changes don't fit the two
+        documents.
+        """
+        old_count = self.line_count
+        _check_changes(changes, old_count, len(lines))
+        before, after = self._before, self._after
+        shift = 0  # Lines added so far, less lines removed
+        i = 0
+        while i < len(changes):
+            start = changes[i].start
+            # Move the gap to the change. Only the first change can be
+            # behind it, before anything has moved.
+            while before and before[-1][1] > start + shift:
+                kind, line, restart = before.pop()
+                after.append((kind, old_count - line, restart))
+            while after and old_count - after[-1][1] <= start:
+                kind, distance, restart = after.pop()
+                before.append((kind, old_count - distance + shift, restart))
+            # Scan again from the last restart point at or before it
+            while before and not before[-1][2]:
+                before.pop()
+            j = before.pop()[1] if before else 0
+
+            scanner = BlockScanner(j)
+            neutral = set()
+            # Not back in step before the change is reached
+            region_end = len(lines) + 1
+            while True:
+                # Take in every change the scan has reached. The line after
+                # one is scanned too, as formatting counts it as touched
+                # when lines were only removed.
+                while i < len(changes) and j >= changes[i].start + shift:
+                    change = changes[i]
+                    region_end = change.start + shift + max(change.count, 1)
+                    shift += change.count - (change.end - change.start)
+                    i += 1
+                if scanner.is_neutral:
+                    old = j - shift
+                    # Back in step if the old scan was neutral here too, and
+                    # neither line is the only one front matter can start on
+                    if j >= region_end and (j == 0) == (old == 0):
+                        while after and old_count - after[-1][1] < old:
+                            after.pop()
+                        if after and old_count - after[-1][1] == old and after[-1][2]:
+                            break
+                    neutral.add(j)
+                at_end = j == len(lines)
+                for block in scanner.finish() if at_end else scanner.feed(lines[j]):
+                    before.append((block.kind, block.start, block.start in neutral))
+                if at_end:
+                    after.clear()
+                    break
+                j += 1
+        self.line_count = len(lines)
+
+
+def index_blocks(lines: Sequence[str]) -> BlockIndex:
+    """Scan a whole document (lines with their ``\\n`` terminators) into a block index."""
+    index = BlockIndex()
+    index.update(lines, [LineChange(0, 0, len(lines))])
+    return index
+
+
+class _EditedLines:
+    """The lines of a document with some ranges replaced, without copying the rest.
+
+    Only supports what ``BlockIndex.update`` needs: ``len`` and indexing
+    by line number.
+    """
+
+    def __init__(self, lines: Sequence[str], changes: List[LineChange],
+                 replacements: List[List[str]]):
+        self._lines = lines
+        self._changes = changes
+        self._replacements = replacements
+        self._length = len(lines) + sum(change.count - (change.end - change.start)
+                                        for change in changes)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, line: int) -> str:
+        shift = 0
+        for change, new_lines in zip(self._changes, self._replacements):
+            if line < change.start + shift:
+                break
+            if line < change.start + shift + change.count:
+                return new_lines[line - change.start - shift]
+            shift += change.count - (change.end - change.start)
+        return self._lines[line - shift]
+
+
+def _end_position(lines: Sequence[str], end: int) -> Position:
+    if end == len(lines) and end and not lines[-1].endswith('\n'):
+        # The last line has no newline to end before
+        return Position(end - 1, len(lines[-1].encode('utf-16-le')) // 2)
+    return Position(end, 0)
+
+
+def format_ranges(lines: Sequence[str], index: BlockIndex, changes: Sequence[LineChange],
+                  config: Config = DEFAULT_CONFIG) -> List[TextEdit]:
+    """Reformat the paragraphs that changed lines touch.
+
+    ``lines`` is the edited document, split after each ``\\n`` as
+    ``format_markdown`` splits it; ``index`` describes the document
+    before ``changes``, which are in its line numbers. A change that
+    only removed lines touches the lines on both sides of the gap.
+
+    Returns the edits, in document order and in the line numbers of
+    ``lines``, and updates ``index`` to describe the document with them
+    applied, ready for the next changes. Other paragraphs are left as
+    they are, formatted or not, and with ``normalize_unicode`` set only
+    the reformatted paragraphs are normalized.
+    """
+    index.update(lines, changes)
+    formatter = get_formatter(config)
+
+    touched = []
+    shift = 0
+    for change in changes:
+        start = change.start + shift
+        if change.count:
+            touched.append((start, start + change.count))
+        elif lines:
+            touched.append((max(start - 1, 0), min(start + 1, len(lines))))
+        shift += change.count - (change.end - change.start)
+
+    # The touched lines were all scanned again, so their blocks are
+    # before the gap. Collect the paragraphs among them in order.
+    entries = index._before
+    paragraphs: Dict[int, None] = {}
+    for first, last in touched:
+        k = max(bisect.bisect_right(entries, first, key=_line_of) - 1, 0)
+        while k < len(entries) and entries[k][1] < last:
+            if entries[k][0] == PARAGRAPH:
+                paragraphs[k] = None
+            k += 1
+
+    edits: List[TextEdit] = []
+    replaced: List[LineChange] = []
+    replacements: List[List[str]] = []
+    for k in paragraphs:
+        start = entries[k][1]
+        end = entries[k + 1][1] if k + 1 < len(entries) else index._gap_line()
+        block_lines = list(lines[start:end])
+        if config.normalize_unicode:
+            block_lines = [formatter.normalize_unicode(line) for line in block_lines]
+        formatted = formatter.format_block(Block(PARAGRAPH, start, block_lines))
+        if formatted != ''.join(lines[start:end]):
+            edits.append(TextEdit(Position(start, 0), _end_position(lines, end), formatted))
+            # StringIO splits on '\n' only, like the document
+            new_lines = list(io.StringIO(formatted))
+            replaced.append(LineChange(start, end, len(new_lines)))
+            replacements.append(new_lines)
+
+    if replaced:
+        index.update(_EditedLines(lines, replaced, replacements), replaced)
+    return edits
@@ -0,0 +1,185 @@
+"""Inline spans a line break must not fall inside.
+
+Punctuation inside a code span, a link's text or destination, an HTML
+tag, an autolink or a math span isn't a sentence or clause boundary.
+``protected_spans`` finds all of them in a paragraph with one pass over
+its special characters, and ``SpanCursor`` answers whether an offset
+is inside one in constant amortized time, for offsets asked about in
+order as the formatter meets its candidate breaks.
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+from .blocks import _LazyPattern
+
+# Paragraphs without any of these characters have no protected spans
+SPAN_START = re.compile(r'[`\[<$]')
+
+_BACKTICKS = re.compile(r'`+')
+_SPECIAL = re.compile(r'[\\\[\]()<$]')
+
+# Open and closing tags, autolinks and email autolinks, from CommonMark
+_HTML_TAG = _LazyPattern(
+    r'<(?:'
+    r'[A-Za-z][A-Za-z0-9-]*'
+    r'(?:\s+[A-Za-z_:][\w.:-]*(?:\s*=\s*(?:[^\s"\'=<>`]+|\'[^\']*\'|"[^"]*"))?)*\s*/?'
+    r'|/[A-Za-z][A-Za-z0-9-]*\s*'
+    r'|[A-Za-z][A-Za-z0-9.+-]{1,31}:[^\s<>]*'
+    r'|[\w.!#$%&\'*+/=?^`{|}~-]+@[A-Za-z0-9][A-Za-z0-9.-]*'
+    r')>'
+)
+
+# $$display$$ and $inline$ math, where an inline span can't start or end
+# with a space and can't be followed by a digit, so prices stay prose. It
+# can't start with sentence punctuation either: formatting drops spaces
+# before that, and "$ ." must not turn into math the next time around.
+_MATH = _LazyPattern(r'\$\$[^$]+\$\$|\$(?=[^\s$.!?])[^$]*(?<=[^\s$])\$(?!\d)')
+
+
+def _escaped(text: str, pos: int) -> bool:
+    """Check whether the character at pos is escaped by a backslash."""
+    count = 0
+    while pos > count and text[pos - count - 1] == '\\':
+        count += 1
+    return count % 2 == 1
+
+
+def _code_spans(text: str) -> List[Tuple[int, int]]:
+    """Find the code spans: backtick runs closed by the next run of the same length."""
+    runs = [m.span() for m in _BACKTICKS.finditer(text)]
+    if len(runs) < 2:
+        return []
+    by_length: Dict[int, List[int]] = {}
+    for k, (start, end) in enumerate(runs):
+        by_length.setdefault(end - start, []).append(k)
+    # Closers are looked up at increasing run indices, so each length's
+    # list is walked once
+    cursors = dict.fromkeys(by_length, 0)
+    spans = []
+    k = 0
+    while k < len(runs):
+        start, end = runs[k]
+        if _escaped(text, start):
+            # An escaped backtick is literal; the rest of the run may open
+            start += 1
+        closers = by_length.get(end - start)
+        if closers is not None:
+            c = cursors[end - start]
+            while c < len(closers) and closers[c] <= k:
+                c += 1
+            cursors[end - start] = c
+            if c < len(closers):
+                close = closers[c]
+                spans.append((start, runs[close][1]))
+                k = close + 1
+                continue
+        k += 1
+    return spans
+
+
+def protected_spans(text: str) -> List[Tuple[int, int]]:
+    """Return the sorted, disjoint ``(start, end)`` spans of text to keep on one line.
+
+    These are code spans, links and images (``[text](destination)``,
+    ``[text][label]`` and any other bracketed text), HTML tags and
+    comments, autolinks, and math. Nested spans are merged into the
+    outermost one.
+    """
+    code = _code_spans(text) if '`' in text else []
+    spans = list(code)
+    brackets: List[int] = []
+    parens: List[int] = []
+    bracket_close: Dict[int, int] = {}
+    paren_close: Dict[int, int] = {}
+    comments_close = True
+    search = _SPECIAL.search
+    next_code = 0
+    pos = 0
+    while True:
+        m = search(text, pos)
+        if m is None:
+            break
+        i = m.start()
+        while next_code < len(code) and code[next_code][1] <= i:
+            next_code += 1
+        if next_code < len(code) and code[next_code][0] <= i:
+            pos = code[next_code][1]
+            next_code += 1
+            continue
+        char = text[i]
+        pos = i + 1
+        if char == '\\':
+            pos = i + 2
+        elif char == '[':
+            brackets.append(i)
+        elif char == ']':
+            if brackets:
+                bracket_close[brackets.pop()] = i
+        elif char == '(':
+            parens.append(i)
+        elif char == ')':
+            if parens:
+                paren_close[parens.pop()] = i
+        elif char == '<':
+            if text.startswith('<!--', i):
+                # Once no comment closes, no later one can either
+                end = text.find('-->', i + 4) if comments_close else -1
+                if end < 0:
+                    comments_close = False
+                else:
+                    spans.append((i, end + 3))
+                    pos = end + 3
+            else:
+                tag = _HTML_TAG.match(text, i)
+                if tag is not None:
+                    spans.append((i, tag.end()))
+                    pos = tag.end()
+        else:
+            math = _MATH.match(text, i)
+            if math is not None:
+                spans.append((i, math.end()))
+                pos = math.end()
+
+    # Link text runs on into its destination or label
+    for start, close in bracket_close.items():
+        end = close + 1
+        following = text[end:end + 1]
+        if following == '(' and end in paren_close:
+            end = paren_close[end] + 1
+        elif following == '[' and end in bracket_close:
+            end = bracket_close[end] + 1
+        spans.append((start, end))
+
+    spans.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in spans:
+        if merged and start < merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class SpanCursor:
+    """Answers whether offsets are inside any of a set of spans.
+
+    Offsets must be asked about in non-decreasing order; the cursor only
+    moves forward, so a pass over a paragraph costs O(1) per query on
+    top of the spans themselves.
+    """
+
+    __slots__ = ('_spans', '_next')
+
+    def __init__(self, spans: List[Tuple[int, int]]):
+        self._spans = spans
+        self._next = 0
+
+    def __call__(self, pos: int) -> bool:
+        spans = self._spans
+        k = self._next
+        while k < len(spans) and spans[k][1] <= pos:
+            k += 1
+        self._next = k
+        return k < len(spans) and spans[k][0] <= pos
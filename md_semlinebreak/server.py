@@ -0,0 +1,178 @@
+"""Long-running JSON-RPC server that keeps formatters warm.
+
+Requests are JSON-RPC 2.0 objects, one per line, read from stdin or from
+connections to a Unix socket; each answer is written back as one line.
+Supported methods:
+
+- ``format``: ``{"text": str, "config": {...}}`` returns the formatted text,
+  normalizing Unicode first when the config asks for it
+- ``normalize``: ``{"text": str, "config": {...}}`` returns normalized text
+- ``version``: returns the package version
+- ``shutdown``: stops the server once answered
+
+``config`` holds ``Config`` fields and may be omitted for the defaults.
+Formatters are compiled once per distinct config and reused.
+"""
+
+import io
+import json
+import os
+import socketserver
+import threading
+from pathlib import Path
+from typing import IO, Any, Dict, Optional, Tuple
+
+from . import __version__
+from .client import default_socket_path, request
+from .config import Config
+from .formatter import get_formatter
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+class _RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _config(params: Dict[str, Any]) -> Config:
+    options = params.get('config')
+    if options is None:
+        return Config()
+    if not isinstance(options, dict):
+        raise _RpcError(INVALID_PARAMS, "config must be an object")
+    try:
+        return Config(**options)
+    except (TypeError, ValueError) as e:
+        raise _RpcError(INVALID_PARAMS, str(e))
+
+
+def _text(params: Dict[str, Any]) -> str:
+    text = params.get('text')
+    if not isinstance(text, str):
+        raise _RpcError(INVALID_PARAMS, "text must be a string")
+    return text
+
+
+def _format(params: Dict[str, Any]) -> str:
+    config = _config(params)
+    formatter = get_formatter(config)
+    text = _text(params)
+    if config.normalize_unicode:
+        text = formatter.normalize_unicode(text)
+    return formatter.format_markdown(text)
+
+
+def _normalize(params: Dict[str, Any]) -> str:
+    return get_formatter(_config(params)).normalize_unicode(_text(params))
+
+
+METHODS = {
+    'format': _format,
+    'normalize': _normalize,
+    'version': lambda params: __version__,
+    'shutdown': lambda params: None,
+}
+
+
+def _error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+def handle_message(line: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Answer one request line.
+
+    Returns the response (None for a notification, which has no ``id``)
+    and whether the request asked the server to shut down.
+    """
+    try:
+        message = json.loads(line)
+    except ValueError:
+        return _error(None, PARSE_ERROR, "Parse error"), False
+    if not isinstance(message, dict) or not isinstance(message.get('method'), str):
+        request_id = message.get('id') if isinstance(message, dict) else None
+        return _error(request_id, INVALID_REQUEST, "Invalid request"), False
+
+    request_id = message.get('id')
+    name = message['method']
+    params = message.get('params', {})
+    try:
+        method = METHODS.get(name)
+        if method is None:
+            raise _RpcError(METHOD_NOT_FOUND, f"Method not found: {name}")
+        if not isinstance(params, dict):
+            raise _RpcError(INVALID_PARAMS, "params must be an object")
+        response = {'jsonrpc': '2.0', 'id': request_id, 'result': method(params)}
+    except _RpcError as e:
+        response = _error(request_id, e.code, e.message)
+    except Exception as e:
+        # One bad request must not take down a server other clients share
+        response = _error(request_id, INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+    return (response if 'id' in message else None), name == 'shutdown'
+
+
+def serve_stream(reader: IO[str], writer: IO[str]) -> bool:
+    """Answer requests read line by line until end of input or shutdown.
+
+    Returns True if a client asked the server to shut down.
+    """
+    for line in reader:
+        if not line.strip():
+            continue
+        response, stop = handle_message(line)
+        if response is not None:
+            writer.write(json.dumps(response) + '\n')
+            writer.flush()
+        if stop:
+            return True
+    return False
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Serve one client connection, which may send any number of requests."""
+
+    def handle(self):
+        reader = io.TextIOWrapper(self.rfile, encoding='utf-8', newline='\n')
+        writer = io.TextIOWrapper(self.wfile, encoding='utf-8', newline='\n')
+        if serve_stream(reader, writer):
+            # shutdown() waits for serve_forever, so it can't run on this thread
+            threading.Thread(target=self.server.shutdown).start()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Editors saving many files at once connect in bursts
+    request_queue_size = 128
+
+
+def serve_socket(socket_path: Optional[Path] = None):
+    """Serve requests on a Unix socket, one thread per connection, until shut down.
+
+    Raises OSError if another server is already listening on the socket.
+    A socket file left behind by a server that died is replaced.
+    """
+    path = Path(socket_path or default_socket_path())
+    if path.exists():
+        try:
+            request('version', socket_path=path)
+        except OSError:
+            path.unlink()
+        else:
+            raise OSError(f"{path}: a server is already listening")
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Compile the default formatter before the first request needs it
+    get_formatter()
+    with _UnixServer(str(path), _Handler) as server:
+        try:
+            os.chmod(path, 0o600)
+            server.serve_forever()
+        finally:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,175 @@
+"""Optional instrumentation of formatting runs: per-stage timings and counters."""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, fields
+from time import perf_counter
+from typing import Callable, Iterator, List, Optional
+
+# Set while anything is listening. get_formatter checks it once per call
+# and hands out an instrumented formatter only then, so runs nobody is
+# measuring take the plain code path.
+enabled = False
+
+_hooks: List[Callable[[Optional[str], 'Stats'], None]] = []
+_collectors: List['Stats'] = []
+
+# Stats of the document being formatted, if any. Each thread (and each
+# asyncio task) formats its own document, so this is a context variable.
+_current: ContextVar[Optional['Stats']] = ContextVar('_current', default=None)
+# Documents open in any thread, and the lock guarding the count and totals
+_open_documents = 0
+_lock = threading.Lock()
+
+
+@dataclass
+class Stats:
+    """Counters and per-stage timings, in seconds, for one or more documents."""
+
+    documents: int = 0
+    blocks: int = 0
+    paragraphs: int = 0
+    # Paragraphs already formatted, copied through without segmenting
+    paragraphs_unchanged: int = 0
+    sentences: int = 0
+    clause_breaks: int = 0
+    # Line breaks added by wrapping long clauses
+    wrapped_lines: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    cache_hits: int = 0
+
+    normalize_time: float = 0.0
+    # Reading lines and classifying them into blocks
+    scan_time: float = 0.0
+    # Checking whether paragraphs are already formatted
+    fixpoint_time: float = 0.0
+    sentence_time: float = 0.0
+    clause_time: float = 0.0
+    wrap_time: float = 0.0
+    total_time: float = 0.0
+
+    def add(self, other: 'Stats'):
+        """Add another set of counters and timings to these."""
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+    def as_dict(self) -> dict:
+        """Return the counters and timings as a JSON-serializable dict."""
+        return asdict(self)
+
+    def report(self) -> str:
+        """Return a short human-readable report."""
+        return '\n'.join([
+            f"{_count(self.documents, 'document')}, {self.bytes_in:,} bytes in, "
+            f"{self.bytes_out:,} bytes out, {_count(self.cache_hits, 'cache hit')}",
+            f"{_count(self.blocks, 'block')}, {_count(self.paragraphs, 'paragraph')} "
+            f"({self.paragraphs_unchanged:,} already formatted), "
+            f"{_count(self.sentences, 'sentence')}, {_count(self.clause_breaks, 'clause break')}, "
+            f"{_count(self.wrapped_lines, 'wrap')}",
+            f"normalize {_ms(self.normalize_time)}, scan {_ms(self.scan_time)}, "
+            f"fixpoint {_ms(self.fixpoint_time)}, sentences {_ms(self.sentence_time)}, "
+            f"clauses {_ms(self.clause_time)}, wrapping {_ms(self.wrap_time)}, "
+            f"total {_ms(self.total_time)}",
+        ])
+
+
+def _count(count: int, word: str) -> str:
+    return f"{count:,} {word}" + ('' if count == 1 else 's')
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f} ms"
+
+
+def utf8_len(text: str) -> int:
+    """Return the UTF-8 encoded length of text."""
+    # str.isascii is a flag check, so ASCII text costs no encoding
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+def _update():
+    global enabled
+    enabled = bool(_hooks or _collectors or _open_documents)
+
+
+def add_hook(hook: Callable[[Optional[str], Stats], None]):
+    """Call ``hook(path, stats)`` after each document is formatted.
+
+    ``path`` is the file formatted, or None for text passed in directly.
+    Hooks run in the process that formatted the document, except for
+    files formatted by ``run_batch`` workers, which are reported back to
+    the calling process.
+    """
+    _hooks.append(hook)
+    _update()
+
+
+def remove_hook(hook: Callable[[Optional[str], Stats], None]):
+    """Stop calling a hook registered with ``add_hook``."""
+    _hooks.remove(hook)
+    _update()
+
+
+@contextmanager
+def collect() -> Iterator[Stats]:
+    """Total up the stats of every document formatted inside the block."""
+    totals = Stats()
+    with _lock:
+        _collectors.append(totals)
+        _update()
+    try:
+        yield totals
+    finally:
+        with _lock:
+            _collectors.remove(totals)
+            _update()
+
+
+def current() -> Optional[Stats]:
+    """Return the stats of the document being formatted, if any."""
+    return _current.get()
+
+
+def record(path: Optional[str], stats: Stats):
+    """Report a finished document to the collectors and hooks."""
+    with _lock:
+        for totals in _collectors:
+            totals.add(stats)
+    for hook in list(_hooks):
+        hook(path, stats)
+
+
+@contextmanager
+def document(path: Optional[str] = None, report: bool = True) -> Iterator[Stats]:
+    """Measure everything formatted inside the block as one document.
+
+    Yields the document's stats, or None if nothing is listening. Nested
+    calls join the document already open. When the outermost block exits
+    its stats are recorded, unless ``report`` is false: then the document
+    is measured regardless, and the caller hands the stats to ``record``
+    itself (as ``run_batch`` does for files formatted by its workers).
+    """
+    global _open_documents
+    stats = _current.get()
+    if stats is not None or (report and not enabled):
+        yield stats
+        return
+
+    stats = Stats(documents=1)
+    _current.set(stats)
+    with _lock:
+        _open_documents += 1
+        _update()
+    start = perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.total_time += perf_counter() - start
+        _current.set(None)
+        with _lock:
+            _open_documents -= 1
+            _update()
+    if report:
+        record(path, stats)
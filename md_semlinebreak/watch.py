@@ -0,0 +1,296 @@
+"""Watching Markdown files and reformatting them as they change."""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence, Set, Tuple
+
+from . import stats
+from .batch import DEFAULT_EXCLUDE, DEFAULT_INCLUDE, FileResult, discover_files, filter_files, format_file
+from .config import Config, DEFAULT_CONFIG
+from .formatter import get_formatter
+
+# Seconds without further changes before a burst of writes is formatted
+DEBOUNCE = 0.1
+
+# Longest a steady stream of changes can hold formatting back, in seconds
+MAX_DELAY = 2.0
+
+# Seconds between scans when inotify isn't available
+POLL_INTERVAL = 0.5
+
+# inotify event masks, from <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_ONLYDIR
+
+_EVENT = struct.Struct('iIII')
+
+
+class _Backend:
+    """Reports the paths under the watched roots that have changed."""
+
+    def __init__(self, roots: Sequence[str], include: Sequence[str], exclude: Sequence[str]):
+        self.roots = list(roots)
+        self.include = include
+        self.exclude = exclude
+
+    def _files(self) -> Iterable[str]:
+        return discover_files(self.roots, include=self.include, exclude=self.exclude)
+
+    def changes(self, timeout: Optional[float]) -> Set[str]:
+        """Wait up to ``timeout`` seconds (forever if None) for changed files."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+
+class _PollingBackend(_Backend):
+    """Finds changes by comparing file stats between scans."""
+
+    def __init__(self, roots, include, exclude):
+        super().__init__(roots, include, exclude)
+        self.interval = POLL_INTERVAL
+        self._signatures = self._scan()
+        self._next_scan = time.monotonic() + self.interval
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        signatures = {}
+        for path in self._files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            signatures[path] = (st.st_mtime_ns, st.st_size)
+        return signatures
+
+    def changes(self, timeout):
+        delay = max(0.0, self._next_scan - time.monotonic())
+        if timeout is not None and timeout < delay:
+            time.sleep(timeout)
+            return set()
+        time.sleep(delay)
+        self._next_scan = time.monotonic() + self.interval
+        signatures = self._scan()
+        changed = {path for path, signature in signatures.items()
+                   if self._signatures.get(path) != signature}
+        self._signatures = signatures
+        return changed
+
+
+class _InotifyBackend(_Backend):
+    """Finds changes from Linux inotify events on every watched directory."""
+
+    def __init__(self, roots, include, exclude):
+        super().__init__(roots, include, exclude)
+        self._libc = _load_libc()
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self._fd = fd
+        self._dirs: Dict[int, str] = {}
+        try:
+            for root in self.roots:
+                if os.path.isdir(root):
+                    self._watch_tree(root)
+                else:
+                    # A file is watched through its directory
+                    self._watch(os.path.dirname(root) or os.curdir)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, directory: str):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(error, f"{directory}: {os.strerror(error)}")
+        self._dirs[wd] = directory
+
+    def _watch_tree(self, top: str) -> Set[str]:
+        """Watch a directory and the ones below it, returning the files inside."""
+        files = set()
+        if not self._is_watched_dir(top):
+            return files
+        for root, dirs, names in os.walk(top):
+            # Files are matched later; only pruning directories matters here
+            dirs[:] = [d for d in dirs if self._is_watched_dir(os.path.join(root, d))]
+            self._watch(root)
+            files.update(os.path.join(root, name) for name in names)
+        return files
+
+    def _is_watched_dir(self, directory: str) -> bool:
+        # A directory is walked if it isn't excluded, like the files in it
+        return any(filter_files([directory], self.roots, include=['*'], exclude=self.exclude))
+
+    def changes(self, timeout):
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        candidates = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            candidates.update(self._parse(data))
+        return set(filter_files(sorted(candidates), self.roots,
+                                include=self.include, exclude=self.exclude))
+
+    def _parse(self, data: bytes) -> Set[str]:
+        paths = set()
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, pos)
+            name = os.fsdecode(data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b'\0'))
+            pos += _EVENT.size + length
+            if mask & _IN_Q_OVERFLOW:
+                # Events were dropped: anything may have changed
+                paths.update(self._files())
+                continue
+            if mask & _IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.normpath(os.path.join(directory, name))
+            if mask & _IN_ISDIR:
+                # Files may have landed in a new directory before its watch
+                paths.update(self._watch_tree(path))
+            elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+                paths.add(path)
+        return paths
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def _load_libc():
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+def _open_backend(roots, include, exclude, backend: Optional[str]) -> _Backend:
+    """Use inotify on Linux when it works, polling otherwise."""
+    if backend not in (None, 'inotify', 'poll'):
+        raise ValueError(f"unknown watch backend: {backend!r}")
+    if backend != 'poll' and sys.platform.startswith('linux'):
+        try:
+            return _InotifyBackend(roots, include, exclude)
+        except (OSError, AttributeError):
+            # No inotify in this libc, or out of watches
+            if backend == 'inotify':
+                raise
+    elif backend == 'inotify':
+        raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+    return _PollingBackend(roots, include, exclude)
+
+
+class Watcher:
+    """Reformats Markdown files in place as they change.
+
+    ``paths`` are files and directories, matched like ``mdfix -i``. Bursts
+    of writes are debounced: files are formatted once no further change
+    has arrived for ``debounce`` seconds. The formatter is compiled once
+    and reused, and a file whose content is what the watcher last wrote
+    or checked is skipped without being formatted again, so the
+    watcher's own writes don't set it off.
+
+    With ``resolve``, each file is formatted with the config it returns
+    for the file's path, as in ``run_batch``. A config it can't resolve
+    is reported as that file's error.
+    """
+
+    def __init__(self, paths: Sequence[str], config: Config = DEFAULT_CONFIG,
+                 include: Sequence[str] = DEFAULT_INCLUDE,
+                 exclude: Sequence[str] = DEFAULT_EXCLUDE,
+                 debounce: float = DEBOUNCE, backend: Optional[str] = None,
+                 resolve: Optional[Callable[[str], Config]] = None):
+        self.config = config
+        self.resolve = resolve
+        self.debounce = debounce
+        # Compile before the first change arrives
+        get_formatter(config)
+        self._backend = _open_backend(list(paths), include, exclude, backend)
+        self._hashes: Dict[str, str] = {}
+
+    @property
+    def backend(self) -> str:
+        """Name of the change detection in use: ``'inotify'`` or ``'poll'``."""
+        return 'inotify' if isinstance(self._backend, _InotifyBackend) else 'poll'
+
+    def format(self, paths: Iterable[str]) -> Iterator[FileResult]:
+        """Format the given files, skipping ones the watcher has already seen as they are."""
+        for path in sorted(paths):
+            if not os.path.isfile(path):
+                continue
+            known_hash = self._hashes.get(path)
+            try:
+                config = self.resolve(path) if self.resolve is not None else self.config
+            except ValueError as e:
+                yield FileResult(path, error=str(e))
+                continue
+            with stats.document(path):
+                result = format_file(path, config, known_hash=known_hash)
+            if result.digest is not None:
+                if result.digest == known_hash:
+                    # Typically the watcher's own write coming back
+                    continue
+                self._hashes[path] = result.digest
+            yield result
+
+    def run(self, on_result: Optional[Callable[[FileResult], None]] = None,
+            stop: Optional[threading.Event] = None):
+        """Watch for changes until ``stop`` is set, formatting each burst.
+
+        ``on_result`` is called with the outcome of every file formatted.
+        """
+        pending: Set[str] = set()
+        first_change = 0.0
+        while stop is None or not stop.is_set():
+            if pending:
+                timeout = min(self.debounce, max(0.0, first_change + MAX_DELAY - time.monotonic()))
+            else:
+                # Wake up now and then to notice stop being set
+                timeout = 0.5 if stop is not None else None
+            changed = self._backend.changes(timeout)
+            if changed:
+                if not pending:
+                    first_change = time.monotonic()
+                pending |= changed
+                if time.monotonic() < first_change + MAX_DELAY:
+                    continue
+            if pending:
+                for result in self.format(pending):
+                    if on_result is not None:
+                        on_result(result)
+                pending = set()
+
+    def close(self):
+        """Stop watching."""
+        self._backend.close()
+
+    def __enter__(self) -> 'Watcher':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
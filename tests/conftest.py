@@ -0,0 +1,20 @@
+"""Shared fixtures for md-semlinebreak tests."""
+
+import pytest
+
+# A document the default config reformats, and its formatted form
+UNFORMATTED = "This is a test, and it should work.\n"
+FORMATTED = "This is a test,\nand it should work.\n"
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path_factory, monkeypatch):
+    """Keep the formatted-files cache out of the user's home directory."""
+    monkeypatch.setenv('MDFIX_CACHE_DIR', str(tmp_path_factory.mktemp('cache')))
+
+
+@pytest.fixture
+def settled_stats(monkeypatch):
+    """Trust stats recorded right after a write, so a run can hit the cache at once."""
+    from md_semlinebreak import cache
+    monkeypatch.setattr(cache, 'RACY_WINDOW_NS', 0)
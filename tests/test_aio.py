@@ -0,0 +1,210 @@
+"""Tests for the asyncio API."""
+
+import asyncio
+import gc
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from md_semlinebreak import aformat_files, aformat_markdown, aio
+from md_semlinebreak.aio import INLINE_LIMIT, AsyncFormatter
+from md_semlinebreak.config import Config
+from md_semlinebreak.formatter import format_markdown
+
+UNFORMATTED = "One, two. Three; four.\n"
+FORMATTED = format_markdown(UNFORMATTED)
+
+
+class _CountingExecutor(ThreadPoolExecutor):
+    """Thread pool that records the most jobs it ever ran at once."""
+
+    def __init__(self):
+        super().__init__(max_workers=8)
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        def run():
+            with self._lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            try:
+                time.sleep(0.01)
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+        return super().submit(run)
+
+
+@pytest.fixture
+def docs(tmp_path):
+    paths = []
+    for i in range(10):
+        path = tmp_path / f"doc{i}.md"
+        path.write_text(UNFORMATTED, encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+class TestAformatMarkdown:
+    """Test cases for aformat_markdown."""
+
+    def test_small_document(self):
+        """Test that a small document matches format_markdown."""
+        assert asyncio.run(aformat_markdown(UNFORMATTED)) == FORMATTED
+
+    def test_large_document_on_executor(self):
+        """Test that a large document is formatted off the event loop."""
+        text = UNFORMATTED * (INLINE_LIMIT // len(UNFORMATTED) * 4)
+        config = Config(break_at_clauses=False)
+
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0)
+
+            task = asyncio.create_task(ticker())
+            result = await aformat_markdown(text, config)
+            task.cancel()
+            return result, ticks
+
+        result, ticks = asyncio.run(main())
+        assert result == format_markdown(text, config)
+        assert ticks > 0
+
+    def test_bounded_concurrency(self):
+        """Test that no more than max_workers jobs run at once."""
+        executor = _CountingExecutor()
+        text = UNFORMATTED * (INLINE_LIMIT // len(UNFORMATTED) + 1)
+
+        async def main():
+            async with AsyncFormatter(executor, max_workers=2) as formatter:
+                return await asyncio.gather(
+                    *(formatter.format_markdown(text) for _ in range(8)))
+
+        results = asyncio.run(main())
+        executor.shutdown()
+        assert results == [format_markdown(text)] * 8
+        assert executor.peak == 2
+
+    def test_exit_keeps_loop_running(self, monkeypatch):
+        """Test that leaving the context waits for its own pool off the event loop."""
+        class SlowShutdown(ThreadPoolExecutor):
+            def shutdown(self, *args, **kwargs):
+                time.sleep(0.2)
+                super().shutdown(*args, **kwargs)
+
+        monkeypatch.setattr(aio, 'ProcessPoolExecutor', SlowShutdown)
+        text = UNFORMATTED * (INLINE_LIMIT // len(UNFORMATTED) + 1)
+
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            task = asyncio.create_task(ticker())
+            async with AsyncFormatter(max_workers=1) as formatter:
+                await formatter.format_markdown(text)
+                before = ticks
+            task.cancel()
+            return ticks - before
+
+        assert asyncio.run(main()) >= 5
+
+
+class TestAformatFiles:
+    """Test cases for formatting files asynchronously."""
+
+    def test_yields_every_file(self, docs):
+        """Test that each path is yielded once with its formatted text."""
+        async def main():
+            with ThreadPoolExecutor() as executor:
+                formatter = AsyncFormatter(executor, max_workers=3)
+                return await _collect(formatter.format_files(docs))
+
+        results = asyncio.run(main())
+        assert sorted(path for path, _ in results) == sorted(docs)
+        assert all(text == FORMATTED for _, text in results)
+
+    def test_write(self, docs):
+        """Test that write=True rewrites changed files."""
+        asyncio.run(_collect(aformat_files(docs[:2], write=True)))
+        with open(docs[0], encoding='utf-8') as f:
+            assert f.read() == FORMATTED
+        with open(docs[2], encoding='utf-8') as f:
+            assert f.read() == UNFORMATTED
+
+    def test_errors_raise_by_default(self, tmp_path):
+        """Test that an unreadable file raises."""
+        async def main():
+            with ThreadPoolExecutor() as executor:
+                formatter = AsyncFormatter(executor)
+                return await _collect(formatter.format_files([str(tmp_path / 'missing.md')]))
+
+        with pytest.raises(FileNotFoundError):
+            asyncio.run(main())
+
+    def test_other_errors_retrieved(self, tmp_path):
+        """Test that errors besides the one raised aren't reported as never retrieved."""
+        missing = [str(tmp_path / f'missing{i}.md') for i in range(8)]
+
+        async def main():
+            reports = []
+            asyncio.get_running_loop().set_exception_handler(
+                lambda loop, context: reports.append(context))
+            with ThreadPoolExecutor() as executor:
+                formatter = AsyncFormatter(executor, max_workers=8)
+                with pytest.raises(FileNotFoundError):
+                    await _collect(formatter.format_files(missing))
+            gc.collect()
+            return reports
+
+        assert asyncio.run(main()) == []
+
+    def test_return_exceptions(self, docs, tmp_path):
+        """Test that return_exceptions yields errors in place of text."""
+        missing = str(tmp_path / 'missing.md')
+
+        async def main():
+            with ThreadPoolExecutor() as executor:
+                formatter = AsyncFormatter(executor)
+                return dict(await _collect(formatter.format_files(
+                    [docs[0], missing], return_exceptions=True)))
+
+        results = asyncio.run(main())
+        assert results[docs[0]] == FORMATTED
+        assert isinstance(results[missing], FileNotFoundError)
+
+    def test_backpressure(self, docs):
+        """Test that paths are consumed only as results are taken."""
+        consumed = []
+
+        def paths():
+            for path in docs:
+                consumed.append(path)
+                yield path
+
+        async def main():
+            with ThreadPoolExecutor() as executor:
+                formatter = AsyncFormatter(executor, max_workers=2)
+                results = formatter.format_files(paths())
+                await results.__anext__()
+                seen = len(consumed)
+                await results.aclose()
+                return seen
+
+        assert asyncio.run(main()) <= 3
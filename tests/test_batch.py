@@ -0,0 +1,97 @@
+"""Tests for multi-file and directory processing."""
+
+import sys
+from unittest.mock import patch
+import pytest
+from md_semlinebreak.batch import discover_files, format_file, run_batch
+from md_semlinebreak.cli import main
+from md_semlinebreak.config import Config
+from .conftest import FORMATTED, UNFORMATTED
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """A small docs tree with formatted, unformatted and ignored files."""
+    (tmp_path / "a.md").write_text(UNFORMATTED, encoding='utf-8')
+    (tmp_path / "b.md").write_text(FORMATTED, encoding='utf-8')
+    (tmp_path / "notes.txt").write_text(UNFORMATTED, encoding='utf-8')
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "c.markdown").write_text(UNFORMATTED, encoding='utf-8')
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "d.md").write_text(UNFORMATTED, encoding='utf-8')
+    return tmp_path
+
+
+class TestDiscoverFiles:
+    """Test cases for expanding paths into Markdown files."""
+
+    def test_walks_directories(self, tree):
+        """Test that directories are walked with the default patterns."""
+        found = list(discover_files([str(tree)]))
+        names = sorted(p.replace(str(tree), '') for p in found)
+        assert names == ['/a.md', '/b.md', '/sub/c.markdown']
+
+    def test_include_pattern(self, tree):
+        """Test custom include patterns."""
+        found = list(discover_files([str(tree)], include=['*.txt']))
+        assert [p.replace(str(tree), '') for p in found] == ['/notes.txt']
+
+    def test_exclude_pattern(self, tree):
+        """Test that excluded directories are pruned."""
+        found = list(discover_files([str(tree)], exclude=['sub', 'node_modules']))
+        names = sorted(p.replace(str(tree), '') for p in found)
+        assert names == ['/a.md', '/b.md']
+
+    def test_explicit_files_always_included(self, tree):
+        """Test that files named explicitly bypass the include patterns."""
+        path = str(tree / "notes.txt")
+        assert list(discover_files([path, path])) == [path]
+
+
+class TestRunBatch:
+    """Test cases for formatting many files."""
+
+    def test_format_file_reports_change(self, tree):
+        """Test that format_file rewrites only changed files."""
+        result = format_file(str(tree / "a.md"), Config())
+        assert result.changed
+        assert (tree / "a.md").read_text(encoding='utf-8') == FORMATTED
+        assert not format_file(str(tree / "b.md"), Config()).changed
+
+    def test_missing_file_is_reported(self, tree):
+        """Test that unreadable files are reported rather than raised."""
+        result = format_file(str(tree / "missing.md"), Config())
+        assert result.error is not None
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_summary(self, tree, jobs):
+        """Test the changed and unchanged totals, serially and in a pool."""
+        files = list(discover_files([str(tree)]))
+        summary = run_batch(files, Config(), jobs=jobs)
+        assert len(summary.changed) == 2
+        assert len(summary.unchanged) == 1
+        assert summary.report() == "2 files changed, 1 unchanged, 2 written."
+        assert (tree / "sub" / "c.markdown").read_text(encoding='utf-8') == FORMATTED
+
+    def test_cli_directory_mode(self, tree, capsys):
+        """Test formatting a directory in place from the command line."""
+        with patch.object(sys, 'argv', ['mdfix', '-i', '-j', '1', str(tree)]):
+            main()
+        assert "2 files changed, 1 unchanged, 2 written." in capsys.readouterr().err
+        assert (tree / "node_modules" / "d.md").read_text(encoding='utf-8') == UNFORMATTED
+
+    def test_cli_multiple_files_require_in_place(self, tree):
+        """Test that batch mode refuses to interleave files on stdout."""
+        with patch.object(sys, 'argv', ['mdfix', str(tree / "a.md"), str(tree / "b.md")]):
+            with pytest.raises(SystemExit) as excinfo:
+                main()
+            assert excinfo.value.code == 2
+
+    def test_cli_check(self, tree, capsys):
+        """Test that --check reports without writing and sets the exit status."""
+        with pytest.raises(SystemExit) as excinfo:
+            main(['--check', '-j', '1', str(tree)])
+        assert excinfo.value.code == 1
+        assert "2 files would change, 1 unchanged." in capsys.readouterr().err
+        assert (tree / "a.md").read_text(encoding='utf-8') == UNFORMATTED
+        main(['--check', str(tree / "b.md")])
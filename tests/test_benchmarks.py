@@ -0,0 +1,60 @@
+"""Tests for the benchmark suite's corpus generator and comparison."""
+
+import pytest
+from benchmarks.compare import compare
+from benchmarks.corpus import SHAPES, generate
+from benchmarks.runner import run
+
+
+def _results(**entries):
+    return {'meta': {}, 'results': {
+        name: {'seconds': 1.0, 'mb_per_s': mbps, 'peak_mb': peak}
+        for name, (mbps, peak) in entries.items()
+    }}
+
+
+class TestCorpus:
+    """Test cases for the synthetic corpus generator."""
+
+    @pytest.mark.parametrize("shape", SHAPES)
+    def test_seeded_and_sized(self, shape):
+        """Test that each shape is reproducible and roughly the requested size."""
+        text = generate(shape, 5000, seed=3)
+        assert text == generate(shape, 5000, seed=3)
+        assert text != generate(shape, 5000, seed=4)
+        assert 5000 <= len(text) < 10000
+
+    def test_huge_paragraph_has_no_blank_lines(self):
+        """Test that the huge paragraph shape is a single paragraph."""
+        assert '\n\n' not in generate('huge_paragraph', 20000)
+
+    def test_unknown_shape(self):
+        """Test that unknown shapes are rejected."""
+        with pytest.raises(ValueError):
+            generate('poetry', 1000)
+
+
+class TestCompare:
+    """Test cases for checking results against a baseline."""
+
+    def test_within_thresholds(self):
+        """Test that small changes are not regressions."""
+        baseline = _results(a=(10.0, 1.0))
+        assert compare(baseline, _results(a=(9.5, 1.1))) == []
+
+    def test_throughput_and_memory_regressions(self):
+        """Test that slowdowns and memory growth past the thresholds are reported."""
+        baseline = _results(a=(10.0, 1.0), b=(10.0, 1.0))
+        current = _results(a=(8.0, 1.0), b=(10.0, 2.0))
+        regressions = compare(baseline, current)
+        assert [(r.name, r.metric) for r in regressions] == [('a', 'mb_per_s'), ('b', 'peak_mb')]
+        assert compare(baseline, current, threshold=0.3, memory_threshold=1.5) == []
+
+    def test_run_produces_comparable_results(self):
+        """Test that a tiny run produces every benchmark and compares cleanly with itself."""
+        results = run(size=2000, repeat=1, shapes=['prose'])
+        assert set(results['results']) == {
+            'format_markdown/prose', 'format_markdown_wrap/prose',
+            'format_paragraph/prose', 'normalize_unicode/prose'
+        }
+        assert compare(results, results) == []
@@ -0,0 +1,114 @@
+"""Tests for the Markdown block scanner."""
+
+import io
+import pytest
+from md_semlinebreak.blocks import (
+    BLANK, BLOCKQUOTE, FENCED_CODE, FRONT_MATTER, HEADING, HTML, INDENTED_CODE,
+    LIST, PARAGRAPH, SETEXT_HEADING, TABLE, THEMATIC_BREAK, scan_blocks,
+)
+from md_semlinebreak.formatter import format_markdown
+
+
+def kinds(text):
+    """Scan text and return (kind, start, end) for each block."""
+    return [(b.kind, b.start, b.end) for b in scan_blocks(io.StringIO(text))]
+
+
+class TestScanBlocks:
+    """Test cases for block classification."""
+
+    def test_blocks_cover_every_line(self):
+        """Test that blocks are contiguous and reproduce the input."""
+        text = "# H\n\nPara, one.\nmore\n\n```\ncode\n```\n- a\n- b\n"
+        blocks = list(scan_blocks(io.StringIO(text)))
+        assert ''.join(''.join(b.lines) for b in blocks) == text
+        assert all(a.end == b.start for a, b in zip(blocks, blocks[1:]))
+
+    @pytest.mark.parametrize("fence", ["```", "~~~", "````"])
+    def test_fences(self, fence):
+        """Test backtick and tilde fences."""
+        text = f"{fence}\na, b\n\n# not a heading\n{fence}\nText"
+        assert kinds(text) == [(FENCED_CODE, 0, 5), (PARAGRAPH, 5, 6)]
+
+    def test_fence_needs_matching_length_and_char(self):
+        """Test that a shorter or different fence doesn't close the block."""
+        text = "````\n```\n~~~~\n````\n"
+        assert kinds(text) == [(FENCED_CODE, 0, 4)]
+
+    def test_indented_code(self):
+        """Test indented code after a blank line but not inside a paragraph."""
+        assert kinds("    code, here\n    more\nText") == [(INDENTED_CODE, 0, 2), (PARAGRAPH, 2, 3)]
+        assert kinds("Text\n    lazy, continuation") == [(PARAGRAPH, 0, 2)]
+
+    def test_table(self):
+        """Test that a header row followed by a delimiter row starts a table."""
+        text = "Intro, text\n| a, b | c |\n|:---|---:|\n| 1, 2 | 3 |\n\nAfter"
+        assert kinds(text) == [
+            (PARAGRAPH, 0, 1), (TABLE, 1, 4), (BLANK, 4, 5), (PARAGRAPH, 5, 6)
+        ]
+
+    def test_html_blocks(self):
+        """Test HTML blocks ending at a blank line or at their closing marker."""
+        assert kinds("<div>\na, b\n</div>\n\nText") == [
+            (HTML, 0, 3), (BLANK, 3, 4), (PARAGRAPH, 4, 5)
+        ]
+        assert kinds("<!-- a,\n\nb -->\nText") == [(HTML, 0, 3), (PARAGRAPH, 3, 4)]
+        assert kinds("<span>inline</span>, text") == [(PARAGRAPH, 0, 1)]
+
+    def test_front_matter(self):
+        """Test YAML front matter at the top of the document only."""
+        assert kinds("---\ntitle: a, b\n---\nText") == [(FRONT_MATTER, 0, 3), (PARAGRAPH, 3, 4)]
+        assert kinds("Text\n\n---\na: b\n---\n") == [
+            (PARAGRAPH, 0, 1), (BLANK, 1, 2), (THEMATIC_BREAK, 2, 3), (SETEXT_HEADING, 3, 5)
+        ]
+
+    def test_unclosed_front_matter(self):
+        """Test that front matter without a closing line is rescanned as content."""
+        assert kinds("---\nText, here\n") == [(THEMATIC_BREAK, 0, 1), (PARAGRAPH, 1, 2)]
+
+    def test_setext_headings(self):
+        """Test setext underlines after paragraph text."""
+        assert kinds("Title, one\n===\nTitle, two\n---\n") == [
+            (SETEXT_HEADING, 0, 2), (SETEXT_HEADING, 2, 4)
+        ]
+
+    def test_atx_headings(self):
+        """Test that only real ATX headings are headings."""
+        assert kinds("# Title\n#hashtag, text") == [(HEADING, 0, 1), (PARAGRAPH, 1, 2)]
+
+    def test_nested_list_continuation(self):
+        """Test that indented and lazy lines stay inside a list."""
+        text = "- a, b\n  c, d\n\n  more, text\n  ```\n  x\n\n  ```\n1. e\nlazy, line\n\nAfter"
+        assert kinds(text) == [
+            (LIST, 0, 2), (BLANK, 2, 3), (LIST, 3, 4), (FENCED_CODE, 4, 8),
+            (LIST, 8, 10), (BLANK, 10, 11), (PARAGRAPH, 11, 12),
+        ]
+
+    def test_blockquote_lazy_continuation(self):
+        """Test that quote lines and their lazy continuations form one block."""
+        assert kinds("> a, b\nc, d\n\nText") == [
+            (BLOCKQUOTE, 0, 2), (BLANK, 2, 3), (PARAGRAPH, 3, 4)
+        ]
+
+
+class TestFormatterBlocks:
+    """Test cases for formatting with the block scanner."""
+
+    @pytest.mark.parametrize("text", [
+        "---\ntitle: a, b. c\n---\n",
+        "| a, b | c. d |\n|---|---|\n| 1, 2 | 3 |\n",
+        "~~~\ncode, here. Yes\n~~~\n",
+        "Title, with comma\n---\n",
+        "- item, one\n  continued, two. Three\n",
+        "<div>\nraw, html. Here\n</div>\n",
+        "    indented, code. Here\n",
+    ])
+    def test_non_prose_untouched(self, text):
+        """Test that non-prose blocks are passed through unchanged."""
+        assert format_markdown(text) == text
+
+    def test_paragraph_around_blocks(self):
+        """Test that paragraphs next to other blocks are still formatted."""
+        text = "One, two.\n| a | b |\n|---|---|\n| 1 | 2 |\n\nThree, four."
+        expected = "One,\ntwo.\n| a | b |\n|---|---|\n| 1 | 2 |\n\nThree,\nfour."
+        assert format_markdown(text) == expected
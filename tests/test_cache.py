@@ -0,0 +1,124 @@
+"""Tests for the formatted-files cache."""
+
+import os
+import pytest
+from md_semlinebreak import batch
+from md_semlinebreak.batch import run_batch
+from md_semlinebreak.cache import Cache, config_key
+from md_semlinebreak.config import Config
+from .conftest import FORMATTED, UNFORMATTED
+
+
+@pytest.fixture
+def docs(tmp_path):
+    """Two files, one already formatted."""
+    (tmp_path / "a.md").write_text(UNFORMATTED, encoding='utf-8')
+    (tmp_path / "b.md").write_text(FORMATTED, encoding='utf-8')
+    return [str(tmp_path / "a.md"), str(tmp_path / "b.md")]
+
+
+class TestCache:
+    """Test cases for skipping files already known to be formatted."""
+
+    def test_config_key_tracks_config(self):
+        """Test that different config values get different cache files."""
+        assert config_key(Config()) == config_key(Config())
+        assert config_key(Config()) != config_key(Config(break_at_clauses=False))
+
+    def test_second_run_hits_cache(self, docs, tmp_path, settled_stats):
+        """Test that formatted files are skipped on the next run."""
+        cache_dir = tmp_path / "cache"
+        first = run_batch(docs, Config(), cache=Cache(cache_dir, Config()))
+        assert first.cache_hits == 0
+        assert len(first.changed) == 1
+
+        second = run_batch(docs, Config(), cache=Cache(cache_dir, Config()))
+        assert second.cache_hits == 2
+        assert len(second.unchanged) == 2
+
+    def test_hit_skips_reading(self, docs, tmp_path, monkeypatch, settled_stats):
+        """Test that a stat match never calls format_file."""
+        cache_dir = tmp_path / "cache"
+        run_batch(docs, Config(), cache=Cache(cache_dir, Config()))
+
+        def fail(*args, **kwargs):
+            raise AssertionError("file was read")
+        monkeypatch.setattr(batch, 'format_file', fail)
+        run_batch(docs, Config(), cache=Cache(cache_dir, Config()))
+
+    def test_modified_file_is_reformatted(self, docs, tmp_path):
+        """Test that editing a cached file invalidates its entry."""
+        cache_dir = tmp_path / "cache"
+        run_batch(docs, Config(), cache=Cache(cache_dir, Config()))
+        with open(docs[1], 'a', encoding='utf-8') as f:
+            f.write("\nAnother line, with a clause.\n")
+
+        summary = run_batch(docs, Config(), cache=Cache(cache_dir, Config()))
+        assert summary.changed == [docs[1]]
+
+    def test_touched_file_hits_content_hash(self, docs, tmp_path, settled_stats):
+        """Test that a new mtime with the same content skips formatting."""
+        cache_dir = tmp_path / "cache"
+        run_batch(docs, Config(), cache=Cache(cache_dir, Config()))
+        st = os.stat(docs[1])
+        os.utime(docs[1], ns=(st.st_atime_ns, st.st_mtime_ns - 10**9))
+
+        cache = Cache(cache_dir, Config())
+        assert not cache.is_unchanged(docs[1])
+        summary = run_batch(docs, Config(), cache=cache)
+        assert summary.cache_hits == 1
+        assert len(summary.unchanged) == 2
+        assert Cache(cache_dir, Config()).is_unchanged(docs[1])
+
+    def test_eviction(self, docs, tmp_path, settled_stats):
+        """Test that the least recently used entries are evicted."""
+        cache_dir = tmp_path / "cache"
+        run_batch(docs, Config(), cache=Cache(cache_dir, Config(), max_entries=1))
+        cache = Cache(cache_dir, Config())
+        assert len(cache.entries) == 1
+        assert cache.is_unchanged(docs[1])
+
+    def test_restored_mtime_is_reformatted(self, docs, tmp_path, settled_stats):
+        """Test that a same-size rewrite keeping the old mtime misses the cache."""
+        cache_dir = tmp_path / "cache"
+        run_batch(docs, Config(), cache=Cache(cache_dir, Config()))
+        st = os.stat(docs[1])
+        # Same size as FORMATTED, mtime put back as cp -p or rsync -t would
+        with open(docs[1], 'w', encoding='utf-8') as f:
+            f.write(UNFORMATTED)
+        os.utime(docs[1], ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert os.stat(docs[1]).st_size == st.st_size
+
+        cache = Cache(cache_dir, Config())
+        assert not cache.is_unchanged(docs[1])
+        summary = run_batch(docs, Config(), cache=cache)
+        assert summary.cache_hits == 1
+        assert summary.changed == [docs[1]]
+
+    def test_racily_clean_file_is_hashed(self, docs, tmp_path, monkeypatch):
+        """Test that a file recorded right after it changed is hashed, not skipped."""
+        cache_dir = tmp_path / "cache"
+        run_batch(docs, Config(), cache=Cache(cache_dir, Config()))
+        cache = Cache(cache_dir, Config())
+        assert not cache.is_unchanged(docs[0])
+        assert not cache.is_unchanged(docs[1])
+
+        hashed = []
+        format_file = batch.format_file
+
+        def spy(path, *args, **kwargs):
+            hashed.append(path)
+            return format_file(path, *args, **kwargs)
+        monkeypatch.setattr(batch, 'format_file', spy)
+        summary = run_batch(docs, Config(), jobs=1, cache=cache)
+        assert sorted(hashed) == sorted(docs)
+        assert summary.cache_hits == 0
+        assert len(summary.unchanged) == 2
+
+    def test_old_entries_miss(self, docs, tmp_path, settled_stats):
+        """Test that entries without a ctime and inode never match a stat."""
+        cache_dir = tmp_path / "cache"
+        cache = Cache(cache_dir, Config())
+        st = os.stat(docs[1])
+        cache.entries[os.path.abspath(docs[1])] = [st.st_mtime_ns, st.st_size, 'x']
+        assert not cache.is_unchanged(docs[1])
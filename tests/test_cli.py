@@ -4,7 +4,9 @@ import sys
 from io import StringIO
 from unittest.mock import patch
 import pytest
+from md_semlinebreak import cli
 from md_semlinebreak.cli import main
+from md_semlinebreak.formatter import format_markdown
 
 
 class TestCLI:
@@ -62,4 +64,37 @@ class TestCLI:
             main()
         output = mock_stdout.getvalue()
         expected = '"Smart quotes" and em--dashes should be normalized.'
-        assert output == expected
\ No newline at end of file
+        assert output == expected
+
+    def test_wrap_option(self):
+        """Test --wrap with --max-line-length."""
+        text = 'We read the files in a tree or in any directory given on the command line.'
+        with patch('sys.stdin', StringIO(text)), \
+             patch('sys.stdout', new_callable=StringIO) as mock_stdout, \
+             patch.object(sys, 'argv', ['md-semlinebreak', '--wrap', '--max-line-length', '40']):
+            main()
+        output = mock_stdout.getvalue()
+        assert output == 'We read the files in a tree\nor in any directory given on\nthe command line.'
+
+
+class TestCLILargeFiles:
+    """Test cases for streaming large inputs into an output file."""
+
+    TEXT = "Long, document. With clauses; many.\n\n```\nx, y\n```\n\nCaf\u00e9, cr\u00e8me."
+
+    def test_output_file(self, tmp_path, monkeypatch):
+        """Test -o with a large input."""
+        path = tmp_path / 'big.md'
+        out = tmp_path / 'out.md'
+        path.write_text(self.TEXT, encoding='utf-8')
+        monkeypatch.setattr(cli, 'STREAM_THRESHOLD', 0)
+        main([str(path), '-o', str(out)])
+        assert out.read_bytes() == format_markdown(self.TEXT).encode('utf-8')
+
+    def test_output_onto_input(self, tmp_path, monkeypatch):
+        """Test that -o naming the input itself reads it before replacing it."""
+        path = tmp_path / 'big.md'
+        path.write_text(self.TEXT, encoding='utf-8')
+        monkeypatch.setattr(cli, 'STREAM_THRESHOLD', 0)
+        main([str(path), '-o', str(path)])
+        assert path.read_text(encoding='utf-8') == format_markdown(self.TEXT)
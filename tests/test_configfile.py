@@ -0,0 +1,179 @@
+"""Tests for config files found next to the files being formatted."""
+
+import os
+import pytest
+from md_semlinebreak import configfile
+from md_semlinebreak.batch import run_batch
+from md_semlinebreak.cache import Cache
+from md_semlinebreak.cli import main
+from md_semlinebreak.config import Config
+from md_semlinebreak.configfile import (
+    ConfigFileError, ConfigResolver, make_config, read_config_file,
+)
+from .conftest import FORMATTED, UNFORMATTED
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """A project whose pyproject.toml turns clause breaks off, except under strict/."""
+    (tmp_path / "pyproject.toml").write_text(
+        '[project]\nname = "x"\n\n[tool.mdfix]\nbreak-at-clauses = false\n', encoding='utf-8')
+    for directory in ["docs", "docs/guide", "strict", "strict/deep"]:
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "a.md").write_text(UNFORMATTED, encoding='utf-8')
+    (tmp_path / "strict" / ".mdfix.toml").write_text("max_line_length = 100\n", encoding='utf-8')
+    (tmp_path / "strict" / "pyproject.toml").write_text(
+        "[tool.mdfix]\nbreak_at_sentences = false\n", encoding='utf-8')
+    return tmp_path
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Record the config files parsed."""
+    paths = []
+    load = configfile._load_toml
+
+    def counting(path):
+        paths.append(path)
+        return load(path)
+    monkeypatch.setattr(configfile, '_load_toml', counting)
+    return paths
+
+
+class TestReadConfigFile:
+    """Test cases for reading one config file."""
+
+    def test_dashes_and_underscores(self, tmp_path):
+        """Test that keys may use either, and map to Config fields."""
+        path = tmp_path / ".mdfix.toml"
+        path.write_text('max-line-length = 90\nclause_break_punctuation = [","]\n'
+                        '[unicode-replacements]\n"→" = "->"\n', encoding='utf-8')
+        assert read_config_file(str(path)) == {
+            'max_line_length': 90,
+            'clause_break_punctuation': [','],
+            'unicode_replacements': {'→': '->'},
+        }
+
+    def test_pyproject_without_table(self, tmp_path):
+        """Test that a pyproject.toml without [tool.mdfix] isn't a config file."""
+        path = tmp_path / "pyproject.toml"
+        path.write_text('[tool.black]\nline-length = 90\n', encoding='utf-8')
+        assert read_config_file(str(path)) is None
+
+    @pytest.mark.parametrize("text, message", [
+        ("no-such-option = 1\n", "unknown option 'no-such-option'"),
+        ("max-line-length = true\n", "max-line-length must be an integer"),
+        ("wrap-long-lines = 1\n", "wrap-long-lines must be true or false"),
+        ("conjunction-words = ['and', 1]\n", "conjunction-words must be a list of strings"),
+        ("max-line-length = \n", ".mdfix.toml: "),
+    ])
+    def test_invalid(self, tmp_path, text, message):
+        """Test that bad TOML, unknown options and wrong types are reported with the path."""
+        path = tmp_path / ".mdfix.toml"
+        path.write_text(text, encoding='utf-8')
+        with pytest.raises(ConfigFileError, match=message):
+            read_config_file(str(path))
+
+    def test_soft_wrap_follows_max_line_length(self):
+        """Test that soft_wrap_length is derived unless given."""
+        assert make_config({'max_line_length': 100}).soft_wrap_length == 90
+        assert make_config({'max_line_length': 100, 'soft_wrap_length': 60}).soft_wrap_length == 60
+        assert make_config({}) == Config()
+
+
+class TestConfigResolver:
+    """Test cases for finding the config of each file."""
+
+    def test_nearest_file_wins(self, tree):
+        """Test that the nearest config file applies, .mdfix.toml before pyproject.toml."""
+        resolver = ConfigResolver()
+        assert resolver.resolve(str(tree / "docs" / "guide" / "a.md")) == Config(break_at_clauses=False)
+        assert resolver.config_file(str(tree / "strict" / "deep")) == str(tree / "strict" / ".mdfix.toml")
+        # Settings aren't merged with the pyproject.toml further up
+        assert resolver.resolve(str(tree / "strict" / "deep" / "a.md")) == make_config({'max_line_length': 100})
+
+    def test_overrides(self, tree):
+        """Test that overrides win over config files."""
+        resolver = ConfigResolver({'break_at_clauses': True, 'max_line_length': 60})
+        assert resolver.resolve(str(tree / "docs" / "a.md")) == make_config({'max_line_length': 60})
+        assert ConfigResolver(discover=False).resolve(str(tree / "docs" / "a.md")) == Config()
+
+    def test_stdin_uses_current_directory(self, tree, monkeypatch):
+        """Test that standard input gets the config of the current directory."""
+        monkeypatch.chdir(tree / "docs")
+        assert not ConfigResolver().resolve().break_at_clauses
+
+    def test_each_file_read_once(self, tree, reads):
+        """Test that resolving many files reads each config file once."""
+        resolver = ConfigResolver()
+        for _ in range(3):
+            for directory in ["docs", "docs/guide", "strict", "strict/deep"]:
+                resolver.resolve(str(tree / directory / "a.md"))
+        # strict/pyproject.toml is shadowed by .mdfix.toml and never read
+        assert sorted(reads) == sorted([str(tree / "pyproject.toml"),
+                                        str(tree / "strict" / ".mdfix.toml")])
+
+    def test_equal_configs_shared(self, tree):
+        """Test that files with equal settings get the same Config object."""
+        (tree / "docs" / ".mdfix.toml").write_text("break-at-clauses = false\n", encoding='utf-8')
+        resolver = ConfigResolver()
+        configs = {id(resolver.resolve(str(tree / directory / "a.md")))
+                   for directory in ["", "docs", "docs/guide"]}
+        assert len(configs) == 1
+
+    def test_no_toml_reader(self, tree, monkeypatch):
+        """Test that without a TOML reader pyproject.toml is skipped, but .mdfix.toml fails."""
+        monkeypatch.setattr(configfile, '_toml_module', lambda: None)
+        resolver = ConfigResolver()
+        assert resolver.resolve(str(tree / "docs" / "a.md")) == Config()
+        with pytest.raises(ConfigFileError, match="needs the tomli package"):
+            resolver.resolve(str(tree / "strict" / "a.md"))
+
+    @pytest.mark.parametrize("text, message", [
+        ('conjunction-language = "xx"\n', "no conjunction list"),
+        ('[unicode-replacements]\n"\\u2028" = "\\n"\n', "unicode_replacements can't replace or insert line breaks"),
+    ])
+    def test_invalid_config(self, tree, text, message):
+        """Test that settings Config rejects are reported with the file's path."""
+        (tree / "docs" / ".mdfix.toml").write_text(text, encoding='utf-8')
+        with pytest.raises(ConfigFileError, match=r"\.mdfix\.toml: " + message):
+            ConfigResolver().resolve(str(tree / "docs" / "a.md"))
+
+
+class TestConfigFilesInRuns:
+    """Test cases for batch and command line runs using config files."""
+
+    def test_batch_per_file_configs(self, tree, tmp_path_factory, settled_stats):
+        """Test that each file is formatted and cached under its own config."""
+        cache_dir = tmp_path_factory.mktemp("cache")
+        resolver = ConfigResolver()
+        paths = [str(tree / "docs" / "a.md"), str(tree / "strict" / "a.md")]
+        summary = run_batch(paths, resolver.base, jobs=2, cache=Cache(cache_dir, resolver.base),
+                            resolve=resolver.resolve)
+        assert summary.changed == [paths[1]]
+        assert (tree / "strict" / "a.md").read_text(encoding='utf-8') == FORMATTED
+        assert len(os.listdir(cache_dir)) == 2
+
+        again = run_batch(paths, resolver.base, cache=Cache(cache_dir, resolver.base),
+                          resolve=resolver.resolve)
+        assert again.cache_hits == 2
+
+    def test_cli(self, tree, capsys):
+        """Test that the command line picks up config files, and that flags override them."""
+        main(['-i', '-j', '1', str(tree / "docs")])
+        assert (tree / "docs" / "a.md").read_text(encoding='utf-8') == UNFORMATTED
+        main([str(tree / "strict" / "a.md")])
+        assert capsys.readouterr().out == FORMATTED
+        main(['--no-config', str(tree / "docs" / "a.md")])
+        assert capsys.readouterr().out == FORMATTED
+        main(['--no-clause-breaks', str(tree / "strict" / "deep" / "a.md")])
+        assert capsys.readouterr().out == UNFORMATTED
+
+    def test_cli_invalid_config(self, tree, capsys):
+        """Test that a bad config file stops the run before anything is written."""
+        (tree / "strict" / ".mdfix.toml").write_text("max-line-length = 'x'\n", encoding='utf-8')
+        with pytest.raises(SystemExit) as excinfo:
+            main(['-i', '-j', '1', str(tree)])
+        assert excinfo.value.code == 1
+        assert "max-line-length must be an integer" in capsys.readouterr().err
+        assert (tree / "strict" / "deep" / "a.md").read_text(encoding='utf-8') == UNFORMATTED
@@ -0,0 +1,145 @@
+"""Tests for unified diffs of formatting changes."""
+
+import pytest
+from md_semlinebreak.batch import format_file
+from md_semlinebreak.cli import main
+from md_semlinebreak.config import Config
+from md_semlinebreak.diff import unified_diff
+from md_semlinebreak.formatter import Formatter, format_markdown
+
+DOCUMENT = (
+    "Title\n"
+    "=====\n"
+    "\n"
+    "One, two. Three.\n"
+    "\n"
+    "```\n"
+    "x, y\n"
+    "```\n"
+    "\n"
+    "Already,\n"
+    "fine.\n"
+    "\n"
+    "Last, one"
+)
+
+
+def _diff(text, config=Config()):
+    changes = Formatter(config).iter_changes(text.splitlines(keepends=True))
+    return ''.join(unified_diff(changes, 'a/doc.md', 'b/doc.md'))
+
+
+def _patch(text: str, diff: str) -> str:
+    """Apply a unified diff made of whole-line replacements, without context."""
+    lines = text.splitlines(keepends=True)
+    result = []
+    pos = 0
+    for line in diff.splitlines(keepends=True)[2:]:
+        if line.startswith('@@'):
+            old = line.split()[1][1:]
+            start, _, count = old.partition(',')
+            start = int(start) - (0 if count == '0' else 1)
+            result.extend(lines[pos:start])
+            pos = start + (int(count) if count else 1)
+        elif line.startswith('+'):
+            result.append(line[1:])
+        elif line.startswith('\\') and result and line_was_added:
+            result[-1] = result[-1].rstrip('\n')
+        line_was_added = line.startswith('+')
+    result.extend(lines[pos:])
+    return ''.join(result)
+
+
+class TestUnifiedDiff:
+    """Test cases for unified_diff."""
+
+    def test_hunks(self):
+        """Test that only changed paragraphs appear, with correct ranges."""
+        assert _diff(DOCUMENT) == (
+            "--- a/doc.md\n"
+            "+++ b/doc.md\n"
+            "@@ -4 +4,3 @@\n"
+            "-One, two. Three.\n"
+            "+One,\n"
+            "+two.\n"
+            "+Three.\n"
+            "@@ -13 +15,2 @@\n"
+            "-Last, one\n"
+            "\\ No newline at end of file\n"
+            "+Last,\n"
+            "+one\n"
+            "\\ No newline at end of file\n"
+        )
+
+    def test_no_changes(self):
+        """Test that a formatted document gives an empty diff."""
+        assert _diff(format_markdown(DOCUMENT)) == ''
+
+    @pytest.mark.parametrize("config", [Config(), Config(normalize_unicode=True)])
+    def test_diff_applies(self, config):
+        """Test that applying the diff gives the formatted document."""
+        text = DOCUMENT.replace("Three", "“Three”") + "\n\n- a, b\n- c. d\n"
+        expected = format_markdown(text if not config.normalize_unicode
+                                   else Formatter(config).normalize_unicode(text), config)
+        assert _patch(text, _diff(text, config)) == expected
+
+
+class TestCheckAndDiffFiles:
+    """Test cases for checking files without writing them."""
+
+    def test_check_result(self, tmp_path):
+        """Test that a check reports the change and leaves the file."""
+        path = tmp_path / 'doc.md'
+        path.write_text(DOCUMENT, encoding='utf-8')
+        result = format_file(str(path), Config(), write=False)
+        assert result.changed and result.diff is None
+        assert path.read_text(encoding='utf-8') == DOCUMENT
+
+    def test_carriage_returns_count_as_change(self, tmp_path):
+        """Test that CRLF line endings would be rewritten."""
+        path = tmp_path / 'doc.md'
+        path.write_bytes(format_markdown(DOCUMENT).replace('\n', '\r\n').encode('utf-8'))
+        assert format_file(str(path), Config(), write=False).changed
+
+    @pytest.mark.parametrize("text", [DOCUMENT, format_markdown(DOCUMENT)])
+    def test_carriage_returns_diff(self, tmp_path, text):
+        """Test that a CRLF file's diff replaces it whole, matching its line endings."""
+        path = tmp_path / 'doc.md'
+        original = text.replace('\n', '\r\n')
+        path.write_bytes(original.encode('utf-8'))
+        result = format_file(str(path), Config(), write=False, diff=True)
+        assert result.changed
+        removed = [line for line in result.diff.splitlines(keepends=True)[2:] if line[0] == '-']
+        assert len(removed) == len(original.splitlines())
+        assert all(line.endswith('\r\n') for line in removed[:-1])
+        assert _patch(original, result.diff) == format_markdown(DOCUMENT)
+
+    def test_cli_diff(self, tmp_path, capsys):
+        """Test that --diff prints a patch and leaves files alone."""
+        path = tmp_path / 'doc.md'
+        path.write_text(DOCUMENT, encoding='utf-8')
+        (tmp_path / 'ok.md').write_text(format_markdown(DOCUMENT), encoding='utf-8')
+        main(['--diff', '-j', '1', '--no-cache', str(tmp_path)])
+        captured = capsys.readouterr()
+        assert captured.out.startswith(f"--- a/{path.as_posix().lstrip('/')}\n")
+        assert captured.out.count('---') == 1
+        assert "1 file would change, 1 unchanged." in captured.err
+        assert path.read_text(encoding='utf-8') == DOCUMENT
+
+    def test_cli_check_with_diff(self, tmp_path, capsys):
+        """Test that --check --diff prints the patch and fails."""
+        path = tmp_path / 'doc.md'
+        path.write_text(DOCUMENT, encoding='utf-8')
+        with pytest.raises(SystemExit) as excinfo:
+            main(['--check', '--diff', str(path)])
+        assert excinfo.value.code == 1
+        captured = capsys.readouterr()
+        assert "+Three." in captured.out
+        assert "Would reformat" in captured.err
+
+    @pytest.mark.parametrize("argv", [['--diff'], ['--diff', '-i', 'a.md'], ['--diff', 'a.md', '-o', 'b.md']])
+    def test_invalid_combinations(self, argv):
+        """Test that --diff rejects writing options."""
+        with pytest.raises(SystemExit) as excinfo:
+            main(argv)
+        assert excinfo.value.code == 2
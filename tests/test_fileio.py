@@ -0,0 +1,139 @@
+"""Tests for atomic, write-only-if-changed output."""
+
+import os
+import stat
+import pytest
+from md_semlinebreak import batch
+from md_semlinebreak.batch import format_file, run_batch
+from md_semlinebreak.cli import main
+from md_semlinebreak.config import Config
+from md_semlinebreak.fileio import AtomicWriter, sync_files, write_atomic
+from .conftest import FORMATTED, UNFORMATTED
+
+# An mtime far enough in the past that any rewrite would show
+OLD_MTIME_NS = 1_000_000_000 * 10**9
+
+
+def _age(path):
+    os.utime(path, ns=(OLD_MTIME_NS, OLD_MTIME_NS))
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+class TestWriteAtomic:
+    """Test cases for write_atomic and AtomicWriter."""
+
+    def test_new_file(self, tmp_path):
+        """Test that a new file gets the umask's default permissions."""
+        path = tmp_path / 'new.md'
+        umask = os.umask(0o022)
+        try:
+            assert write_atomic(str(path), b'data')
+        finally:
+            os.umask(umask)
+        assert path.read_bytes() == b'data'
+        assert _mode(path) == 0o644
+
+    def test_unchanged_content_not_written(self, tmp_path):
+        """Test that identical content leaves the file and its mtime alone."""
+        path = tmp_path / 'same.md'
+        path.write_bytes(b'data')
+        _age(path)
+        assert not write_atomic(str(path), b'data')
+        assert os.stat(path).st_mtime_ns == OLD_MTIME_NS
+
+    def test_preserves_permissions(self, tmp_path):
+        """Test that a replaced file keeps its mode."""
+        path = tmp_path / 'script.md'
+        path.write_bytes(b'old')
+        path.chmod(0o750)
+        assert write_atomic(str(path), b'new')
+        assert path.read_bytes() == b'new'
+        assert _mode(path) == 0o750
+
+    def test_writes_through_symlink(self, tmp_path):
+        """Test that the target of a symlink is replaced, not the link."""
+        target = tmp_path / 'target.md'
+        target.write_bytes(b'old')
+        link = tmp_path / 'link.md'
+        link.symlink_to(target)
+        write_atomic(str(link), b'new')
+        assert link.is_symlink()
+        assert target.read_bytes() == b'new'
+
+    def test_error_leaves_original(self, tmp_path):
+        """Test that a failed write keeps the old content and cleans up."""
+        path = tmp_path / 'doc.md'
+        path.write_bytes(b'old')
+        with pytest.raises(RuntimeError):
+            with AtomicWriter(str(path)) as f:
+                f.write(b'partial')
+                raise RuntimeError
+        assert path.read_bytes() == b'old'
+        assert os.listdir(tmp_path) == ['doc.md']
+
+    def test_writer_compares(self, tmp_path):
+        """Test that AtomicWriter skips content the file already holds."""
+        path = tmp_path / 'doc.md'
+        path.write_bytes(b'same')
+        _age(path)
+        writer = AtomicWriter(str(path), fsync=False)
+        with writer as f:
+            f.write(b'same')
+        assert not writer.written
+        assert os.stat(path).st_mtime_ns == OLD_MTIME_NS
+        assert os.listdir(tmp_path) == ['doc.md']
+
+    def test_sync_files(self, tmp_path):
+        """Test that syncing tolerates files removed since they were written."""
+        path = tmp_path / 'doc.md'
+        path.write_bytes(b'data')
+        sync_files([str(path), str(tmp_path / 'gone.md')])
+
+
+class TestInPlaceWrites:
+    """Test cases for in-place and -o writes."""
+
+    def test_format_file_reports_written(self, tmp_path):
+        """Test that only changed files are written, keeping their mode."""
+        changed = tmp_path / 'a.md'
+        changed.write_text(UNFORMATTED, encoding='utf-8')
+        changed.chmod(0o600)
+        unchanged = tmp_path / 'b.md'
+        unchanged.write_text(FORMATTED, encoding='utf-8')
+        _age(unchanged)
+        assert format_file(str(changed), Config()).written
+        assert _mode(changed) == 0o600
+        assert not format_file(str(unchanged), Config()).written
+        assert os.stat(unchanged).st_mtime_ns == OLD_MTIME_NS
+
+    def test_batch_defers_fsync(self, tmp_path, monkeypatch):
+        """Test that a batch syncs the files it wrote once, at the end."""
+        paths = []
+        for name in ['a.md', 'b.md', 'c.md']:
+            path = tmp_path / name
+            path.write_text(FORMATTED if name == 'c.md' else UNFORMATTED, encoding='utf-8')
+            paths.append(str(path))
+        synced = []
+        monkeypatch.setattr(batch, 'sync_files', synced.append)
+        fsyncs = []
+        monkeypatch.setattr(os, 'fsync', fsyncs.append)
+        summary = run_batch(paths, Config())
+        assert summary.written == paths[:2]
+        assert synced == [paths[:2]]
+        assert fsyncs == []
+        run_batch(paths, Config(), fsync=False)
+        assert len(synced) == 1
+
+    def test_output_file_unchanged(self, tmp_path):
+        """Test that -o leaves an output that already matches alone."""
+        source = tmp_path / 'in.md'
+        source.write_text(UNFORMATTED, encoding='utf-8')
+        output = tmp_path / 'out.md'
+        main([str(source), '-o', str(output), '--no-daemon'])
+        assert output.read_text(encoding='utf-8') == FORMATTED
+        _age(output)
+        main([str(source), '-o', str(output), '--no-daemon', '--no-fsync'])
+        assert os.stat(output).st_mtime_ns == OLD_MTIME_NS
@@ -1,7 +1,14 @@
 """Tests for the semantic break formatter."""
 
+import random
+import time
 import pytest
-from md_semlinebreak.formatter import format_paragraph, format_markdown, normalize_unicode
+from md_semlinebreak.formatter import (
+    Formatter, format_paragraph, format_markdown, get_formatter,
+    is_formatted, iter_format_markdown, normalize_unicode
+)
+from md_semlinebreak.formatter import _break_lines, _line_cost
+from md_semlinebreak.blocks import PARAGRAPH, scan_blocks
 from md_semlinebreak.config import Config
 
 
@@ -78,6 +85,226 @@ class TestSemanticBreakFormatter:
         assert result.strip() == ""
 
 
+class TestIterFormatMarkdown:
+    """Test cases for the streaming formatter."""
+
+    @pytest.mark.parametrize("text", [
+        "",
+        "\n",
+        "One, two.\nThree, four.",
+        "# Header\n\nA paragraph, with a clause.\n\n```\ncode, here\n```\n",
+        "- item, one\n- item, two\n\ntrailing text, unterminated",
+        "  indented, text  \r\nnext line\r\n",
+    ])
+    def test_matches_format_markdown(self, text):
+        """Test that streamed output equals whole-document output."""
+        lines = text.splitlines(keepends=True)
+        assert ''.join(iter_format_markdown(lines)) == format_markdown(text)
+
+    def test_yields_before_input_is_exhausted(self):
+        """Test that a paragraph is emitted as soon as it closes."""
+        consumed = []
+
+        def lines():
+            for line in ["First, paragraph.\n", "\n", "Second, paragraph.\n"]:
+                consumed.append(line)
+                yield line
+
+        chunks = iter_format_markdown(lines())
+        assert next(chunks) == "First,\nparagraph.\n"
+        assert len(consumed) == 2
+
+
+def _best_time(func, text, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class TestLinearScaling:
+    """Stress tests for adversarial paragraph shapes."""
+
+    ADVERSARIAL = {
+        'no punctuation': lambda n: 'word ' * (n // 5),
+        'bare commas': lambda n: ',' * n,
+        'spaced commas': lambda n: ', ' * (n // 2),
+        'short clauses': lambda n: 'ab, ' * (n // 4),
+        'short sentences': lambda n: 'Ab. ' * (n // 4),
+        'whitespace run': lambda n: 'a' + ' ' * n + '. b',
+        'links': lambda n: '[a, b](http://x.y/c). ' * (n // 22),
+        'code spans': lambda n: ''.join('`' * (k % 20 + 1) + 'a, ' for k in range(n // 14)),
+        'open fence': lambda n: '```a, ' + 'b, ' * (n // 3) + '`',
+        'open comment': lambda n: '<!-- a, ' * (n // 8),
+    }
+
+    @pytest.mark.parametrize("shape", ADVERSARIAL)
+    def test_linear_scaling(self, shape):
+        """Test that eight times the input takes nowhere near 64 times as long."""
+        make = self.ADVERSARIAL[shape]
+        small = _best_time(format_paragraph, make(100_000))
+        large = _best_time(format_paragraph, make(800_000))
+        assert large < 24 * max(small, 1e-3)
+
+    @pytest.mark.parametrize("shape", ['no punctuation', 'short clauses'])
+    def test_wrap_linear_scaling(self, shape):
+        """Test that wrapping long clauses stays near linear too."""
+        make = self.ADVERSARIAL[shape]
+        wrap = Formatter(Config(wrap_long_lines=True, soft_wrap_length=8)).format_paragraph
+        small = _best_time(wrap, make(25_000))
+        large = _best_time(wrap, make(200_000))
+        assert large < 24 * max(small, 1e-3)
+
+    def test_ten_megabyte_paragraph(self):
+        """Test a 10 MB paragraph with no punctuation at all."""
+        text = 'word ' * 2_000_000
+        assert format_paragraph(text) == text.strip()
+
+    def test_million_commas(self):
+        """Test a million comma-separated fragments."""
+        text = 'a, ' * 1_000_000
+        result = format_paragraph(text)
+        assert result.count('\n') == 999_999
+        assert format_paragraph(',' * 1_000_000) == ',' * 1_000_000
+
+
+# Fragments that exercise break points, block markers and whitespace
+_FRAGMENTS = [
+    'word', 'Word', 'e.g.', 'x,y', '"Hi."', '(a)', '.', ',', ';', ':', '!', '?',
+    '-', '--', '---', '*', '***', '+', '_', '#', '##', '1.', '2)', '>', '|',
+    '|---|', '=', '===', '```', '~~~', '<div>', '<span>', '<!--', '-->',
+    '`', '``', '`a,', '[x,', 'y]', '](u)', '$a,', 'b$', '<b', 'c="d,', '">', '\\',
+    'and', 'Or', 'for-', "so'", '\u2014', 'x;',
+]
+
+
+def _random_markdown(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(1, 12)):
+        if rng.random() < 0.2:
+            lines.append('')
+            continue
+        words = [rng.choice(_FRAGMENTS) + rng.choice([' ', ' ', '', '  ', '\t'])
+                 for _ in range(rng.randint(1, 12))]
+        lines.append(''.join(words))
+    return '\n'.join(lines) + rng.choice(['', '\n'])
+
+
+class TestIdempotency:
+    """Property tests for formatting output that is formatted again."""
+
+    CONFIGS = [
+        Config(),
+        Config(break_at_clauses=False),
+        Config(clause_break_punctuation=[',', '-']),
+        Config(clause_break_punctuation=[','], conjunction_case_sensitive=True),
+        Config(wrap_long_lines=True, soft_wrap_length=12, max_line_length=20),
+    ]
+
+    @pytest.mark.parametrize("config", CONFIGS)
+    def test_format_is_idempotent(self, config):
+        """Test that format(format(x)) == format(x) for random documents."""
+        rng = random.Random(20240601)
+        for _ in range(1000):
+            text = _random_markdown(rng)
+            once = format_markdown(text, config)
+            assert format_markdown(once, config) == once, repr(text)
+
+    @pytest.mark.parametrize("config", CONFIGS)
+    def test_fast_path_matches_full_format(self, config):
+        """Test that paragraphs taken as formatted would format to themselves."""
+        formatter = Formatter(config)
+        rng = random.Random(7)
+        for _ in range(1000):
+            text = formatter.format_markdown(_random_markdown(rng))
+            for block in scan_blocks(text.splitlines(keepends=True)):
+                if block.kind == PARAGRAPH and formatter._is_formatted(block.lines):
+                    joined = ' '.join(line.strip() for line in block.lines)
+                    newline = '\n' if block.lines[-1].endswith('\n') else ''
+                    assert formatter.format_paragraph(joined) + newline == ''.join(block.lines)
+
+    def test_formatted_paragraph_not_segmented_again(self, monkeypatch):
+        """Test that a paragraph at its fixpoint is copied through."""
+        formatter = Formatter()
+        text = formatter.format_markdown("One, two. Three; four.\n\nFive, six.\n")
+
+        def fail(paragraph):
+            raise AssertionError(paragraph)
+
+        monkeypatch.setattr(formatter, 'format_paragraph', fail)
+        assert formatter.format_markdown(text) == text
+
+    @pytest.mark.parametrize("text", [
+        "One, two\n",
+        "One,  two.\n",
+        "  One.\n",
+        "One .\nTwo\n",
+        "One,\n.\nTwo\n",
+    ])
+    def test_unformatted_paragraph_detected(self, text):
+        """Test that near misses still go through the full formatter."""
+        assert not Formatter()._is_formatted(text.splitlines(keepends=True))
+
+    @pytest.mark.parametrize("text, expected", [
+        ("Wait. --", "Wait. --"),
+        ("Steps: 1. mix", "Steps: 1.\nmix"),
+        ("A title. ===", "A title. ==="),
+        ("Code: ```js here", "Code: ```js here"),
+        ("See: <div> here", "See: <div> here"),
+        ("Quote: > this", "Quote: > this"),
+        ("Go; # here", "Go; # here"),
+        ("Go, - here", "Go, - here"),
+    ])
+    def test_no_break_before_block_marker(self, text, expected):
+        """Test that no line starts with a marker that would split the paragraph."""
+        assert format_paragraph(text) == expected
+        assert format_markdown(expected) == expected
+
+
+def _apply_changes(text: str, changes) -> str:
+    """Rebuild a document from its lines with the changed blocks replaced."""
+    lines = text.splitlines(keepends=True)
+    for change in reversed(list(changes)):
+        lines[change.start:change.start + len(change.lines)] = [change.formatted]
+    return ''.join(lines)
+
+
+class TestChanges:
+    """Test cases for finding the blocks formatting would change."""
+
+    @pytest.mark.parametrize("config", [Config(), Config(normalize_unicode=True)])
+    def test_matches_full_format(self, config):
+        """Test that is_formatted and the changed blocks agree with formatting the whole text."""
+        formatter = Formatter(config)
+        rng = random.Random(11)
+        for _ in range(500):
+            text = _random_markdown(rng)
+            if rng.random() < 0.3:
+                text = text.replace('word', '\u201cword\u201d')
+            expected = formatter.format_markdown(
+                formatter.normalize_unicode(text) if config.normalize_unicode else text)
+            assert formatter.is_formatted(text) == (expected == text), repr(text)
+            changes = list(formatter.iter_changes(text.splitlines(keepends=True)))
+            assert _apply_changes(text, changes) == expected, repr(text)
+
+    def test_stops_at_first_change(self, monkeypatch):
+        """Test that checking formats no paragraph past the first that changes."""
+        formatter = Formatter()
+        reflowed = []
+        original = formatter._reflow
+        monkeypatch.setattr(formatter, '_reflow', lambda lines: reflowed.append(lines) or original(lines))
+        assert not formatter.is_formatted("Fine.\n\nOne, two.\n\nThree, four.\n\nFive, six.\n")
+        assert reflowed == [["One, two.\n"]]
+
+    def test_module_function(self):
+        """Test is_formatted with a config."""
+        assert is_formatted("One,\ntwo.\n")
+        assert not is_formatted("One, two.\n")
+        assert is_formatted("One, two.\n", Config(break_at_clauses=False))
+
+
 class TestNormalizeUnicode:
     """Test cases for Unicode normalization."""
     
@@ -130,6 +357,31 @@ class TestNormalizeUnicode:
         result = normalize_unicode(text)
         assert result == expected
 
+    def test_ascii_returned_as_is(self):
+        """Test that ASCII-only text skips the replacement work entirely."""
+        text = 'Plain ASCII text, nothing to do.' * 100
+        assert normalize_unicode(text) is text
+
+    def test_custom_replacements(self):
+        """Test that config mappings extend and override the built-in table."""
+        config = Config(unicode_replacements={'\u2192': '->', '\u2014': ' - '})
+        text = "Next \u2192 then\u2014now \u201Cquoted\u201D"
+        expected = 'Next -> then - now "quoted"'
+        assert normalize_unicode(text, config) == expected
+
+    def test_custom_replacements_single_pass(self):
+        """Test that replacements are not applied to each other's output."""
+        config = Config(unicode_replacements={'--': '\u2014', 'ae': '\u00E6'})
+        text = "em--dash \u2014 and aether"
+        expected = "em\u2014dash -- and \u00E6ther"
+        assert normalize_unicode(text, config) == expected
+
+    @pytest.mark.parametrize("replacements", [{' ': '\n'}, {'\u2028': '\r\n'}, {'\n': ' '}, {'\r': ''}])
+    def test_custom_replacements_keep_newlines(self, replacements):
+        """Test that mappings adding or removing line breaks are rejected."""
+        with pytest.raises(ValueError, match="line breaks"):
+            Config(unicode_replacements=replacements)
+
 
 class TestConfig:
     """Test cases for configuration functionality."""
@@ -199,4 +451,246 @@ class TestConfig:
         assert len(lines) > 1
         for line in lines:
             if line.strip():  # Ignore empty lines
-                assert len(line) <= 80  # Still respect max length
\ No newline at end of file
+                assert len(line) <= 80  # Still respect max length
+
+def _wrapping_cost(lengths, breaks, target, limit, penalties):
+    """Total cost of breaking words into lines, as _break_lines minimizes it."""
+    bounds = [0] + breaks + [len(lengths)]
+    total = sum(penalties[i] for i in breaks)
+    for start, end in zip(bounds, bounds[1:]):
+        width = sum(lengths[start:end]) + end - start - 1
+        if end < len(lengths) or width > target:
+            total += _line_cost(width, target, limit)
+    return total
+
+
+def _best_wrapping_cost(lengths, target, limit, penalties):
+    """Minimum cost found by trying every earlier break for every word."""
+    n = len(lengths)
+    best = [0] + [float('inf')] * (n - 1)
+    for j in range(1, n):
+        for i in range(j):
+            width = sum(lengths[i:j]) + j - i - 1
+            best[j] = min(best[j], best[i] + _line_cost(width, target, limit) + penalties[j])
+    return min(best[i] + _wrapping_cost(lengths[i:], [], target, limit, [])
+               for i in range(n))
+
+
+class TestConjunctions:
+    """Test cases for breaks before conjunctions."""
+
+    COMMAS = Config(clause_break_punctuation=[','])
+    DASHES = Config(break_at_dashes=True)
+
+    @pytest.mark.parametrize("text, expected", [
+        ("It rained -- and we stayed in.", "It rained --\nand we stayed in."),
+        ("It rained \u2014 but not for long.", "It rained \u2014\nbut not for long."),
+        ("It rained -- all day.", "It rained -- all day."),
+        ("Pre -- and-post processing.", "Pre -- and-post processing."),
+        ("Dashes--and no spaces.", "Dashes--and no spaces."),
+        ("This book is for developers who know two or more languages.",
+         "This book is for developers who know two or more languages."),
+    ])
+    def test_after_dashes(self, text, expected):
+        """Test that dashes break before a conjunction and nowhere else, when asked to."""
+        assert format_paragraph(text, self.DASHES) == expected
+        assert format_paragraph(text) == text
+
+    def test_after_clause_punctuation_left_out(self):
+        """Test that punctuation left out of clause breaks still breaks before a conjunction."""
+        text = "Commas, break; semicolons: don't; but they do; so here."
+        assert format_paragraph(text, self.COMMAS) == (
+            "Commas,\nbreak; semicolons: don't;\nbut they do;\nso here.")
+
+    def test_disabled(self):
+        """Test that conjunction breaks follow break_at_conjunctions and break_at_clauses."""
+        text = "Rain; and then sun -- or not."
+        assert format_paragraph(text, Config(clause_break_punctuation=[',', ';'],
+                                             break_at_conjunctions=False)) == "Rain;\nand then sun -- or not."
+        assert format_paragraph(text, Config(break_at_clauses=False)) == text
+
+    def test_case(self):
+        """Test that conjunctions match in any case unless asked otherwise."""
+        text = "Rain; And then sun."
+        assert format_paragraph(text, self.COMMAS) == "Rain;\nAnd then sun."
+        sensitive = Config(clause_break_punctuation=[','], conjunction_case_sensitive=True)
+        assert format_paragraph(text, sensitive) == text
+        assert format_paragraph("Rain; and then sun.", sensitive) == "Rain;\nand then sun."
+
+    def test_word_lists(self):
+        """Test the built-in languages and custom word lists."""
+        german = Config(conjunction_language='de', break_at_dashes=True)
+        assert german.conjunction_words[0] == 'und'
+        assert format_paragraph("Es regnet -- und wir bleiben.", german) == "Es regnet --\nund wir bleiben."
+        assert format_paragraph("It rains -- and we stay.", german) == "It rains -- and we stay."
+        custom = Config(conjunction_words=['then'], break_at_dashes=True)
+        assert format_paragraph("It rains -- then we stay.", custom) == "It rains --\nthen we stay."
+
+    def test_unknown_language(self):
+        """Test that a language without a built-in list is rejected."""
+        with pytest.raises(ValueError, match="xx"):
+            Config(conjunction_language='xx')
+        assert Config(conjunction_language='xx', conjunction_words=['and']).conjunction_words == ['and']
+
+    def test_not_inside_protected_spans(self):
+        """Test that a dash inside a code span doesn't break."""
+        text = "Run `a -- and b` now."
+        assert format_paragraph(text, self.DASHES) == text
+
+    def test_is_formatted(self):
+        """Test that a line may end at a dash only before a conjunction."""
+        assert is_formatted("It rained --\nand we stayed in.\n", self.DASHES)
+        assert not is_formatted("It rained --\nwe stayed in.\n", self.DASHES)
+        assert not is_formatted("It rained -- and we stayed in.\n", self.DASHES)
+        assert is_formatted("It rained -- all day.\n", self.DASHES)
+        assert is_formatted("It rained -- and we stayed in.\n")
+        assert not is_formatted("Rain; and sun.\n", self.COMMAS)
+
+
+class TestWrapping:
+    """Test cases for wrapping long clauses."""
+
+    WRAP = Config(wrap_long_lines=True)
+
+    LONG_CLAUSE = ("The goal is to quickly give the experienced programmer a tour of the "
+                   "language including all the odd and obscure bits so you aren't flummoxed "
+                   "when you see them in practice")
+
+    def test_break_lines_is_optimal(self):
+        """Test that the line breaking finds the minimum cost of an exhaustive search."""
+        rng = random.Random(5)
+        for _ in range(2000):
+            n = rng.randint(1, 30)
+            lengths = [rng.randint(1, 12) for _ in range(n)]
+            target = rng.randint(4, 40)
+            limit = target + rng.randint(0, 15)
+            penalties = [rng.choice([0, 0, 40, 10**6]) for _ in range(n)]
+            breaks = _break_lines(lengths, target, limit, penalties)
+            assert (_wrapping_cost(lengths, breaks, target, limit, penalties)
+                    == _best_wrapping_cost(lengths, target, limit, penalties))
+
+    def test_off_by_default(self):
+        """Test that long clauses stay on one line unless wrapping is on."""
+        assert format_paragraph(self.LONG_CLAUSE) == self.LONG_CLAUSE
+
+    def test_lines_within_limits(self):
+        """Test that wrapped lines fit the maximum length and keep every word."""
+        text = ' '.join([self.LONG_CLAUSE] * 5) + '.'
+        result = format_paragraph(text, self.WRAP)
+        lines = result.split('\n')
+        assert len(lines) > 5
+        assert all(len(line) <= 80 for line in lines)
+        assert ' '.join(lines) == text
+
+    def test_short_clauses_untouched(self):
+        """Test that clauses within the soft limit are not wrapped."""
+        text = "This is a test, and it should work."
+        assert format_paragraph(text, self.WRAP) == format_paragraph(text)
+
+    def test_prefers_conjunctions(self):
+        """Test that a break before a conjunction wins over a slightly better fit."""
+        config = Config(wrap_long_lines=True, soft_wrap_length=30, max_line_length=40)
+        text = "We read the files in a tree or in any directory"
+        assert format_paragraph(text, config) == "We read the files in a tree\nor in any directory"
+        no_conjunctions = Config(wrap_long_lines=True, soft_wrap_length=30,
+                                 max_line_length=40, break_at_conjunctions=False)
+        assert format_paragraph(text, no_conjunctions) == (
+            "We read the files in a tree or\nin any directory")
+
+    def test_overlong_word(self):
+        """Test that a word longer than the limit gets a line of its own."""
+        config = Config(wrap_long_lines=True, soft_wrap_length=10, max_line_length=15)
+        url = 'https://example.com/' + 'x' * 30
+        assert format_paragraph(f"see {url} for more", config) == f"see\n{url}\nfor more"
+
+    def test_first_line_stays_a_paragraph(self):
+        """Test that the first line isn't cut down to a block of its own."""
+        config = Config(wrap_long_lines=True, soft_wrap_length=10, max_line_length=15)
+        for text in ["<span> some words that go on for a while",
+                     "*** extraordinarily long words follow"]:
+            result = format_markdown(text + '\n', config)
+            assert [block.kind for block in scan_blocks(result.splitlines(True))] == [PARAGRAPH]
+            assert format_markdown(result, config) == result
+
+    def test_fixpoint(self):
+        """Test that wrapped output is recognized as formatted, and overlong lines aren't."""
+        formatter = Formatter(self.WRAP)
+        text = formatter.format_markdown(self.LONG_CLAUSE + '.\n')
+        assert formatter.is_formatted(text)
+        assert not formatter.is_formatted(self.LONG_CLAUSE + '.\n')
+        assert Formatter().is_formatted(self.LONG_CLAUSE + '.\n')
+
+
+class TestProtectedSpans:
+    """Test cases for punctuation inside code, links, HTML and math."""
+
+    @pytest.mark.parametrize("text, expected", [
+        ("Call `f(a, b). g()` first, then stop.", "Call `f(a, b). g()` first,\nthen stop."),
+        ("See [docs, part 2. here](http://x.y/a, b). Then go.",
+         "See [docs, part 2. here](http://x.y/a, b).\nThen go."),
+        ('Use <abbr title="e.g. this, that">abbr</abbr>, now.',
+         'Use <abbr title="e.g. this, that">abbr</abbr>,\nnow.'),
+        ("Visit <https://x.y/?a=1,2>. Next.", "Visit <https://x.y/?a=1,2>.\nNext."),
+        ("So $a, b. c$ holds, and $5, $6 too.", "So $a, b. c$ holds,\nand $5,\n$6 too."),
+    ])
+    def test_not_split(self, text, expected):
+        """Test that breaks inside protected spans are skipped and others kept."""
+        assert format_paragraph(text) == expected
+
+    def test_split_span_rejoined(self):
+        """Test that a paragraph with a line ending inside a link is reformatted."""
+        text = "See [docs,\npart two](u).\n"
+        assert not Formatter()._is_formatted(text.splitlines(keepends=True))
+        assert format_markdown(text) == "See [docs, part two](u).\n"
+        assert is_formatted("See [docs, part two](u).\n")
+
+    def test_wrap_keeps_spans(self):
+        """Test that wrapping doesn't split a link, even past the limit."""
+        config = Config(wrap_long_lines=True, soft_wrap_length=20, max_line_length=25)
+        text = "Read the [guide to every single option](http://x.y/guide) before you start"
+        result = format_paragraph(text, config)
+        assert "[guide to every single option](http://x.y/guide)" in result.split('\n')
+        assert format_paragraph(result.replace('\n', ' '), config) == result
+
+    def test_first_line_never_starts_a_block(self):
+        """Test that cutting the first line short can't turn it into a fence."""
+        text = "```$a, b `x` here\n"
+        assert format_markdown(text) == "```$a, b `x` here\n"
+        assert [block.kind for block in scan_blocks(format_markdown(text).splitlines(True))] == [PARAGRAPH]
+
+
+class TestFormatter:
+    """Test cases for reusable compiled formatters."""
+
+    def test_config_key_is_hashable(self):
+        """Test that equal configs have equal, hashable keys."""
+        a = Config(clause_break_punctuation=[','], unicode_replacements={'\u2192': '->'})
+        b = Config(clause_break_punctuation=[','], unicode_replacements={'\u2192': '->'})
+        assert hash(a.key()) == hash(b.key())
+        assert a.key() != Config().key()
+
+    def test_shared_between_equal_configs(self):
+        """Test that equal configs share one compiled formatter."""
+        assert get_formatter(Config()) is get_formatter(Config())
+        assert get_formatter(Config()) is not get_formatter(Config(break_at_clauses=False))
+
+    def test_methods_match_module_functions(self):
+        """Test that the module functions are thin wrappers."""
+        config = Config(clause_break_punctuation=[','])
+        formatter = Formatter(config)
+        text = "Commas, break; semicolons: don't break.\n\n# Head, er"
+        assert formatter.format_markdown(text) == format_markdown(text, config)
+        assert formatter.format_paragraph(text) == format_paragraph(text, config)
+
+    def test_config_changes_after_construction(self):
+        """Test that editing a config later doesn't affect built formatters."""
+        config = Config()
+        formatter = Formatter(config)
+        config.break_at_clauses = False
+        assert formatter.format_paragraph("One, two.") == "One,\ntwo."
+        assert format_paragraph("One, two.", config) == "One, two."
+
+    def test_empty_clause_punctuation(self):
+        """Test that an empty punctuation list disables clause breaks."""
+        config = Config(clause_break_punctuation=[])
+        assert format_paragraph("One, two. Three.", config) == "One, two.\nThree."
@@ -0,0 +1,162 @@
+"""Tests for formatting only the files git reports as changed."""
+
+import os
+import shutil
+import subprocess
+import pytest
+from md_semlinebreak.batch import filter_files
+from md_semlinebreak.cli import main
+from md_semlinebreak.git import GitError, changed_files
+from .conftest import FORMATTED, UNFORMATTED
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ['git', '-c', 'user.name=Test', '-c', 'user.email=test@example.com', *args],
+        cwd=repo, check=True, capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """A repository with a base commit on main and a feature branch checked out."""
+    _git(tmp_path, 'init', '-q', '-b', 'main')
+    for name in ['old.md', 'gone.md', 'docs/kept.md']:
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(UNFORMATTED, encoding='utf-8')
+    _git(tmp_path, 'add', '.')
+    _git(tmp_path, 'commit', '-q', '-m', 'base')
+    _git(tmp_path, 'checkout', '-q', '-b', 'feature')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+class TestChangedFiles:
+    """Test cases for listing changed files."""
+
+    def test_staged(self, repo):
+        """Test that only files in the index are listed."""
+        (repo / 'new.md').write_text(UNFORMATTED, encoding='utf-8')
+        (repo / 'old.md').write_text(UNFORMATTED * 2, encoding='utf-8')
+        _git(repo, 'add', 'new.md')
+        assert changed_files(staged=True) == ['new.md']
+
+    def test_since(self, repo):
+        """Test committed, uncommitted and untracked changes, without deletions."""
+        (repo / 'old.md').write_text(UNFORMATTED * 2, encoding='utf-8')
+        _git(repo, 'commit', '-q', '-am', 'change')
+        (repo / 'docs' / 'kept.md').write_text(UNFORMATTED * 2, encoding='utf-8')
+        (repo / 'untracked.md').write_text(UNFORMATTED, encoding='utf-8')
+        (repo / 'gone.md').unlink()
+        assert changed_files(since='main') == [
+            os.path.join('docs', 'kept.md'), 'old.md', 'untracked.md',
+        ]
+
+    def test_since_ignores_upstream_changes(self, repo):
+        """Test that commits made on REF after the branch point are left out."""
+        _git(repo, 'checkout', '-q', 'main')
+        (repo / 'old.md').write_text(UNFORMATTED * 2, encoding='utf-8')
+        _git(repo, 'commit', '-q', '-am', 'upstream')
+        _git(repo, 'checkout', '-q', 'feature')
+        assert changed_files(since='main') == []
+
+    def test_relative_to_cwd(self, repo):
+        """Test that paths are relative to the working directory."""
+        (repo / 'old.md').write_text(UNFORMATTED * 2, encoding='utf-8')
+        _git(repo, 'add', 'old.md')
+        assert changed_files(staged=True, cwd=str(repo / 'docs')) == [os.path.join('..', 'old.md')]
+
+    def test_bad_ref(self, repo):
+        """Test that an unknown ref raises GitError."""
+        with pytest.raises(GitError):
+            changed_files(since='no-such-branch')
+
+    def test_not_a_repository(self, tmp_path):
+        """Test that a directory outside any repository raises GitError."""
+        with pytest.raises(GitError):
+            changed_files(staged=True, cwd=str(tmp_path))
+
+
+class TestFilterFiles:
+    """Test cases for applying discovery rules to a list of files."""
+
+    PATHS = ['a.md', 'notes.txt', 'docs/b.md', 'node_modules/c.md', 'other/d.md']
+
+    def test_include_and_exclude(self):
+        """Test that only Markdown files outside excluded directories are kept."""
+        assert list(filter_files(self.PATHS)) == ['a.md', 'docs/b.md', 'other/d.md']
+
+    def test_roots(self, tmp_path, monkeypatch):
+        """Test that roots limit the files to those named or inside them."""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'docs').mkdir()
+        assert list(filter_files(self.PATHS, ['docs', 'notes.txt'])) == ['notes.txt', 'docs/b.md']
+
+    def test_exclude_below_root(self, tmp_path, monkeypatch):
+        """Test that exclude patterns match paths relative to the root."""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'docs').mkdir()
+        paths = ['docs/drafts/a.md', 'docs/b.md']
+        assert list(filter_files(paths, ['docs'], exclude=['drafts'])) == ['docs/b.md']
+
+
+class TestCLIGitModes:
+    """Test cases for --staged, --changed-since and --check."""
+
+    def test_staged_in_place(self, repo, capsys):
+        """Test that only staged Markdown files are formatted."""
+        (repo / 'new.md').write_text(UNFORMATTED, encoding='utf-8')
+        (repo / 'new.txt').write_text(UNFORMATTED, encoding='utf-8')
+        _git(repo, 'add', 'new.md', 'new.txt')
+        main(['--staged', '-i', '-j', '1'])
+        assert (repo / 'new.md').read_text(encoding='utf-8') == FORMATTED
+        assert (repo / 'new.txt').read_text(encoding='utf-8') == UNFORMATTED
+        assert (repo / 'old.md').read_text(encoding='utf-8') == UNFORMATTED
+        assert "1 file changed, 0 unchanged, 1 written." in capsys.readouterr().err
+
+    def test_changed_since_check(self, repo, capsys):
+        """Test that --check reports files without writing them."""
+        (repo / 'old.md').write_text(UNFORMATTED * 2, encoding='utf-8')
+        (repo / 'docs' / 'kept.md').write_text(FORMATTED, encoding='utf-8')
+        with pytest.raises(SystemExit) as excinfo:
+            main(['--changed-since', 'main', '--check', '-j', '2'])
+        assert excinfo.value.code == 1
+        err = capsys.readouterr().err
+        assert "Would reformat old.md" in err
+        assert "1 file would change, 1 unchanged." in err
+        assert (repo / 'old.md').read_text(encoding='utf-8') == UNFORMATTED * 2
+
+    def test_changed_since_limited_to_inputs(self, repo):
+        """Test that positional paths narrow the changed files."""
+        (repo / 'old.md').write_text(UNFORMATTED * 2, encoding='utf-8')
+        (repo / 'docs' / 'kept.md').write_text(UNFORMATTED * 2, encoding='utf-8')
+        main(['--changed-since', 'main', '-i', 'docs'])
+        assert (repo / 'old.md').read_text(encoding='utf-8') == UNFORMATTED * 2
+        assert (repo / 'docs' / 'kept.md').read_text(encoding='utf-8') == FORMATTED * 2
+
+    def test_check_clean(self, repo, capsys):
+        """Test that --check exits normally when nothing would change."""
+        main(['--staged', '--check'])
+        assert "0 files would change, 0 unchanged." in capsys.readouterr().err
+
+    def test_git_error(self, tmp_path, monkeypatch, capsys):
+        """Test that a git failure is reported with status 1."""
+        monkeypatch.chdir(tmp_path)
+        with pytest.raises(SystemExit) as excinfo:
+            main(['--staged', '-i'])
+        assert excinfo.value.code == 1
+        assert capsys.readouterr().err.startswith("Error: ")
+
+    @pytest.mark.parametrize("argv", [
+        ['--staged'],
+        ['--staged', '--changed-since', 'main', '-i'],
+        ['--check', '-i', 'old.md'],
+        ['--check', 'old.md', '-o', 'out.md'],
+    ])
+    def test_invalid_combinations(self, repo, argv):
+        """Test that conflicting options are rejected."""
+        with pytest.raises(SystemExit) as excinfo:
+            main(argv)
+        assert excinfo.value.code == 2
@@ -0,0 +1,210 @@
+"""Tests for incremental formatting of edited line ranges."""
+
+import io
+import random
+import pytest
+from md_semlinebreak.blocks import FENCED_CODE, PARAGRAPH, scan_blocks
+from md_semlinebreak.config import Config
+from md_semlinebreak.formatter import format_markdown, get_formatter
+from md_semlinebreak.incremental import (
+    BlockIndex, LineChange, Position, TextEdit, format_ranges, index_blocks,
+)
+
+DOCUMENT = (
+    "---\n"
+    "title: x\n"
+    "---\n"
+    "\n"
+    "One, two.\n"
+    "\n"
+    "- item, one\n"
+    "  more\n"
+    "\n"
+    "Unformatted, here. Stays.\n"
+    "\n"
+    "```\n"
+    "code, here.\n"
+    "```\n"
+    "\n"
+    "Last, para.\n"
+)
+
+# Lines that open, close and continue every kind of block
+LINES = [
+    'Some text, here. Two.\n', 'more words\n', '\n', '\n', '```\n', '~~~\n', '    code\n',
+    '- item\n', '  nested\n', '1. one\n', '# Head\n', '---\n', '===\n', '> quote\n',
+    '<div>\n', '<!--\n', '-->\n', '| a | b |\n', '|---|---|\n', '   ```\n', '...\n', 'x\n',
+]
+
+
+def lines_of(text):
+    """Split text after each newline, as the formatter does."""
+    return list(io.StringIO(text))
+
+
+def apply_edits(lines, edits):
+    """Apply text edits to lines and return the new lines."""
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    text = ''.join(lines)
+    out = []
+    pos = 0
+    for edit in edits:
+        out.append(text[pos:offsets[edit.start.line] + edit.start.character])
+        out.append(edit.new_text)
+        pos = offsets[edit.end.line] + edit.end.character
+    out.append(text[pos:])
+    return lines_of(''.join(out))
+
+
+def random_edit(rng, lines):
+    """Replace up to three lines of lines with up to three random ones."""
+    start = rng.randint(0, len(lines))
+    end = rng.randint(start, min(len(lines), start + 3))
+    new = [rng.choice(LINES) for _ in range(rng.randint(0, 3))]
+    return lines[:start] + new + lines[end:], LineChange(start, end, len(new))
+
+
+class TestBlockIndex:
+    """Test cases for indexing blocks and keeping the index up to date."""
+
+    def test_blocks_match_scan(self):
+        """Test that an index yields the blocks a full scan finds."""
+        lines = lines_of(DOCUMENT)
+        index = index_blocks(lines)
+        assert list(index.blocks(lines)) == list(scan_blocks(lines))
+        assert len(index) == len(list(scan_blocks(lines)))
+        assert index.line_count == len(lines)
+
+    def test_restart_points(self):
+        """Test that restarts are only marked where no block or list is open.
+
+        A paragraph is still open on the blank line ending it, and a list
+        on every line after it, as a later indented line would continue it.
+        """
+        lines = lines_of("A\n\n```\nx\n```\n\n- a\n\n  b\n\nC\n")
+        restarts = [start for _, start, restart in index_blocks(lines) if restart]
+        assert restarts == [0, 2, 5, 6]
+
+    def test_random_updates(self):
+        """Test that updates match a fresh index, edit after edit."""
+        rng = random.Random(0)
+        for _ in range(300):
+            lines = [rng.choice(LINES) for _ in range(rng.randint(0, 30))]
+            index = index_blocks(lines)
+            for _ in range(5):
+                lines, change = random_edit(rng, lines)
+                index.update(lines, [change])
+                assert index == index_blocks(lines)
+
+    def test_several_changes(self):
+        """Test an update with several changes at once, in old line numbers."""
+        old = lines_of(DOCUMENT)
+        new = old[:4] + ["```\n"] + old[4:9] + old[10:12] + ["x\n", "y\n"] + old[12:]
+        index = index_blocks(old)
+        index.update(new, [LineChange(4, 4, 1), LineChange(9, 10, 0), LineChange(12, 12, 2)])
+        assert index == index_blocks(new)
+
+    def test_fence_opened(self):
+        """Test that a fence opened by an edit turns what follows into code."""
+        old = lines_of("A.\n\nB.\n\nC.\n")
+        new = ["```\n"] + old
+        index = index_blocks(old)
+        index.update(new, [LineChange(0, 0, 1)])
+        assert [kind for kind, _, _ in index] == [FENCED_CODE]
+        index.update(old, [LineChange(0, 1, 0)])
+        assert index == index_blocks(old)
+
+    def test_front_matter(self):
+        """Test that front matter is only recognized on the first line."""
+        old = lines_of("Text.\n---\nx: 1\n---\n")
+        index = index_blocks(old)
+        index.update(old[1:], [LineChange(0, 1, 0)])
+        assert index == index_blocks(old[1:])
+        index.update(old, [LineChange(0, 0, 1)])
+        assert index == index_blocks(old)
+
+    @pytest.mark.parametrize("changes, count", [
+        ([LineChange(2, 1, 0)], 3),
+        ([LineChange(0, 5, 0)], 0),
+        ([LineChange(0, 1, -1)], 3),
+        ([LineChange(2, 3, 1), LineChange(1, 2, 1)], 4),
+        ([LineChange(0, 1, 2)], 4),
+    ])
+    def test_bad_changes(self, changes, count):
+        """Test that changes that don't fit the documents are rejected."""
+        index = index_blocks(['a\n'] * 4)
+        with pytest.raises(ValueError):
+            index.update(['a\n'] * count, changes)
+        assert index == index_blocks(['a\n'] * 4)
+
+
+class TestFormatRanges:
+    """Test cases for reformatting the paragraphs edits touch."""
+
+    def test_only_touched_paragraphs(self):
+        """Test that paragraphs away from the edit are left unformatted."""
+        old = lines_of(DOCUMENT)
+        index = index_blocks(old)
+        new = list(old)
+        new[4] = "One, two. Three.\n"
+        edits = format_ranges(new, index, [LineChange(4, 5, 1)])
+        assert edits == [TextEdit(Position(4, 0), Position(5, 0), "One,\ntwo.\nThree.\n")]
+        result = apply_edits(new, edits)
+        assert "Unformatted, here. Stays.\n" in result
+        assert index == index_blocks(result)
+
+    def test_deletion_touches_both_sides(self):
+        """Test that removing lines touches the lines on either side."""
+        lines = lines_of("A, b.\n\nC, d.\n")
+        index = index_blocks(lines)
+        new = lines[:1] + lines[2:]
+        edits = format_ranges(new, index, [LineChange(1, 2, 0)])
+        assert apply_edits(new, edits) == lines_of("A,\nb.\nC,\nd.\n")
+
+    def test_code_not_formatted(self):
+        """Test that an edit inside a fenced block produces no edits."""
+        lines = lines_of("```\na, b. c\n```\n")
+        index = index_blocks(lines)
+        new = ["```\n", "a, b. c, d\n", "```\n"]
+        assert format_ranges(new, index, [LineChange(1, 2, 1)]) == []
+
+    def test_matches_full_format_of_touched(self):
+        """Test edits against formatting the touched paragraphs of a full scan."""
+        rng = random.Random(1)
+        formatter = get_formatter()
+        for _ in range(300):
+            old = [rng.choice(LINES) for _ in range(rng.randint(0, 20))]
+            index = index_blocks(old)
+            new, change = random_edit(rng, old)
+            first = change.start
+            last = first + change.count if change.count else min(first + 1, len(new))
+            first = first if change.count else max(first - 1, 0)
+            expected = ''.join(
+                formatter.format_block(block)
+                if block.kind == PARAGRAPH and block.start < last and first < block.end
+                else ''.join(block.lines)
+                for block in scan_blocks(new)
+            )
+            result = apply_edits(new, format_ranges(new, index, [change]))
+            assert ''.join(result) == expected
+            assert index == index_blocks(result)
+
+    def test_last_line_without_newline(self):
+        """Test that an edit ending the document ends inside its last line, in UTF-16."""
+        lines = ["Emoji \U0001F600, here. Two"]
+        edits = format_ranges(lines, BlockIndex(), [LineChange(0, 0, 1)])
+        assert edits[0].end == Position(0, len(lines[0]) + 1)
+        assert edits[0].to_lsp() == {
+            'range': {'start': {'line': 0, 'character': 0},
+                      'end': {'line': 0, 'character': len(lines[0]) + 1}},
+            'newText': format_markdown(lines[0]),
+        }
+
+    def test_normalize(self):
+        """Test that only the reformatted paragraphs are normalized."""
+        lines = lines_of("“A”, b.\n\n“C”\n")
+        index = index_blocks(lines)
+        edits = format_ranges(lines, index, [LineChange(0, 1, 1)], Config(normalize_unicode=True))
+        assert ''.join(apply_edits(lines, edits)) == '"A",\nb.\n\n“C”\n'
@@ -0,0 +1,108 @@
+"""Tests for the protected inline span index."""
+
+import time
+import pytest
+from md_semlinebreak.inline import SpanCursor, protected_spans
+
+
+def texts(text):
+    """Return the protected substrings of text."""
+    return [text[start:end] for start, end in protected_spans(text)]
+
+
+class TestProtectedSpans:
+    """Test cases for finding protected spans."""
+
+    @pytest.mark.parametrize("text, expected", [
+        ("Use `a, b` now", ["`a, b`"]),
+        ("Use ``a ` b`` now", ["``a ` b``"]),
+        ("Mismatched `` runs ` stay text", []),
+        ("Escaped \\`a, b` then `c`", ["` then `"]),
+        ("A backslash `a\\` ends code", ["`a\\`"]),
+        ("Unclosed `code, here", []),
+    ])
+    def test_code_spans(self, text, expected):
+        """Test code spans, which only close on a run of the same length."""
+        assert texts(text) == expected
+
+    @pytest.mark.parametrize("text, expected", [
+        ("See [the docs, here](http://x.y/a?b=1, 2). Next", ["[the docs, here](http://x.y/a?b=1, 2)"]),
+        ("An ![image, alt](a (b) c.png) here", ["[image, alt](a (b) c.png)"]),
+        ("A [ref, link][label] and [1, 2]", ["[ref, link][label]", "[1, 2]"]),
+        ("Nested [a [b, c] d](u) link", ["[a [b, c] d](u)"]),
+        ("Escaped \\[a, b\\] text", []),
+        ("Unclosed [bracket, here", []),
+        ("Code inside [a `]` b](u)", ["[a `]` b](u)"]),
+    ])
+    def test_links(self, text, expected):
+        """Test link text with its destination or label, and bare brackets."""
+        assert texts(text) == expected
+
+    @pytest.mark.parametrize("text, expected", [
+        ('A <a title="x, y. z">tag</a>, then', ['<a title="x, y. z">', '</a>']),
+        ("A <br/> and <img src='a, b'>", ["<br/>", "<img src='a, b'>"]),
+        ("An <!-- aside, here. --> comment", ["<!-- aside, here. -->"]),
+        ("Go to <https://x.y/a,b>. Or <me@x.y>", ["<https://x.y/a,b>", "<me@x.y>"]),
+        ("Less < more, and a <b ok", []),
+        ("Unclosed <!-- comment, here", []),
+    ])
+    def test_html_and_autolinks(self, text, expected):
+        """Test inline HTML, comments and autolinks."""
+        assert texts(text) == expected
+
+    @pytest.mark.parametrize("text, expected", [
+        ("So $a, b$ holds", ["$a, b$"]),
+        ("And $$x, y. z$$ too", ["$$x, y. z$$"]),
+        ("Costs $5, or $10, each", []),
+        ("Not $ a, b $ math", []),
+        ("Ends $ . then $x$", ["$x$"]),
+    ])
+    def test_math(self, text, expected):
+        """Test inline and display math, and dollar amounts left alone."""
+        assert texts(text) == expected
+
+    def test_nested_spans_merge(self):
+        """Test that spans inside others are merged into the outer one."""
+        assert texts("A [`code, x` and <b>, y](u) z") == ["[`code, x` and <b>, y](u)"]
+
+    @pytest.mark.parametrize("make", [
+        lambda n: '[a, b](http://x.y/c) ' * (n // 21),
+        lambda n: '[' * n,
+        lambda n: '(' * (n // 2) + '](' * (n // 4),
+        lambda n: ''.join('`' * (k % 50 + 1) + ' ' for k in range(n // 27)),
+        lambda n: '<!--' * (n // 4),
+        lambda n: '<a x="' * (n // 6),
+        lambda n: '$ ' * (n // 2),
+        lambda n: '\\' * n + '`',
+    ])
+    def test_linear_time(self, make):
+        """Test that eight times the input takes nowhere near 64 times as long."""
+        def best_time(text):
+            best = float('inf')
+            for _ in range(3):
+                start = time.perf_counter()
+                protected_spans(text)
+                best = min(best, time.perf_counter() - start)
+            return best
+
+        small = best_time(make(50_000))
+        large = best_time(make(400_000))
+        assert large < 24 * max(small, 1e-3)
+
+
+class TestSpanCursor:
+    """Test cases for asking about offsets in order."""
+
+    def test_offsets_in_order(self):
+        """Test offsets before, inside, at the end of and between spans."""
+        inside = SpanCursor([(2, 4), (6, 9)])
+        assert [inside(pos) for pos in range(11)] == [
+            False, False, True, True, False, False, True, True, True, False, False,
+        ]
+
+    def test_repeated_offsets(self):
+        """Test that the same offset can be asked about again."""
+        inside = SpanCursor([(2, 4)])
+        assert inside(3) and inside(3)
+        assert not inside(4)
+        assert not SpanCursor([])(0)
@@ -0,0 +1,253 @@
+"""Tests for the JSON-RPC daemon and its client."""
+
+import json
+import sys
+import threading
+import time
+from io import StringIO
+from unittest.mock import patch
+import pytest
+from md_semlinebreak import __version__, cli
+from md_semlinebreak.cli import main
+from md_semlinebreak.client import (
+    ServerError, default_socket_path, format_with_server, request
+)
+from md_semlinebreak.config import Config
+from md_semlinebreak.formatter import format_markdown
+import md_semlinebreak.server as server_module
+from md_semlinebreak.server import (
+    INVALID_PARAMS, METHOD_NOT_FOUND, PARSE_ERROR, handle_message, serve_socket,
+    serve_stream
+)
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason="needs Unix sockets")
+
+
+def _call(method, params=None, request_id=1):
+    line = json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': method,
+                       'params': params or {}})
+    response, _ = handle_message(line)
+    return response
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Run a socket server on a thread, shutting it down afterwards."""
+    path = tmp_path / 's.sock'
+    thread = threading.Thread(target=serve_socket, args=(path,), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not path.exists():
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.01)
+    yield path
+    if path.exists():
+        request('shutdown', socket_path=path)
+    thread.join(5)
+
+
+class TestHandleMessage:
+    """Test cases for request dispatch."""
+
+    def test_format(self):
+        """Test that format returns the same text as format_markdown."""
+        text = "One, two. Three; four."
+        assert _call('format', {'text': text})['result'] == format_markdown(text)
+
+    def test_format_with_config(self):
+        """Test that the config object is applied."""
+        params = {'text': "One, two.", 'config': {'break_at_clauses': False}}
+        assert _call('format', params)['result'] == "One, two."
+
+    def test_format_normalizes_when_configured(self):
+        """Test that format normalizes Unicode when the config asks for it."""
+        params = {'text': "“Hi”", 'config': {'normalize_unicode': True}}
+        assert _call('format', params)['result'] == '"Hi"'
+
+    def test_normalize(self):
+        """Test the normalize method."""
+        assert _call('normalize', {'text': "a—b"})['result'] == "a--b"
+
+    def test_version(self):
+        """Test the version method."""
+        assert _call('version')['result'] == __version__
+
+    @pytest.mark.parametrize("params", [
+        {'text': 1},
+        {'text': "x", 'config': {'no_such_option': 1}},
+        {'text': "x", 'config': []},
+        {'text': "x", 'config': {'conjunction_language': 'xx'}},
+    ])
+    def test_invalid_params(self, params):
+        """Test that bad params get an invalid-params error."""
+        assert _call('format', params)['error']['code'] == INVALID_PARAMS
+
+    def test_unknown_method(self):
+        """Test that an unknown method gets a method-not-found error."""
+        assert _call('reformat')['error']['code'] == METHOD_NOT_FOUND
+
+    def test_parse_error(self):
+        """Test that malformed JSON gets a parse error."""
+        response, stop = handle_message('{not json')
+        assert response['error']['code'] == PARSE_ERROR
+        assert not stop
+
+    def test_notification_has_no_response(self):
+        """Test that a request without an id is not answered."""
+        line = json.dumps({'jsonrpc': '2.0', 'method': 'version'})
+        assert handle_message(line) == (None, False)
+
+
+class TestServeStream:
+    """Test cases for serving over stdio."""
+
+    def test_answers_each_line_until_shutdown(self):
+        """Test that requests are answered in order and shutdown stops the loop."""
+        lines = [
+            json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': 'format',
+                        'params': {'text': "A, b."}}),
+            '',
+            json.dumps({'jsonrpc': '2.0', 'id': 2, 'method': 'shutdown'}),
+            json.dumps({'jsonrpc': '2.0', 'id': 3, 'method': 'version'}),
+        ]
+        output = StringIO()
+        assert serve_stream(StringIO('\n'.join(lines) + '\n'), output)
+        responses = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [r['id'] for r in responses] == [1, 2]
+        assert responses[0]['result'] == "A,\nb."
+
+
+class TestSocketServer:
+    """Test cases for the Unix socket daemon and client."""
+
+    def test_round_trip(self, server):
+        """Test formatting through the daemon."""
+        text = "One, two. Three; four.\n\n```\na, b\n```\n"
+        assert format_with_server(text, Config(), server) == format_markdown(text)
+
+    def test_concurrent_clients(self, server):
+        """Test that several clients are served at the same time."""
+        texts = [f"Client {i}, paragraph {i}. Done." for i in range(16)]
+        results = [None] * len(texts)
+
+        def work(i):
+            results[i] = format_with_server(texts[i], Config(), server)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(len(texts))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        assert results == [format_markdown(text) for text in texts]
+
+    def test_error_response(self, server):
+        """Test that error responses raise ServerError."""
+        with pytest.raises(ServerError) as excinfo:
+            request('format', {'text': None}, socket_path=server)
+        assert excinfo.value.code == INVALID_PARAMS
+
+    def test_second_server_refused(self, server):
+        """Test that a live daemon's socket is not taken over."""
+        with pytest.raises(OSError):
+            serve_socket(server)
+
+    def test_stale_socket_replaced(self, tmp_path):
+        """Test that a socket file left by a dead server is reused."""
+        path = tmp_path / 's.sock'
+        path.touch()
+        thread = threading.Thread(target=serve_socket, args=(path,), daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                assert request('version', socket_path=path) == __version__
+                break
+            except OSError:
+                assert time.monotonic() < deadline, "server did not start"
+                time.sleep(0.01)
+        request('shutdown', socket_path=path)
+        thread.join(5)
+        assert not path.exists()
+
+    def test_no_server(self, tmp_path):
+        """Test that the client reports no daemon rather than failing."""
+        assert format_with_server("A, b.", Config(), tmp_path / 'missing.sock') is None
+        (tmp_path / 'dead.sock').touch()
+        assert format_with_server("A, b.", Config(), tmp_path / 'dead.sock') is None
+
+    def test_default_socket_path(self, monkeypatch, tmp_path):
+        """Test that MDFIX_SOCKET overrides the default socket path."""
+        assert __version__ in default_socket_path().name
+        monkeypatch.setenv('MDFIX_SOCKET', str(tmp_path / 'x.sock'))
+        assert default_socket_path() == tmp_path / 'x.sock'
+
+
+class TestCLIDaemon:
+    """Test cases for the CLI using a running daemon."""
+
+    def test_cli_uses_daemon(self, server, monkeypatch, tmp_path):
+        """Test that the CLI sends a small file to a running daemon."""
+        calls = []
+        original = server_module.METHODS['format']
+        monkeypatch.setitem(server_module.METHODS, 'format',
+                            lambda params: calls.append(params) or original(params))
+        path = tmp_path / 'a.md'
+        path.write_text('This is a test, and it should work.', encoding='utf-8')
+        with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            main(['--socket', str(server), str(path)])
+        assert mock_stdout.getvalue() == "This is a test,\nand it should work."
+        assert len(calls) == 1
+
+    def test_cli_stdin_uses_daemon(self, server, monkeypatch):
+        """Test that the CLI sends stdin ending within the threshold to a running daemon."""
+        calls = []
+        original = server_module.METHODS['format']
+        monkeypatch.setitem(server_module.METHODS, 'format',
+                            lambda params: calls.append(params) or original(params))
+        with patch('sys.stdin', StringIO('One, two.')), \
+             patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            main(['--socket', str(server)])
+        assert mock_stdout.getvalue() == "One,\ntwo."
+        assert [params['text'] for params in calls] == ['One, two.']
+
+    def test_large_inputs_stream(self, server, monkeypatch, tmp_path):
+        """Test that stdin and files past the threshold are formatted here, not read whole."""
+        calls = []
+        monkeypatch.setitem(server_module.METHODS, 'format', calls.append)
+        monkeypatch.setattr(cli, 'DAEMON_THRESHOLD', 5)
+        # The threshold falls inside the first line
+        text = 'One, two.\n\nThree, four. Five.\n'
+        with patch('sys.stdin', StringIO(text)), \
+             patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            main(['--socket', str(server)])
+        assert mock_stdout.getvalue() == format_markdown(text)
+
+        path = tmp_path / 'a.md'
+        path.write_text('Three, four.', encoding='utf-8')
+        with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            main(['--socket', str(server), str(path)])
+        assert mock_stdout.getvalue() == "Three,\nfour."
+        assert calls == []
+
+    def test_no_daemon_option(self, server, monkeypatch):
+        """Test that --no-daemon formats in process."""
+        calls = []
+        monkeypatch.setitem(server_module.METHODS, 'format', calls.append)
+        with patch('sys.stdin', StringIO('One, two.')), \
+             patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            main(['--socket', str(server), '--no-daemon'])
+        assert mock_stdout.getvalue() == "One,\ntwo."
+        assert calls == []
+
+    def test_serve_stdio(self):
+        """Test --serve --stdio."""
+        line = json.dumps({'jsonrpc': '2.0', 'id': 7, 'method': 'version'})
+        with patch('sys.stdin', StringIO(line + '\n')), \
+             patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            main(['--serve', '--stdio'])
+        assert json.loads(mock_stdout.getvalue())['result'] == __version__
+
+    def test_stdio_requires_serve(self):
+        """Test that --stdio alone is rejected."""
+        with pytest.raises(SystemExit):
+            main(['--stdio'])
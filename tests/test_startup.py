@@ -0,0 +1,100 @@
+"""Import-time regression tests for the CLI entry point."""
+
+import os
+import subprocess
+import sys
+import pytest
+
+# Import time of formatting one file from the command line, in
+# milliseconds: every package module the run imports, with what each
+# pulls in. Generous enough for slow CI machines; importing the batch
+# machinery eagerly again blows through it.
+IMPORT_BUDGET_MS = float(os.environ.get('MDFIX_IMPORT_BUDGET_MS', 100))
+
+# Formats the files named on the command line, as the mdfix script does
+RUN_CLI = "import sys; from md_semlinebreak.cli import main; main(sys.argv[1:])"
+
+# Modules only some runs need, which must not be imported up front
+DEFERRED_MODULES = [
+    'argparse',
+    'concurrent.futures',
+    'hashlib',
+    'multiprocessing',
+    'socket',
+    'tempfile',
+    'tomllib',
+    'md_semlinebreak.batch',
+    'md_semlinebreak.blocks',
+    'md_semlinebreak.cache',
+    'md_semlinebreak.client',
+    'md_semlinebreak.fileio',
+    'md_semlinebreak.diff',
+    'md_semlinebreak.formatter',
+    'md_semlinebreak.git',
+    'md_semlinebreak.incremental',
+    'md_semlinebreak.inline',
+    'md_semlinebreak.server',
+    'md_semlinebreak.stats',
+    'md_semlinebreak.watch',
+]
+
+
+def _import_times(code: str, *args: str, top_level: bool = False) -> dict:
+    """Run code under -X importtime and return cumulative microseconds per module.
+
+    With ``top_level``, only modules imported by the code itself count,
+    not those imported while importing another module.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code, *args],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented past the one space after the bar
+        if not (top_level and name[1:2] == ' '):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup:
+    """Test cases for CLI startup cost."""
+
+    def test_cli_run_import_budget(self, tmp_path):
+        """Test that formatting one file from the CLI imports within the time budget.
+
+        The imports main() defers until a run needs them count as well as
+        the CLI module itself.
+        """
+        path = tmp_path / 'a.md'
+        path.write_text("One, two. Three.\n", encoding='utf-8')
+        # Best of a few runs, so one slow run on a busy machine doesn't fail
+        best = min(sum(time for name, time in _import_times(RUN_CLI, str(path), top_level=True).items()
+                       if name.split('.')[0] == 'md_semlinebreak')
+                   for _ in range(3))
+        assert best / 1000 < IMPORT_BUDGET_MS
+
+    @pytest.mark.parametrize("module", DEFERRED_MODULES)
+    def test_cli_import_defers(self, module):
+        """Test that importing the CLI leaves optional modules unloaded."""
+        assert module not in _import_times('import md_semlinebreak.cli')
+
+    def test_package_exports_are_lazy(self):
+        """Test that public names load their module on first access."""
+        code = (
+            "import sys, md_semlinebreak\n"
+            "assert 'md_semlinebreak.formatter' not in sys.modules\n"
+            "assert md_semlinebreak.format_markdown('A, b.') == 'A,\\nb.'\n"
+            "assert 'md_semlinebreak.formatter' in sys.modules\n"
+        )
+        subprocess.run([sys.executable, '-c', code], check=True)
+
+    def test_unknown_attribute(self):
+        """Test that a missing package attribute still raises AttributeError."""
+        import md_semlinebreak
+        with pytest.raises(AttributeError):
+            md_semlinebreak.no_such_name
+        assert 'format_markdown' in dir(md_semlinebreak)
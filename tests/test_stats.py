@@ -0,0 +1,196 @@
+"""Tests for formatting instrumentation."""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from md_semlinebreak import stats
+from md_semlinebreak.batch import run_batch
+from md_semlinebreak.cache import Cache
+from md_semlinebreak.cli import main
+from md_semlinebreak.config import Config
+from md_semlinebreak.formatter import Formatter, format_markdown, get_formatter
+
+DOCUMENT = (
+    "One, two. Three; four.\n"
+    "\n"
+    "```\n"
+    "code, here.\n"
+    "```\n"
+    "\n"
+    "Already,\n"
+    "formatted.\n"
+)
+
+
+@pytest.fixture
+def recorded():
+    documents = []
+
+    def hook(path, doc):
+        documents.append((path, doc))
+
+    stats.add_hook(hook)
+    yield documents
+    stats.remove_hook(hook)
+
+
+@pytest.fixture
+def docs(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"doc{i}.md"
+        path.write_text(DOCUMENT, encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+
+class TestInstrumentation:
+    """Test cases for stats collected while formatting."""
+
+    def test_disabled_by_default(self):
+        """Test that formatters are plain when nothing is listening."""
+        assert not stats.enabled
+        assert type(get_formatter()) is Formatter
+        assert stats.current() is None
+
+    def test_counters(self):
+        """Test the counters for one document."""
+        with stats.collect() as totals:
+            output = format_markdown(DOCUMENT)
+        assert output == format_markdown(DOCUMENT)
+        assert totals.documents == 1
+        assert totals.blocks == 5
+        assert totals.paragraphs == 2
+        assert totals.paragraphs_unchanged == 1
+        assert totals.sentences == 2
+        assert totals.clause_breaks == 2
+        assert totals.bytes_in == len(DOCUMENT)
+        assert totals.bytes_out == len(output)
+        assert totals.total_time > 0
+        assert not stats.enabled
+
+    def test_output_unchanged(self):
+        """Test that instrumented formatting gives the same output."""
+        text = "Café, crème. “Quoted”; yes.\n\n- item, one\n"
+        config = Config(normalize_unicode=True)
+        formatter = get_formatter(config)
+        with stats.collect():
+            instrumented = get_formatter(config)
+            assert instrumented is not formatter
+            with stats.document():
+                result = instrumented.format_markdown(instrumented.normalize_unicode(text))
+        assert result == formatter.format_markdown(formatter.normalize_unicode(text))
+
+    def test_wrapping(self):
+        """Test that wrapped lines are counted and timed apart from sentences."""
+        config = Config(wrap_long_lines=True, soft_wrap_length=10, max_line_length=15)
+        text = "One two three four five six seven, eight.\n"
+        with stats.collect() as totals:
+            output = format_markdown(text, config)
+        assert output == get_formatter(config).format_markdown(text)
+        assert totals.clause_breaks == 1
+        assert totals.wrapped_lines == output.count('\n') - 2
+        assert totals.wrapped_lines > 0
+        assert totals.wrap_time > 0
+
+    def test_hooks(self, recorded):
+        """Test that hooks get each document with its path."""
+        format_markdown(DOCUMENT)
+        format_markdown("A, b.")
+        assert [path for path, _ in recorded] == [None, None]
+        assert recorded[1][1].clause_breaks == 1
+
+    def test_nested_documents(self, recorded):
+        """Test that formatting inside an open document joins it."""
+        with stats.document('book.md') as doc:
+            format_markdown(DOCUMENT)
+            format_markdown(DOCUMENT)
+        assert recorded == [('book.md', doc)]
+        assert doc.documents == 1
+        assert doc.paragraphs == 4
+
+    def test_threads(self, recorded):
+        """Test that documents open at once on different threads are measured apart."""
+        barrier = threading.Barrier(2)
+
+        def format_one(path):
+            with stats.document(path) as doc:
+                barrier.wait()
+                format_markdown(DOCUMENT)
+                barrier.wait()
+            return doc
+
+        with ThreadPoolExecutor(2) as executor:
+            docs = list(executor.map(format_one, ['a.md', 'b.md']))
+        assert docs[0] is not docs[1]
+        assert sorted(path for path, _ in recorded) == ['a.md', 'b.md']
+        assert [doc.paragraphs for doc in docs] == [2, 2]
+        assert stats.current() is None
+
+    def test_stats_add(self):
+        """Test that totals add up field by field."""
+        totals = stats.Stats(documents=1, sentences=2, scan_time=0.5)
+        totals.add(stats.Stats(documents=1, sentences=3, scan_time=0.25))
+        assert (totals.documents, totals.sentences, totals.scan_time) == (2, 5, 0.75)
+        assert "2 documents" in totals.report()
+
+
+class TestBatchStats:
+    """Test cases for stats from batch runs."""
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_files_reported(self, docs, recorded, jobs):
+        """Test that every file is reported with its sizes, whichever process formatted it."""
+        run_batch(docs, Config(), jobs=jobs)
+        assert sorted(path for path, _ in recorded) == docs
+        for path, doc in recorded:
+            with open(path, 'rb') as f:
+                assert doc.bytes_out == len(f.read())
+            assert doc.bytes_in == len(DOCUMENT)
+            assert doc.paragraphs == 2
+
+    def test_cache_hits(self, docs, recorded, tmp_path):
+        """Test that files skipped through the cache count as hits."""
+        cache = Cache(str(tmp_path / 'cache'), Config())
+        run_batch(docs, Config(), cache=cache)
+        recorded.clear()
+        run_batch(docs, Config(), cache=Cache(str(tmp_path / 'cache'), Config()))
+        assert sum(doc.cache_hits for _, doc in recorded) == len(docs)
+
+    def test_not_collected_when_disabled(self, docs):
+        """Test that results carry no stats when nothing is listening."""
+        from md_semlinebreak.batch import format_file
+        assert format_file(docs[0], Config()).stats is None
+
+
+class TestCLIStats:
+    """Test cases for --stats and --profile."""
+
+    def test_text_report(self, docs, capsys):
+        """Test the human-readable report."""
+        main(['-i', '--no-cache', '--stats', '-j', '1'] + docs)
+        err = capsys.readouterr().err
+        assert "3 documents" in err
+        assert "6 paragraphs (3 already formatted)" in err
+        assert "slowest:" in err
+        assert not stats.enabled
+
+    def test_json_report(self, docs, capsys):
+        """Test the JSON report for a single file."""
+        main([docs[0], '--stats-format', 'json'])
+        captured = capsys.readouterr()
+        assert captured.out == format_markdown(DOCUMENT)
+        report = json.loads(captured.err)
+        assert report['total']['sentences'] == 2
+        assert report['documents'][0]['path'] == docs[0]
+
+    def test_profile(self, docs, capsys):
+        """Test that --profile prints profiler output."""
+        main([docs[0], '--profile'])
+        assert "cumulative" in capsys.readouterr().err
+
+    def test_serve_rejected(self):
+        """Test that --stats can't be combined with --serve."""
+        with pytest.raises(SystemExit):
+            main(['--serve', '--stats'])
@@ -0,0 +1,154 @@
+"""Tests for watch mode."""
+
+import sys
+import threading
+import time
+import pytest
+from md_semlinebreak import watch
+from md_semlinebreak.cli import main
+from md_semlinebreak.config import Config
+from md_semlinebreak.watch import Watcher
+from .conftest import FORMATTED, UNFORMATTED
+
+BACKENDS = [
+    pytest.param('inotify', marks=pytest.mark.skipif(
+        not sys.platform.startswith('linux'), reason="inotify is Linux only")),
+    'poll',
+]
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(watch, 'POLL_INTERVAL', 0.05)
+
+
+class _Running:
+    """Runs a Watcher on a thread, collecting its results."""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+        self.results = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=watcher.run, kwargs={'on_result': self.results.append, 'stop': self._stop})
+
+    def __enter__(self):
+        self._thread.start()
+        # Let the first scan or select start before anything changes
+        time.sleep(0.1)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.watcher.close()
+
+    def wait_for(self, count, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while len(self.results) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.results
+
+
+@pytest.fixture
+def docs(tmp_path):
+    (tmp_path / 'docs').mkdir()
+    (tmp_path / 'docs' / 'node_modules').mkdir()
+    return tmp_path / 'docs'
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+class TestWatcher:
+    """Test cases for the Watcher with each change detection backend."""
+
+    def test_reformats_changed_file(self, docs, backend):
+        """Test that a written file is reformatted in place."""
+        with _Running(Watcher([str(docs)], debounce=0.05, backend=backend)) as running:
+            (docs / 'a.md').write_text(UNFORMATTED, encoding='utf-8')
+            results = running.wait_for(1)
+        assert results[0].path == str(docs / 'a.md')
+        assert results[0].changed
+        assert (docs / 'a.md').read_text(encoding='utf-8') == FORMATTED
+
+    def test_burst_is_debounced(self, docs, backend):
+        """Test that a burst of writes is formatted once, and the watcher's own write is skipped."""
+        with _Running(Watcher([str(docs)], debounce=0.2, backend=backend)) as running:
+            for i in range(5):
+                (docs / 'a.md').write_text(UNFORMATTED * (i + 1), encoding='utf-8')
+                time.sleep(0.01)
+            running.wait_for(1)
+            time.sleep(0.5)
+        changed = [result for result in running.results if result.changed]
+        assert len(changed) == 1
+        assert (docs / 'a.md').read_text(encoding='utf-8') == FORMATTED * 5
+
+    def test_ignores_other_files(self, docs, backend):
+        """Test that excluded directories and non-Markdown files are left alone."""
+        with _Running(Watcher([str(docs)], debounce=0.05, backend=backend)) as running:
+            (docs / 'notes.txt').write_text(UNFORMATTED, encoding='utf-8')
+            (docs / 'node_modules' / 'b.md').write_text(UNFORMATTED, encoding='utf-8')
+            (docs / 'a.md').write_text(UNFORMATTED, encoding='utf-8')
+            running.wait_for(1)
+            time.sleep(0.3)
+        assert [result.path for result in running.results] == [str(docs / 'a.md')]
+        assert (docs / 'notes.txt').read_text(encoding='utf-8') == UNFORMATTED
+
+    def test_new_directory(self, docs, backend):
+        """Test that files in a directory created after the start are watched."""
+        with _Running(Watcher([str(docs)], debounce=0.05, backend=backend)) as running:
+            (docs / 'sub').mkdir()
+            time.sleep(0.1)
+            (docs / 'sub' / 'c.md').write_text(UNFORMATTED, encoding='utf-8')
+            running.wait_for(1)
+        assert (docs / 'sub' / 'c.md').read_text(encoding='utf-8') == FORMATTED
+
+    def test_single_file(self, docs, backend):
+        """Test watching one file rather than a directory."""
+        target = docs / 'a.md'
+        target.write_text(FORMATTED, encoding='utf-8')
+        with _Running(Watcher([str(target)], Config(), debounce=0.05, backend=backend)) as running:
+            (docs / 'other.md').write_text(UNFORMATTED, encoding='utf-8')
+            target.write_text(UNFORMATTED, encoding='utf-8')
+            running.wait_for(1)
+        assert [result.path for result in running.results] == [str(target)]
+        assert (docs / 'other.md').read_text(encoding='utf-8') == UNFORMATTED
+
+    def test_resolved_configs(self, docs, backend):
+        """Test that each file gets the config resolve returns, and a failure is its error."""
+        (docs / 'a.md').write_text(UNFORMATTED, encoding='utf-8')
+        (docs / 'b.md').write_text(UNFORMATTED, encoding='utf-8')
+
+        def resolve(path):
+            if path.endswith('b.md'):
+                raise ValueError("bad config")
+            return Config(break_at_clauses=False)
+
+        with Watcher([str(docs)], resolve=resolve, backend=backend) as watcher:
+            results = list(watcher.format([str(docs / 'a.md'), str(docs / 'b.md')]))
+        assert [result.error for result in results] == [None, "bad config"]
+        assert not results[0].changed
+
+
+class TestCLIWatch:
+    """Test cases for --watch on the command line."""
+
+    def test_runs_until_interrupted(self, docs, monkeypatch, capsys):
+        """Test that the watcher starts and Ctrl+C stops it cleanly."""
+        def interrupt(self, on_result=None, stop=None):
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(Watcher, 'run', interrupt)
+        main(['--watch', str(docs)])
+        assert "Watching" in capsys.readouterr().err
+
+    @pytest.mark.parametrize("argv", [
+        ['--watch'],
+        ['--watch', 'a.md', '-o', 'b.md'],
+        ['--watch', '--check', 'a.md'],
+        ['--watch', '--staged'],
+    ])
+    def test_invalid_combinations(self, argv):
+        """Test that --watch rejects options it can't honour."""
+        with pytest.raises(SystemExit) as excinfo:
+            main(argv)
+        assert excinfo.value.code == 2